@@ -4,9 +4,10 @@ Mehuls_agent — DDQN-based Gomoku agent.
 Public API
 ----------
 predict_move(board_state, player)  →  (x, y)
+PredictSession().predict_move(...) →  (x, y), reusing the search tree between calls
 load_agent()                       →  DDQNAgent | None
 """
 
-from .inference import predict_move, load_agent
+from .inference import predict_move, load_agent, PredictSession
 
-__all__ = ["predict_move", "load_agent"]
+__all__ = ["predict_move", "load_agent", "PredictSession"]
@@ -1,9 +1,20 @@
 """
 Public predict_move API for the AlphaZero Gomoku agent.
 Falls back to heuristic if no checkpoint exists.
+
+predict_move(..., n_procs=k) runs a root-parallel search: k worker processes
+each search the position independently (root Dirichlet noise, different
+seeds) and their root visit distributions are summed.
+
+PredictSession().predict_move(board_state, player) has the same signature but
+keeps the search tree between calls: it diffs each board against the one
+after its previous move, advances the tree by the opponent's stone, and only
+starts afresh when the board does not follow on.
 """
 
+import multiprocessing as mp
 import os
+from concurrent.futures import ProcessPoolExecutor
 from typing import Optional, Tuple
 
 import numpy as np
@@ -14,9 +25,13 @@ from .heuristics import heuristic_move
 BOARD_SIZE      = 9
 CHECKPOINT_PATH = os.path.join(os.path.dirname(__file__), "checkpoint.pt")
 N_SIMS_PLAY     = 400        # simulations per move during human play
+N_PROCS_PLAY    = 1          # root-parallel search processes (1 = search in-process)
+ROOT_NOISE_EPS  = 0.25       # root noise in root-parallel workers (decorrelates their trees)
 
 _mcts   = None
 _device = None
+_pool   = None        # root-parallel worker pool, created on first n_procs > 1 call
+_pool_n = 0
 
 
 def load_agent():
@@ -54,13 +69,41 @@ def load_agent():
     return _mcts
 
 
-def predict_move(board_state: np.ndarray, player: int) -> Tuple[int, int]:
+def _worker_init():
+    torch.set_num_threads(1)
+    agent = load_agent()
+    if agent is not None:
+        agent.dir_eps = ROOT_NOISE_EPS
+
+
+def _worker_policy(board_state: np.ndarray, player: int, seed: int) -> np.ndarray:
+    np.random.seed(seed)
+    _mcts.reset()
+    return _mcts.get_policy(board_state, player, temperature=1.0, add_noise=True)
+
+
+def _get_pool(n_procs: int) -> ProcessPoolExecutor:
+    global _pool, _pool_n
+    if _pool is None or _pool_n != n_procs:
+        if _pool is not None:
+            _pool.shutdown()
+        _pool = ProcessPoolExecutor(max_workers=n_procs, mp_context=mp.get_context("spawn"),
+                                    initializer=_worker_init)
+        _pool_n = n_procs
+    return _pool
+
+
+def predict_move(board_state: np.ndarray, player: int,
+                 n_procs: int = N_PROCS_PLAY) -> Tuple[int, int]:
     """
     Return the best move as (x, y) = (col, row).
 
     Args:
         board_state : (size, size) numpy array, +1=black, -1=white, 0=empty
         player      : +1 or -1, the player to move
+        n_procs     : >1 sums the root visits of n_procs independent searches
+                      run in worker processes (n_procs x the simulations in
+                      about the wall time of one search)
 
     Returns:
         (col, row)  — x=col, y=row, matching gomoku_human_vs_ai.py convention
@@ -73,8 +116,14 @@ def predict_move(board_state: np.ndarray, player: int) -> Tuple[int, int]:
         row, col = heuristic_move(board_state, player)
         return int(col), int(row)
 
-    agent.reset()   # always start fresh — no persistent state between calls
-    policy = agent.get_policy(board_state, player, temperature=0.0, add_noise=False)
+    if n_procs > 1:
+        pool   = _get_pool(n_procs)
+        seeds  = np.random.randint(2**31, size=n_procs)
+        jobs   = [pool.submit(_worker_policy, board_state, player, int(seed)) for seed in seeds]
+        policy = sum(job.result() for job in jobs)
+    else:
+        agent.reset()   # always start fresh — no persistent state between calls
+        policy = agent.get_policy(board_state, player, temperature=0.0, add_noise=False)
 
     # Mask illegal moves
     valid  = (board_state.flatten() == 0).astype(np.float32)
@@ -84,3 +133,62 @@ def predict_move(board_state: np.ndarray, player: int) -> Tuple[int, int]:
     row    = action // board_state.shape[0]
     col    = action  % board_state.shape[0]
     return int(col), int(row)   # x=col, y=row
+
+
+class PredictSession:
+    """
+    predict_move() with tree reuse across calls. Use one session per game (or
+    call reset()); boards that don't follow on from the previous call get a
+    fresh search.
+    """
+
+    def __init__(self, n_sims: int = N_SIMS_PLAY):
+        from .mcts import MCTS
+
+        agent       = load_agent()
+        self.mcts   = None if agent is None else MCTS(agent.net, _device, n_simulations=n_sims,
+                                                      dirichlet_epsilon=0.0)
+        self.board  = None     # board after our last move
+        self.player = None     # player to move on self.board
+        self.reused = 0        # calls that continued the previous tree
+
+    def reset(self):
+        if self.mcts is not None:
+            self.mcts.reset()
+        self.board = None
+
+    def _follow(self, board_state: np.ndarray, player: int) -> bool:
+        """Advances the tree to board_state if it is at most one opponent move on."""
+        if self.board is None or board_state.shape != self.board.shape:
+            return False
+        diff = np.argwhere(board_state != self.board)
+        if len(diff) == 0:
+            return player == self.player            # same position asked again
+        if len(diff) != 1 or player != -self.player:
+            return False
+        r, c = diff[0]
+        if self.board[r, c] != 0 or board_state[r, c] != self.player:
+            return False
+        self.mcts.advance(int(r * board_state.shape[0] + c))
+        return True
+
+    def predict_move(self, board_state: np.ndarray, player: int) -> Tuple[int, int]:
+        """Same arguments and return value as predict_move()."""
+        if self.mcts is None or board_state.shape[0] != self.mcts.net.board_size:
+            return predict_move(board_state, player, n_procs=1)     # heuristic fallback
+
+        if self._follow(board_state, player):
+            self.reused += 1
+        else:
+            self.mcts.reset()
+        policy = self.mcts.get_policy(board_state, player, temperature=0.0, add_noise=False)
+
+        valid  = (board_state.flatten() == 0).astype(np.float32)
+        action = int(np.argmax(policy * valid))
+        row, col = divmod(action, board_state.shape[0])
+
+        self.mcts.advance(action)                    # keep the subtree for our move
+        self.board = board_state.copy()
+        self.board[row, col] = player
+        self.player = -player
+        return int(col), int(row)
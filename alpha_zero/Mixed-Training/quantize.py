@@ -0,0 +1,74 @@
+"""
+INT8 post-training static quantization of the PolicyValueNet for CPU self-play.
+
+The quantized copy is calibrated on replay-buffer states and takes/returns
+float tensors, so it can be assigned straight to MCTS.net. It is only used
+if it passes an accuracy gate against the fp32 net (policy KL, value MSE).
+
+Same method and limits as alpha_zero/quantize.py, kept inside the package
+because Mehuls_agent is deployed on its own, without the alpha_zero scripts.
+"""
+
+import copy
+import random
+import warnings
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from torch.ao.quantization import get_default_qconfig_mapping
+from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+
+MAX_POLICY_KL = 0.05     # mean KL(fp32 || int8) over held-out positions
+MAX_VALUE_MSE = 0.01     # mean squared value difference
+CALIB_BATCH   = 64
+
+
+# ---------------------------------------------------------------------------
+# Quantization
+# ---------------------------------------------------------------------------
+
+def calib_states(buffer: Sequence, n: int) -> np.ndarray:
+    """n random encode_state() planes (float32, (n, 3, size, size)) from (state, pi, z) buffer entries."""
+    sample = random.sample(list(buffer), min(n, len(buffer)))
+    return np.ascontiguousarray(np.stack([s for s, _, _ in sample]), dtype=np.float32)
+
+
+def quantize_net(net: nn.Module, calib_states: np.ndarray, backend: Optional[str] = None) -> nn.Module:
+    """Int8 copy of `net` (CPU), calibrated on (N, 3, size, size) float32 states."""
+    backend = backend or torch.backends.quantized.engine
+    torch.backends.quantized.engine = backend
+    model   = copy.deepcopy(getattr(net, "_orig_mod", net)).cpu().eval()   # unwrap torch.compile
+    example = (torch.from_numpy(calib_states[:1]),)
+    with warnings.catch_warnings():             # torch.ao deprecation notices
+        warnings.simplefilter("ignore")
+        model = prepare_fx(model, get_default_qconfig_mapping(backend), example)
+        with torch.no_grad():
+            for i in range(0, len(calib_states), CALIB_BATCH):
+                model(torch.from_numpy(calib_states[i:i + CALIB_BATCH]))
+        return convert_fx(model)
+
+
+@torch.no_grad()
+def accuracy_gate(ref: nn.Module, quant: nn.Module, states: np.ndarray) -> dict:
+    """Policy KL(ref || quant) and value MSE; 'passed' if both are within limits."""
+    x = torch.from_numpy(states)
+    ref_lp, ref_v = ref(x.to(next(ref.parameters()).device))
+    q_lp,   q_v   = quant(x)
+    ref_lp = ref_lp.float().cpu()
+    kl  = (ref_lp.exp() * (ref_lp - q_lp.float())).sum(1).mean().item()
+    mse = F.mse_loss(q_v.float(), ref_v.float().cpu()).item()
+    return {"kl": kl, "mse": mse, "passed": kl <= MAX_POLICY_KL and mse <= MAX_VALUE_MSE}
+
+
+def quantized_or_fp32(net: nn.Module, states: np.ndarray) -> Tuple[nn.Module, dict]:
+    """Calibrates on half of `states`, gates on the other half; falls back to `net`."""
+    if next(net.parameters()).is_cuda:
+        return net, {"passed": False, "reason": "int8 kernels are CPU-only"}
+    states = np.ascontiguousarray(states, dtype=np.float32)
+    half   = max(1, len(states) // 2)
+    quant  = quantize_net(net, states[:half])
+    report = accuracy_gate(net, quant, states[half:] if len(states) > 1 else states)
+    return (quant if report["passed"] else net), report
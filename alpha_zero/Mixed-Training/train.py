@@ -38,6 +38,7 @@ sys.stdout.reconfigure(line_buffering=True)
 from gameboard import GomokuLogic
 from Mehuls_agent.model import PolicyValueNet, encode_state
 from Mehuls_agent.mcts import MCTS
+from Mehuls_agent.quantize import calib_states, quantized_or_fp32
 
 BOARD_SIZE = 9
 CHECKPOINT_PATH = os.path.join(os.path.dirname(__file__), "checkpoint.pt")
@@ -80,6 +81,10 @@ EVAL_FREQ      = 5            # evaluate every N iterations
 SAVE_FREQ      = 5
 EVAL_GAMES     = 40           # games per evaluation
 
+QUANTIZE_SELFPLAY = False     # CPU only: self-play with an int8 copy of the net (quantize.py)
+QUANT_CALIB       = 2048      # buffer positions used to calibrate + gate the int8 copy
+BACKEND           = "eager"   # self-play inference backend (alpha_zero/backends.py): eager | compiled | onnx | numpy
+
 # Network architecture
 CHANNELS       = 64
 RES_BLOCKS     = 4
@@ -335,6 +340,30 @@ def _save(net, optimizer, scheduler, iteration):
 # Training loop
 # =========================================================================
 
+def _selfplay_net(net, backend=None):
+    """
+    `net` behind BACKEND for self-play. compiled shares the parameters and is
+    built once; onnx / numpy are re-exported over selfplay.onnx / .npz each call.
+    """
+    if BACKEND == "eager":
+        return net
+    try:
+        from alpha_zero.backends import make_backend
+    except ModuleNotFoundError:
+        try:
+            from backends import make_backend
+        except ModuleNotFoundError:
+            raise ImportError(f"BACKEND={BACKEND!r} needs alpha_zero's backends.py on the import path "
+                              f"(not part of a standalone Mehuls_agent deployment); use 'eager'") from None
+    net = getattr(net, "_orig_mod", net)              # export / bucket the uncompiled module
+    if BACKEND == "compiled":
+        return backend or make_backend(BACKEND, net)
+    path = os.path.join(os.path.dirname(__file__), f"selfplay.{'onnx' if BACKEND == 'onnx' else 'npz'}")
+    if os.path.exists(path):
+        os.remove(path)
+    return make_backend(BACKEND, net, path=path)
+
+
 def train(resume: bool = True):
     device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
     print(f"AlphaZero Gomoku {BOARD_SIZE}×{BOARD_SIZE} | device={device}")
@@ -369,6 +398,7 @@ def train(resume: bool = True):
 
     mcts_train = MCTS(net, device, n_simulations=N_SIMS_TRAIN)
     buffer     = deque(maxlen=BUFFER_SIZE)
+    backend    = None
     t0         = time.time()
 
     try:
@@ -376,6 +406,11 @@ def train(resume: bool = True):
 
             # ── Self-play ─────────────────────────────────────────────────
             net.eval()
+            mcts_train.net = backend = _selfplay_net(net, backend)
+            if QUANTIZE_SELFPLAY and len(buffer) >= QUANT_CALIB:
+                mcts_train.net, report = quantized_or_fp32(net, calib_states(buffer, QUANT_CALIB))
+                if not report["passed"]:
+                    print(f"  [int8] gate failed ({report}) — self-play in fp32")
             game_lens = []
             for _ in range(GAMES_PER_ITER):
                 if random.random() < HEURISTIC_GAME_RATE:
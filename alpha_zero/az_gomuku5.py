@@ -13,12 +13,21 @@ Changes:
 
 import os
 import pickle
+import threading
+import time
 import numpy as np
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
 from collections import deque
-import random
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from alpha_zero.replay import (visit_target, sym_target, upgrade_examples,
+                                   ShardStore, BatchPrefetcher)
+except ModuleNotFoundError:
+    from replay import (visit_target, sym_target, upgrade_examples,
+                        ShardStore, BatchPrefetcher)
 
 # ── 1. Config ─────────────────────────────────────────────────────────────────
 
@@ -27,12 +36,15 @@ WIN           = 5
 N_PLANES      = 3          # current stones | opponent stones | turn indicator
 N_BLOCKS      = 10         # residual blocks (was 5)
 N_FILTERS     = 128        # channel width (was 64)
+EARLY_EXIT    = 0          # >0: auxiliary policy/value head after this many blocks (early_exit.py)
+EXIT_LOSS_WEIGHT = 0.5     # weight of the early-exit head's loss in train_step
 
 N_SIMS        = 400        # MCTS simulations per move (was 200)
 C_PUCT        = 1.5        # exploration constant
 DIR_ALPHA     = 0.3        # Dirichlet α
 DIR_EPS       = 0.25       # noise weight at root
 TEMP_MOVES    = 10         # play stochastically for first N moves, then greedy
+VIRTUAL_LOSS  = 3          # visits/losses a search thread pins on its path (tree-parallel mcts)
 
 BUFFER_SIZE   = 200_000    # replay buffer capacity (was 50k)
 BATCH_SIZE    = 256        # mini-batch size
@@ -41,13 +53,41 @@ WEIGHT_DECAY  = 1e-4       # L2 regularisation weight
 MOMENTUM      = 0.9        # SGD momentum
 TRAIN_STEPS   = 200        # gradient steps per iteration
 GAMES_PER_ITER= 50         # self-play games per iteration
+PREFETCH      = 4          # mini-batches assembled ahead on a worker thread (0 = inline)
+SELFPLAY_WORKERS = 0       # >0: tree search in N processes, leaves batched here (selfplay_server)
+PIPELINE      = False      # overlap selection of one half of the games with inference of the other
+QUANTIZE_SELFPLAY = False  # CPU: self-play with an int8 copy of the net (quantize.py), if it passes the gate
+QUANT_CALIB   = 2048       # replay-buffer positions used to calibrate + gate the int8 copy
+BF16          = False      # bfloat16 autocast in train_step and batched inference (fp32 if no fast bf16)
+BACKEND       = "eager"    # self-play inference backend (backends.py): eager | compiled | onnx | numpy
 
 CHECKPOINT_PATH = "models_az5/checkpoint.pt"
-BUFFER_PATH     = "models_az5/buffer.pkl"
+BUFFER_PATH     = "models_az5/buffer.pkl"       # legacy pickle, migrated on first resume
+BUFFER_DIR      = "models_az5/buffer"           # append-only shards (replay.ShardStore)
 
 DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
 
+def bf16_supported(device: torch.device = DEVICE) -> bool:
+    """True if `device` has native bfloat16 kernels (AVX512-BF16 / AMX on CPU)."""
+    if device.type == "cuda":
+        return torch.cuda.is_bf16_supported()
+    try:
+        with open("/proc/cpuinfo") as f:
+            flags = f.read()
+    except OSError:
+        return False
+    return "avx512_bf16" in flags or "amx_bf16" in flags
+
+
+_BF16_OK = bf16_supported()
+
+
+def autocast():
+    """bf16 autocast when BF16 is set and the device supports it, otherwise a no-op (fp32)."""
+    return torch.autocast(DEVICE.type, dtype=torch.bfloat16, enabled=BF16 and _BF16_OK)
+
+
 # ── 2. Game ───────────────────────────────────────────────────────────────────
 
 class Gomoku:
@@ -123,45 +163,100 @@ class Gomoku:
 # ── 3. Network ────────────────────────────────────────────────────────────────
 
 class ResBlock(nn.Module):
-    def __init__(self, f):
+    def __init__(self, f, inner: int | None = None):
         super().__init__()
+        inner = inner or f                      # narrower after channel pruning (prune.py)
         self.net = nn.Sequential(
-            nn.Conv2d(f, f, 3, padding=1, bias=False), nn.BatchNorm2d(f), nn.ReLU(inplace=True),
-            nn.Conv2d(f, f, 3, padding=1, bias=False), nn.BatchNorm2d(f)
+            nn.Conv2d(f, inner, 3, padding=1, bias=False), nn.BatchNorm2d(inner), nn.ReLU(inplace=True),
+            nn.Conv2d(inner, f, 3, padding=1, bias=False), nn.BatchNorm2d(f)
         )
     def forward(self, x):
         return F.relu(self.net(x) + x, inplace=True)
 
 
+class ExitHead(nn.Module):
+    """Light policy/value head on an intermediate block's features (early exit)."""
+    def __init__(self, f):
+        super().__init__()
+        self.p_conv = nn.Sequential(nn.Conv2d(f, 2, 1, bias=False), nn.BatchNorm2d(2), nn.ReLU(inplace=True))
+        self.p_fc   = nn.Linear(2 * BOARD * BOARD, BOARD * BOARD)
+        self.v_conv = nn.Sequential(nn.Conv2d(f, 1, 1, bias=False), nn.BatchNorm2d(1), nn.ReLU(inplace=True))
+        self.v_fc   = nn.Sequential(nn.Linear(BOARD * BOARD, 64), nn.ReLU(inplace=True),
+                                    nn.Linear(64, 1), nn.Tanh())
+
+    def forward(self, x):
+        return self.p_fc(self.p_conv(x).flatten(1)), self.v_fc(self.v_conv(x).flatten(1))
+
+
 class AZNet(nn.Module):
-    def __init__(self):
+    def __init__(self, n_blocks: int = N_BLOCKS, n_filters: int = N_FILTERS, exit_block: int = EARLY_EXIT,
+                 inner: list[int] | None = None):
         super().__init__()
+        self.config = {"n_blocks": n_blocks, "n_filters": n_filters,     # saved with non-default sizes
+                       "exit_block": exit_block, "inner": inner}
+        self.exit_block = exit_block
         self.stem = nn.Sequential(
-            nn.Conv2d(N_PLANES, N_FILTERS, 3, padding=1, bias=False),
-            nn.BatchNorm2d(N_FILTERS), nn.ReLU(inplace=True)
+            nn.Conv2d(N_PLANES, n_filters, 3, padding=1, bias=False),
+            nn.BatchNorm2d(n_filters), nn.ReLU(inplace=True)
         )
-        self.tower = nn.Sequential(*[ResBlock(N_FILTERS) for _ in range(N_BLOCKS)])
+        self.tower = nn.Sequential(*[ResBlock(n_filters, w) for w in (inner or [None] * n_blocks)])
 
         self.p_conv = nn.Sequential(
-            nn.Conv2d(N_FILTERS, 2, 1, bias=False), nn.BatchNorm2d(2), nn.ReLU(inplace=True)
+            nn.Conv2d(n_filters, 2, 1, bias=False), nn.BatchNorm2d(2), nn.ReLU(inplace=True)
         )
         self.p_fc = nn.Linear(2 * BOARD * BOARD, BOARD * BOARD)
 
         self.v_conv = nn.Sequential(
-            nn.Conv2d(N_FILTERS, 1, 1, bias=False), nn.BatchNorm2d(1), nn.ReLU(inplace=True)
+            nn.Conv2d(n_filters, 1, 1, bias=False), nn.BatchNorm2d(1), nn.ReLU(inplace=True)
         )
         self.v_fc = nn.Sequential(
             nn.Linear(BOARD * BOARD, 256), nn.ReLU(inplace=True),
             nn.Linear(256, 1), nn.Tanh()
         )
+        self.exit_head = ExitHead(n_filters) if exit_block else None
 
     def forward(self, x):
-        x = self.tower(self.stem(x))
+        return self._heads(self.tower(self.stem(x)))
+
+    def forward_with_exit(self, x):
+        """Training pass through both heads: (logits, value, exit logits, exit value)."""
+        h, p_exit, v_exit = self.exit_forward(x)
+        return (*self.finish(h), p_exit, v_exit)
+
+    def exit_forward(self, x):
+        """Stem and the first exit_block blocks: (features, exit policy logits, exit value)."""
+        h = self.tower[:self.exit_block](self.stem(x))
+        return (h, *self.exit_head(h))
+
+    def finish(self, h):
+        """The remaining blocks and the main heads, from exit_forward's features."""
+        return self._heads(self.tower[self.exit_block:](h))
+
+    def _heads(self, x):
         p = self.p_fc(self.p_conv(x).flatten(1))
         v = self.v_fc(self.v_conv(x).flatten(1))
         return p, v
 
 
+def load_aznet(path: str, device=DEVICE, weights_only: bool = True) -> AZNet:
+    """
+    AZNet in eval mode from a plain state dict or a checkpoint dict with a
+    'model' entry; a 'config' entry (az_iterNNNN.pt snapshots, distill.py,
+    prune.py) gives its shape. Files without one predate EARLY_EXIT and
+    load with no exit head, whatever it is set to. Every format saved here
+    loads with weights_only=True; pass False only for a trusted file that
+    pickles arbitrary objects.
+    """
+    ckpt = torch.load(path, map_location=device, weights_only=weights_only)
+    if isinstance(ckpt, dict) and "model" in ckpt:
+        net = AZNet(**ckpt.get("config", {"exit_block": 0}))
+        net.load_state_dict(ckpt["model"])
+    else:
+        net = AZNet(exit_block=0)
+        net.load_state_dict(ckpt)
+    return net.to(device).eval()
+
+
 # ── 4. MCTS ───────────────────────────────────────────────────────────────────
 
 class Node:
@@ -177,16 +272,27 @@ class Node:
     def Q(self): return self.W / self.N if self.N else 0.0
 
 
+def evaluate(net, states: np.ndarray, legal_masks: np.ndarray | None = None) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Priors (B, 81), a softmax over legal moves, and values (B,) for float32
+    states (B, 3, 9, 9). Inference backends (backends.py) answer through their
+    own evaluate(); torch modules and net-callable wrappers are run here.
+    legal_masks defaults to the empty points of the two stone planes.
+    """
+    if legal_masks is None:
+        legal_masks = (states[:, 0] + states[:, 1] == 0).reshape(len(states), -1)
+    if hasattr(net, "evaluate"):
+        return net.evaluate(states, legal_masks)
+    with torch.no_grad(), autocast():
+        logits, values = net(torch.from_numpy(states).to(DEVICE))
+    legal  = torch.from_numpy(legal_masks).to(logits.device)
+    priors = F.softmax(logits.float().masked_fill(~legal, float('-inf')), dim=1)
+    return priors.cpu().numpy(), values.float().reshape(-1).cpu().numpy()
+
+
 def _net_eval(game: Gomoku, net: AZNet):
-    s = torch.tensor(game.state(), device=DEVICE).unsqueeze(0)
-    with torch.no_grad():
-        logits, v = net(s)
-    logits = logits[0]
-    legal  = game.legal()
-    mask   = torch.full((BOARD*BOARD,), float('-inf'), device=DEVICE)
-    mask[legal] = 0.0
-    priors = F.softmax(logits + mask, dim=0).cpu().numpy()
-    return priors, v.item(), legal
+    priors, values = evaluate(net, game.state()[None])
+    return priors[0], float(values[0]), game.legal()
 
 
 def _expand(node: Node, priors, legal):
@@ -212,19 +318,29 @@ def _backup(path: list, value: float):
         node.W += value
 
 
-def mcts(game: Gomoku, net: AZNet, root: Node, root_noise: bool = True, n_sims: int = N_SIMS) -> np.ndarray:
-    """Standard MCTS using clone() — used by the pygame UI, not during training."""
-    if not root.expanded:
-        priors, _, legal = _net_eval(game, net)
-        _expand(root, priors, legal)
-
+def _add_root_noise(root: Node) -> dict:
+    """Mixes Dirichlet noise into the root priors; returns the originals for restoring."""
     original_priors = {}
-    if root_noise and root.children:
+    if root.children:
         legal = list(root.children.keys())
         noise = np.random.dirichlet([DIR_ALPHA] * len(legal))
         for i, a in enumerate(legal):
             original_priors[a] = root.children[a].P
             root.children[a].P = (1 - DIR_EPS) * original_priors[a] + DIR_EPS * noise[i]
+    return original_priors
+
+
+def mcts(game: Gomoku, net: AZNet, root: Node, root_noise: bool = True, n_sims: int = N_SIMS,
+         n_threads: int = 1, pool: ThreadPoolExecutor | None = None) -> np.ndarray:
+    """Standard MCTS using clone() — used by the pygame UI, not during training."""
+    if n_threads > 1:
+        return mcts_parallel(game, net, root, root_noise, n_sims, n_threads, pool)
+
+    if not root.expanded:
+        priors, _, legal = _net_eval(game, net)
+        _expand(root, priors, legal)
+
+    original_priors = _add_root_noise(root) if root_noise else {}
 
     for _ in range(n_sims):
         node = root
@@ -252,45 +368,179 @@ def mcts(game: Gomoku, net: AZNet, root: Node, root_noise: bool = True, n_sims:
     return pi
 
 
+def mcts_parallel(game: Gomoku, net: AZNet, root: Node, root_noise: bool = True,
+                  n_sims: int = N_SIMS, n_threads: int = 4,
+                  pool: ThreadPoolExecutor | None = None) -> np.ndarray:
+    """
+    Tree-parallel mcts(): n_threads share one tree. Selection, expansion and
+    backup happen under a lock; the network call happens outside it (torch
+    releases the GIL), so several leaves are evaluated at once. Each thread
+    pins VIRTUAL_LOSS lost visits on its path until its backup, steering the
+    other threads towards different leaves. Callers that search in many short
+    chunks (search_handle) pass a long-lived `pool` of n_threads workers;
+    otherwise one is started for this call.
+    """
+    if not root.expanded:
+        priors, _, legal = _net_eval(game, net)
+        _expand(root, priors, legal)
+
+    original_priors = _add_root_noise(root) if root_noise else {}
+    lock      = threading.Lock()
+    remaining = [n_sims]
+
+    def worker():
+        while True:
+            with lock:
+                if remaining[0] == 0:
+                    return
+                remaining[0] -= 1
+                node = root
+                g    = game.clone()
+                path = [node]
+                while node.expanded:
+                    a, node = _select(node)
+                    g.move(a)
+                    path.append(node)
+                for n in path[1:]:
+                    n.N += VIRTUAL_LOSS
+                    n.W -= VIRTUAL_LOSS
+
+            done, winner = g.terminal()
+            if done:
+                value = 0.0 if winner == 0 else -1.0
+            else:
+                priors2, value, legal2 = _net_eval(g, net)
+
+            with lock:
+                for n in path[1:]:
+                    n.N -= VIRTUAL_LOSS
+                    n.W += VIRTUAL_LOSS
+                if not done and not node.expanded:     # another thread may have got here first
+                    _expand(node, priors2, legal2)
+                _backup(path, value)
+
+    own_pool = pool is None
+    pool     = pool or ThreadPoolExecutor(max_workers=n_threads)
+    try:
+        for f in [pool.submit(worker) for _ in range(n_threads)]:
+            f.result()
+    finally:
+        if own_pool:
+            pool.shutdown()
+
+    for a, p in original_priors.items():
+        root.children[a].P = p
+
+    pi = np.zeros(BOARD * BOARD)
+    for a, child in root.children.items():
+        pi[a] = child.N
+    pi /= pi.sum()
+    return pi
+
+
 # ── 5. Self-play (batched) ────────────────────────────────────────────────────
 
-def get_symmetries(state_planes: np.ndarray, pi: np.ndarray) -> list[tuple]:
-    """Generates 8x data through dihedral reflections and rotations."""
-    pi_board = pi.reshape(BOARD, BOARD)
+def get_symmetries(state_planes: np.ndarray, target: np.ndarray) -> list[tuple]:
+    """Generates 8x data (sparse targets) through dihedral reflections and rotations."""
     syms = []
     for i in range(4):
         for flip in [False, True]:
             s = np.rot90(state_planes, k=i, axes=(1, 2))
-            p = np.rot90(pi_board, k=i)
             if flip:
                 s = np.flip(s, axis=2)
-                p = np.flip(p, axis=1)
-            syms.append((s.copy(), p.flatten().copy()))
+            syms.append((s.copy(), sym_target(target, 2 * i + flip)))
     return syms
 
 
-def play_games_batched(net: AZNet, n_games: int, n_sims: int) -> list[tuple]:
-    """Plays n_games simultaneously using batched MCTS inference and fast rollbacks."""
+def _select_leaves(games: list, roots: list, group: list) -> tuple:
+    """Step A: walks each game in `group` to a leaf (moves applied in place, undone in _finish_leaves)."""
+    paths, actions_lists, dones, winners, leaf_states = [], [], [], [], []
+    for i in group:
+        node    = roots[i]
+        path    = [node]
+        actions = []
+        while node.expanded:
+            a, node = _select(node)
+            games[i].move(a)
+            actions.append(a)
+            path.append(node)
+        paths.append(path)
+        actions_lists.append(actions)
+        done, winner = games[i].terminal()
+        dones.append(done)
+        winners.append(winner)
+        if not done:
+            leaf_states.append(games[i].state())
+    return paths, actions_lists, dones, winners, leaf_states
+
+
+def _eval_leaves(net: AZNet, leaf_states: list):
+    """Step B: one evaluation of all the leaves. Safe to run on an inference thread."""
+    if not leaf_states:
+        return None, None
+    return evaluate(net, np.stack(leaf_states))
+
+
+def _finish_leaves(games: list, group: list, selected: tuple, priors, net_vals):
+    """Step C: expands the leaves with the network output, backs up and undoes the moves."""
+    paths, actions_lists, dones, winners, _ = selected
+    valid_idx = 0
+    for local_idx, i in enumerate(group):
+        if not dones[local_idx]:
+            _expand(paths[local_idx][-1], priors[valid_idx], games[i].legal())
+            value = float(net_vals[valid_idx])
+            valid_idx += 1
+        else:
+            value = 0.0 if winners[local_idx] == 0 else -1.0
+        _backup(paths[local_idx], value)
+        for _ in actions_lists[local_idx]:
+            games[i].undo_move()
+
+
+def play_games_batched(net: AZNet, n_games: int, n_sims: int, pipeline: bool = False,
+                       stats: dict | None = None) -> list[tuple]:
+    """
+    Plays n_games simultaneously using batched MCTS inference and fast rollbacks.
+
+    pipeline=True splits the active games into two groups and runs the forward
+    pass of one group on an inference thread while the search thread does
+    selection (and expansion/backup) for the other, instead of alternating
+    selection and inference for all games. If `stats` is given it is filled
+    with the time spent in forward passes and the time the search thread sat
+    waiting on them (the difference is the overlap).
+    """
     net.eval()
     games     = [Gomoku() for _ in range(n_games)]
     roots     = [Node(prior=1.0) for _ in range(n_games)]
     histories = [[] for _ in range(n_games)]
     active    = list(range(n_games))
     examples  = []
+    pool      = ThreadPoolExecutor(max_workers=1) if pipeline else None
+    eval_time = wait_time = 0.0
+
+    def timed_eval(leaf_states):
+        nonlocal eval_time
+        t0 = time.perf_counter()
+        out = _eval_leaves(net, leaf_states)
+        eval_time += time.perf_counter() - t0
+        return out
+
+    def finish_oldest(jobs):
+        nonlocal wait_time
+        group, selected, result = jobs.popleft()
+        if pool:
+            t0 = time.perf_counter()
+            result = result.result()
+            wait_time += time.perf_counter() - t0
+        _finish_leaves(games, group, selected, *result)
 
     while active:
         # 1. Evaluate unexpanded roots in a single batch
         unexpanded = [i for i in active if not roots[i].expanded]
         if unexpanded:
-            states = torch.tensor(np.stack([games[i].state() for i in unexpanded]), device=DEVICE)
-            with torch.no_grad():
-                logits, _ = net(states)
+            priors, _ = evaluate(net, np.stack([games[i].state() for i in unexpanded]))
             for idx, i in enumerate(unexpanded):
-                legal = games[i].legal()
-                mask  = torch.full((BOARD*BOARD,), float('-inf'), device=DEVICE)
-                mask[legal] = 0.0
-                priors = F.softmax(logits[idx] + mask, dim=0).cpu().numpy()
-                _expand(roots[i], priors, legal)
+                _expand(roots[i], priors[idx], games[i].legal())
 
         # 2. Add root noise
         original_priors = {}
@@ -303,57 +553,22 @@ def play_games_batched(net: AZNet, n_games: int, n_sims: int) -> list[tuple]:
                     original_priors[i][a] = roots[i].children[a].P
                     roots[i].children[a].P = (1 - DIR_EPS) * original_priors[i][a] + DIR_EPS * noise[idx]
 
-        # 3. MCTS simulations
+        # 3. MCTS simulations. Sequential: select all → evaluate → finish. Pipelined:
+        #    while group k's leaves are on the inference thread, group k+1 is selected.
+        groups = [g for g in (active[0::2], active[1::2]) if g] if pipeline else [active]
+        jobs   = deque()
         for _ in range(n_sims):
-            paths         = []
-            actions_lists = []
-            leaf_states   = []
-            dones         = []
-            winners       = []
-
-            # Step A: Selection (CPU traversal with fast rollbacks)
-            for i in active:
-                node    = roots[i]
-                path    = [node]
-                actions = []
-                while node.expanded:
-                    a, node = _select(node)
-                    games[i].move(a)
-                    actions.append(a)
-                    path.append(node)
-                paths.append(path)
-                actions_lists.append(actions)
-                done, winner = games[i].terminal()
-                dones.append(done)
-                winners.append(winner)
-                if not done:
-                    leaf_states.append(games[i].state())
-
-            # Step B: Batched evaluation (single GPU forward pass)
-            values = np.zeros(len(active))
-            if leaf_states:
-                states_tensor = torch.tensor(np.stack(leaf_states), device=DEVICE)
-                with torch.no_grad():
-                    logits, net_vals = net(states_tensor)
-
-            valid_idx = 0
-            for local_idx, i in enumerate(active):
-                if not dones[local_idx]:
-                    legal = games[i].legal()
-                    mask  = torch.full((BOARD*BOARD,), float('-inf'), device=DEVICE)
-                    mask[legal] = 0.0
-                    priors = F.softmax(logits[valid_idx] + mask, dim=0).cpu().numpy()
-                    _expand(paths[local_idx][-1], priors, legal)
-                    values[local_idx] = net_vals[valid_idx].item()
-                    valid_idx += 1
+            for group in groups:
+                selected = _select_leaves(games, roots, group)
+                if pool:
+                    result = pool.submit(timed_eval, selected[4])
                 else:
-                    values[local_idx] = 0.0 if winners[local_idx] == 0 else -1.0
-
-            # Step C: Backup and undo
-            for local_idx, i in enumerate(active):
-                _backup(paths[local_idx], values[local_idx])
-                for _ in actions_lists[local_idx]:
-                    games[i].undo_move()
+                    result = timed_eval(selected[4])
+                jobs.append((group, selected, result))
+                if len(jobs) == len(groups):        # keep the other groups in flight
+                    finish_oldest(jobs)
+        while jobs:
+            finish_oldest(jobs)
 
         # Restore root priors
         for i in active:
@@ -375,7 +590,7 @@ def play_games_batched(net: AZNet, n_games: int, n_sims: int) -> list[tuple]:
             move_n = games[i].n_moves
             action = np.random.choice(BOARD * BOARD, p=pi) if move_n < TEMP_MOVES else int(np.argmax(pi))
 
-            histories[i].append((games[i].state(), pi.copy(), games[i].player))
+            histories[i].append((games[i].state(), visit_target(roots[i].children), games[i].player))
             roots[i] = roots[i].children.get(action, Node(prior=1.0))
             games[i].move(action)
 
@@ -390,25 +605,58 @@ def play_games_batched(net: AZNet, n_games: int, n_sims: int) -> list[tuple]:
 
         active = new_active
 
+    if pool:
+        pool.shutdown()
+    if stats is not None:
+        stats["eval_time"] = eval_time
+        stats["eval_wait"] = wait_time if pool else eval_time
     return examples
 
 
+def selfplay_net(net: AZNet, backend=None, export_stem: str = "models_az5/selfplay"):
+    """
+    `net` behind the BACKEND inference backend for self-play. compiled shares
+    net's parameters, so the backend passed back in is reused; onnx / numpy are
+    exported copies, re-exported over export_stem.onnx / .npz on every call.
+    """
+    if BACKEND == "eager":
+        return net
+    from backends import make_backend
+    if BACKEND == "compiled":
+        return backend or make_backend(BACKEND, net)
+    path = f"{export_stem}.{'onnx' if BACKEND == 'onnx' else 'npz'}"
+    if os.path.exists(path):
+        os.remove(path)                          # backends only export when the file is missing
+    return make_backend(BACKEND, net, path=path)
+
+
 # ── 6. Training ───────────────────────────────────────────────────────────────
 
-def train_step(net: AZNet, opt, buf: deque) -> float:
-    net.train()
-    batch  = random.sample(buf, BATCH_SIZE)
-    states, pis, zs = map(np.array, zip(*batch))
+def to_tensors(batch: tuple) -> tuple:
+    """(states, pis, zs) numpy batch → tensors on DEVICE. Runs on the prefetch thread."""
+    states, pis, zs = batch
+    return (torch.from_numpy(states).to(DEVICE),
+            torch.from_numpy(pis).to(DEVICE),
+            torch.from_numpy(zs).to(DEVICE).unsqueeze(1))
+
 
-    states = torch.tensor(states, device=DEVICE)
-    pis    = torch.tensor(pis,    device=DEVICE)
-    zs     = torch.tensor(zs,     device=DEVICE).unsqueeze(1)
+def train_step(net: AZNet, opt, batch: tuple) -> float:
+    net.train()
+    states, pis, zs = batch
 
-    logits, values = net(states)
+    # bf16 has fp32's exponent range, so no loss scaling is needed; losses are computed in fp32
+    with_exit = getattr(net, "exit_head", None) is not None
+    with autocast():
+        out = net.forward_with_exit(states) if with_exit else net(states)
+    logits, values = out[0].float(), out[1].float()
 
     policy_loss = -(pis * F.log_softmax(logits, dim=1)).sum(dim=1).mean()
     value_loss  = F.mse_loss(values, zs)
     loss = policy_loss + value_loss
+    if with_exit:                       # early-exit head learns the same targets, jointly with the tower
+        exit_logits, exit_values = out[2].float(), out[3].float()
+        loss = loss + EXIT_LOSS_WEIGHT * (-(pis * F.log_softmax(exit_logits, dim=1)).sum(dim=1).mean()
+                                          + F.mse_loss(exit_values, zs))
 
     opt.zero_grad()
     loss.backward()
@@ -421,7 +669,11 @@ def train_step(net: AZNet, opt, buf: deque) -> float:
 def train(n_iters: int = 300):
     os.makedirs("models_az5", exist_ok=True)
 
-    net = AZNet().to(DEVICE)
+    ckpt = None
+    if os.path.exists(CHECKPOINT_PATH):
+        ckpt = torch.load(CHECKPOINT_PATH, map_location=DEVICE, weights_only=False)
+
+    net = AZNet(**(ckpt or {}).get("config", {})).to(DEVICE)    # a resumed run keeps its architecture
     opt = torch.optim.SGD(net.parameters(), lr=LR, momentum=MOMENTUM,
                           weight_decay=WEIGHT_DECAY)
     scheduler = torch.optim.lr_scheduler.CosineAnnealingLR(
@@ -430,50 +682,86 @@ def train(n_iters: int = 300):
 
     start_iter = 1
 
-    if os.path.exists(CHECKPOINT_PATH):
-        ckpt = torch.load(CHECKPOINT_PATH, map_location=DEVICE, weights_only=False)
+    if ckpt:
         net.load_state_dict(ckpt["model"])
         opt.load_state_dict(ckpt["optimizer"])
         scheduler.load_state_dict(ckpt["scheduler"])
         start_iter = ckpt["iter"] + 1
         print(f"Resumed from iteration {ckpt['iter']}")
 
-    if os.path.exists(BUFFER_PATH):
+    store = ShardStore(BUFFER_DIR, BUFFER_SIZE)
+    if store.shards():
+        buf.extend(store.load())
+        print(f"Loaded replay buffer ({len(buf)} examples, {len(store.shards())} shards)")
+    elif os.path.exists(BUFFER_PATH):
         with open(BUFFER_PATH, "rb") as f:
-            buf = pickle.load(f)
-        print(f"Loaded replay buffer ({len(buf)} examples)")
+            buf = deque(upgrade_examples(pickle.load(f)), maxlen=BUFFER_SIZE)
+        store.append(list(buf))
+        print(f"Migrated legacy replay buffer to shards ({len(buf)} examples)")
 
     print(f"AlphaZero 9x9 Gomoku v5 | device={DEVICE} | params={sum(p.numel() for p in net.parameters()):,}")
-
-    for it in range(start_iter, n_iters + 1):
-        net.eval()
-        buf.extend(play_games_batched(net, n_games=GAMES_PER_ITER, n_sims=N_SIMS))
-
-        if len(buf) < BATCH_SIZE:
-            print(f"Iter {it:3d} | collecting... ({len(buf)} examples)")
-            continue
-
-        tot_loss = tot_pol = tot_val = 0.0
-        for _ in range(TRAIN_STEPS):
-            l, p, v = train_step(net, opt, buf)
-            tot_loss += l; tot_pol += p; tot_val += v
-        scheduler.step()
-
-        current_lr = scheduler.get_last_lr()[0]
-        print(f"Iter {it:3d} | buf={len(buf):6d} | loss={tot_loss/TRAIN_STEPS:.4f} "
-              f"(pol={tot_pol/TRAIN_STEPS:.4f} val={tot_val/TRAIN_STEPS:.4f}) | lr={current_lr:.6f}")
-
-        torch.save(net.state_dict(), f"models_az5/az_iter{it:04d}.pt")
-
-        torch.save({
-            "iter":      it,
-            "model":     net.state_dict(),
-            "optimizer": opt.state_dict(),
-            "scheduler": scheduler.state_dict(),
-        }, CHECKPOINT_PATH)
-
-        with open(BUFFER_PATH, "wb") as f:
-            pickle.dump(buf, f)
+    if BF16 and not _BF16_OK:
+        print("BF16 requested but this device has no native bfloat16 support — running in fp32")
+
+    backend = pool = None
+    if SELFPLAY_WORKERS:
+        try:
+            from alpha_zero.selfplay_server import SelfPlayPool
+        except ModuleNotFoundError:
+            from selfplay_server import SelfPlayPool
+        pool = SelfPlayPool(SELFPLAY_WORKERS, GAMES_PER_ITER)   # workers started once for the whole run
+
+    try:
+        for it in range(start_iter, n_iters + 1):
+            net.eval()
+            sp_net = backend = selfplay_net(net, backend)
+            if QUANTIZE_SELFPLAY and len(buf) >= QUANT_CALIB:
+                from quantize import quantized_or_fp32
+                calib = np.stack([buf[i][0] for i in np.random.randint(len(buf), size=QUANT_CALIB)])
+                q_net, report = quantized_or_fp32(net, calib)
+                if report["passed"]:
+                    sp_net = q_net
+                else:
+                    print(f"Iter {it:3d} | int8 gate failed ({report}) — self-play in fp32")
+            if pool:
+                new_examples = pool.play(sp_net, GAMES_PER_ITER, N_SIMS)
+            else:
+                new_examples = play_games_batched(sp_net, n_games=GAMES_PER_ITER, n_sims=N_SIMS,
+                                                  pipeline=PIPELINE)
+            buf.extend(new_examples)
+            store.append(new_examples)
+
+            if len(buf) < BATCH_SIZE:
+                print(f"Iter {it:3d} | collecting... ({len(buf)} examples)")
+                continue
+
+            tot_loss = tot_pol = tot_val = 0.0
+            t0 = time.perf_counter()
+            with BatchPrefetcher(buf, BATCH_SIZE, TRAIN_STEPS, depth=PREFETCH,
+                                 collate=to_tensors) as batches:
+                for batch in batches:
+                    l, p, v = train_step(net, opt, batch)
+                    tot_loss += l; tot_pol += p; tot_val += v
+            steps_per_s = TRAIN_STEPS / (time.perf_counter() - t0)
+            scheduler.step()
+
+            current_lr = scheduler.get_last_lr()[0]
+            print(f"Iter {it:3d} | buf={len(buf):6d} | loss={tot_loss/TRAIN_STEPS:.4f} "
+                  f"(pol={tot_pol/TRAIN_STEPS:.4f} val={tot_val/TRAIN_STEPS:.4f}) | lr={current_lr:.6f} "
+                  f"| {steps_per_s:.1f} steps/s")
+
+            torch.save({"model": net.state_dict(), "config": net.config}, f"models_az5/az_iter{it:04d}.pt")
+
+            torch.save({
+                "iter":      it,
+                "model":     net.state_dict(),
+                "optimizer": opt.state_dict(),
+                "scheduler": scheduler.state_dict(),
+                "config":    net.config,
+            }, CHECKPOINT_PATH)
+    finally:
+        if pool:
+            pool.close()
 
     return net
 
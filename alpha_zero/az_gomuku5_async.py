@@ -0,0 +1,219 @@
+"""
+AlphaZero — 9x9 Gomoku, v5 with decoupled actors and learner.
+
+Same network, MCTS and loss as az_gomuku5, but self-play and training no
+longer take turns. N actor processes run play_games_batched continuously with
+frozen weights (as az_gomuku5_further2 does for its warmup) and push finished
+games into a queue; the learner process drains that queue into the replay
+buffer and keeps taking gradient steps, publishing fresh weights to the
+actors every BROADCAST_EVERY steps through a SharedWeights block (one copy of
+the parameters for all actors; picking up a new version is a rebind, not a
+load_state_dict). An actor stays bound to one version for a whole self-play
+batch, so a broadcast that would overwrite a slot some actor is still using is
+skipped (logged as skipped=N) and retried at the next one. Actors evaluate
+through az_gomuku5.BACKEND; onnx / numpy re-export the net after each rebind.
+
+An "iteration" here is TRAIN_STEPS learner steps, so checkpoints line up with
+az_gomuku5's az_iterNNNN.pt naming. Per-iteration logs report actor and
+learner utilisation (fraction of wall time spent working rather than waiting)
+and the mean weight-sync latency (publish -> actor picks it up).
+"""
+
+import os
+import queue
+import time
+from collections import deque
+
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+
+from az_gomuku5 import (AZNet, play_games_batched, selfplay_net, train_step, to_tensors,
+                        load_aznet, N_SIMS, BUFFER_SIZE, BATCH_SIZE, LR, WEIGHT_DECAY, MOMENTUM,
+                        TRAIN_STEPS, PREFETCH, DEVICE)
+from replay import ShardStore, BatchPrefetcher
+from shared_weights import SharedWeights
+
+# ── 1. Config ─────────────────────────────────────────────────────────────────
+
+N_ACTORS        = max(1, (os.cpu_count() or 2) - 1)   # one core left for the learner
+ACTOR_GAMES     = 16         # games per play_games_batched call in each actor
+ACTOR_THREADS   = 1          # torch intra-op threads per actor
+BROADCAST_EVERY = 50         # learner steps between weight broadcasts
+MIN_BUFFER      = 10_000     # examples required before the learner starts
+MAX_REPLAY      = 8.0        # max sampled examples per generated example (learner throttle)
+N_ITERS         = 300
+
+SAVE_DIR        = "models_az5_async"
+CHECKPOINT_PATH = f"{SAVE_DIR}/checkpoint.pt"
+BUFFER_DIR      = f"{SAVE_DIR}/buffer"
+INIT_WEIGHTS    = None       # optional az_iterNNNN.pt / checkpoint.pt to start from
+
+
+# ── 2. Actor ──────────────────────────────────────────────────────────────────
+
+def actor(rank: int, weights: SharedWeights, examples_q, stop, config: dict):
+    """Self-play loop: rebind to the newest published weights, play a batch, ship it."""
+    torch.set_num_threads(ACTOR_THREADS)
+    np.random.seed((os.getpid() * 7919 + rank) % 2**32)
+
+    net = AZNet(**config).to(DEVICE)
+    version = weights.bind(net, rank)          # pins the slot; publish() won't overwrite it mid-batch
+    net.eval()
+    export  = f"{SAVE_DIR}/actor{rank}"         # onnx / numpy BACKEND re-export, per actor
+    sp_net  = selfplay_net(net, export_stem=export)
+    sync = None
+
+    try:
+        while not stop.is_set():
+            if weights.version != version:
+                version = weights.bind(net, rank)
+                sp_net  = selfplay_net(net, sp_net, export)
+                sync    = weights.age()
+
+            t0 = time.perf_counter()
+            examples = play_games_batched(sp_net, n_games=ACTOR_GAMES, n_sims=N_SIMS)
+            examples_q.put((rank, version, sync, time.perf_counter() - t0, examples))
+            sync = None
+    finally:
+        weights.release(rank)
+        del net, sp_net                          # drop the views before unmapping
+        weights.close()
+
+
+# ── 3. Learner ────────────────────────────────────────────────────────────────
+
+def train(n_iters: int = N_ITERS):
+    os.makedirs(SAVE_DIR, exist_ok=True)
+
+    ckpt = None
+    if os.path.exists(CHECKPOINT_PATH):
+        ckpt = torch.load(CHECKPOINT_PATH, map_location=DEVICE, weights_only=False)
+
+    if ckpt:
+        net = AZNet(**ckpt.get("config", {})).to(DEVICE)          # a resumed run keeps its architecture
+    elif INIT_WEIGHTS:
+        net = load_aznet(INIT_WEIGHTS, DEVICE).train()
+        print(f"Initialised from {INIT_WEIGHTS}")
+    else:
+        net = AZNet().to(DEVICE)
+    opt = torch.optim.SGD(net.parameters(), lr=LR, momentum=MOMENTUM,
+                          weight_decay=WEIGHT_DECAY)
+    scheduler = torch.optim.lr_scheduler.CosineAnnealingLR(
+        opt, T_max=n_iters, eta_min=5e-4)
+    buf: deque = deque(maxlen=BUFFER_SIZE)
+    store = ShardStore(BUFFER_DIR, BUFFER_SIZE)
+
+    start_iter = 1
+    if ckpt:
+        net.load_state_dict(ckpt["model"])
+        opt.load_state_dict(ckpt["optimizer"])
+        scheduler.load_state_dict(ckpt["scheduler"])
+        start_iter = ckpt["iter"] + 1
+        print(f"Resumed from iteration {ckpt['iter']}")
+    if store.shards():
+        buf.extend(store.load())
+        print(f"Loaded replay buffer ({len(buf)} examples, {len(store.shards())} shards)")
+
+    weights    = SharedWeights.create(net, max_readers=N_ACTORS)
+    ctx        = mp.get_context("spawn")
+    stop       = ctx.Event()
+    examples_q = ctx.Queue()
+    actors     = [ctx.Process(target=actor, args=(r, weights, examples_q, stop, net.config), daemon=True)
+                  for r in range(N_ACTORS)]
+    for p in actors:
+        p.start()
+
+    print(f"AlphaZero 9x9 Gomoku v5-async | device={DEVICE} | actors={N_ACTORS} | "
+          f"params={sum(p.numel() for p in net.parameters()):,}")
+
+    generated, sampled = len(buf), 0   # examples produced by actors / consumed by the learner
+
+    syncs = []                         # weight-sync latencies reported since the last log line
+    skipped = 0                        # broadcasts skipped: an actor was still on the older slot
+
+    def drain(block: bool) -> float:
+        """Moves finished games from the actors into the buffer; returns actor busy-seconds."""
+        nonlocal generated
+        busy = 0.0
+        while True:
+            try:
+                _, _, sync, secs, examples = examples_q.get(timeout=1.0) if block else examples_q.get_nowait()
+            except queue.Empty:
+                dead = [r for r, p in enumerate(actors) if p.exitcode is not None]   # stop is not set yet
+                if dead:
+                    raise RuntimeError(f"self-play actor {dead[0]} died (exit code {actors[dead[0]].exitcode})")
+                return busy
+            if sync is not None:
+                syncs.append(sync)
+            buf.extend(examples)
+            store.append(examples)
+            generated += len(examples)
+            busy += secs
+            block = False
+
+    try:
+        while len(buf) < MIN_BUFFER:
+            drain(block=True)
+            print(f"  filling buffer... {len(buf)}/{MIN_BUFFER}", end="\r", flush=True)
+        print(f"  buffer ready ({len(buf)} examples)        ")
+
+        for it in range(start_iter, n_iters + 1):
+            t_iter = time.perf_counter()
+            actor_busy = learn_busy = 0.0
+            tot_loss = tot_pol = tot_val = 0.0
+            steps = 0
+
+            while steps < TRAIN_STEPS:
+                actor_busy += drain(block=False)
+                # Throttle: don't let the learner reuse each example more than MAX_REPLAY times
+                if sampled > MAX_REPLAY * generated:
+                    actor_busy += drain(block=True)
+                    continue
+
+                chunk = min(BROADCAST_EVERY - steps % BROADCAST_EVERY, TRAIN_STEPS - steps)
+                t0 = time.perf_counter()
+                with BatchPrefetcher(buf, BATCH_SIZE, chunk, depth=PREFETCH,
+                                     collate=to_tensors) as batches:
+                    for batch in batches:
+                        l, p, v = train_step(net, opt, batch)
+                        tot_loss += l; tot_pol += p; tot_val += v
+                learn_busy += time.perf_counter() - t0
+                steps   += chunk
+                sampled += chunk * BATCH_SIZE
+
+                if steps % BROADCAST_EVERY == 0 and weights.publish(net) is None:
+                    skipped += 1
+            scheduler.step()
+
+            wall = time.perf_counter() - t_iter
+            sync = f"{np.mean(syncs) * 1e3:.0f}ms" if syncs else "-"
+            syncs.clear()
+            print(f"Iter {it:3d} | buf={len(buf):6d} | loss={tot_loss/TRAIN_STEPS:.4f} "
+                  f"(pol={tot_pol/TRAIN_STEPS:.4f} val={tot_val/TRAIN_STEPS:.4f}) | "
+                  f"lr={scheduler.get_last_lr()[0]:.6f} | {wall:.0f}s | "
+                  f"util learner={learn_busy/wall:.0%} actors={actor_busy/(wall*N_ACTORS):.0%} | "
+                  f"w=v{weights.version} sync={sync} skipped={skipped}")
+            skipped = 0
+
+            torch.save({"model": net.state_dict(), "config": net.config}, f"{SAVE_DIR}/az_iter{it:04d}.pt")
+            torch.save({
+                "iter":      it,
+                "model":     net.state_dict(),
+                "optimizer": opt.state_dict(),
+                "scheduler": scheduler.state_dict(),
+                "config":    net.config,
+            }, CHECKPOINT_PATH)
+    finally:
+        stop.set()
+        for p in actors:
+            p.join(timeout=5)
+            if p.is_alive():
+                p.terminate()
+        weights.close()
+
+    return net
+
+
+if __name__ == "__main__":
+    train()
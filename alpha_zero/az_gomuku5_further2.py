@@ -15,7 +15,13 @@ import torch
 import torch.nn as nn
 import torch.nn.functional as F
 from collections import deque
-import random
+
+try:
+    from alpha_zero.replay import (visit_target, sym_target, sample_batch,
+                                   upgrade_examples, ShardStore, MemmapReplay)
+except ModuleNotFoundError:
+    from replay import (visit_target, sym_target, sample_batch,
+                        upgrade_examples, ShardStore, MemmapReplay)
 
 # ── 1. Config ─────────────────────────────────────────────────────────────────
 
@@ -47,7 +53,14 @@ WARMUP_GAMES  = 200        # games to generate before any training (frozen weigh
 SOURCE_CHECKPOINT = "models_az5_119/checkpoint.pt"   # iter 119 (2.29 basin)
 SAVE_DIR          = "models_az5_further5"
 CHECKPOINT_PATH   = f"{SAVE_DIR}/checkpoint.pt"
-BUFFER_PATH       = f"{SAVE_DIR}/buffer.pkl"
+BUFFER_PATH       = f"{SAVE_DIR}/buffer.pkl"    # legacy pickle, migrated on first resume
+BUFFER_DIR        = f"{SAVE_DIR}/buffer"        # append-only shards (replay.ShardStore)
+
+# ── Larger-than-RAM replay (optional) ──
+# Set to a directory shared between runs to train from a numpy.memmap ring
+# (replay.MemmapReplay) instead of the in-memory deque.
+MEMMAP_DIR        = None                        # e.g. "replay_memmap"
+MEMMAP_CAPACITY   = 5_000_000
 
 DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
@@ -253,17 +266,14 @@ def mcts(game: Gomoku, net: AZNet, root: Node, root_noise: bool = True, n_sims:
 
 # ── 5. Self-play (batched) ────────────────────────────────────────────────────
 
-def get_symmetries(state_planes: np.ndarray, pi: np.ndarray) -> list[tuple]:
-    pi_board = pi.reshape(BOARD, BOARD)
+def get_symmetries(state_planes: np.ndarray, target: np.ndarray) -> list[tuple]:
     syms = []
     for i in range(4):
         for flip in [False, True]:
             s = np.rot90(state_planes, k=i, axes=(1, 2))
-            p = np.rot90(pi_board, k=i)
             if flip:
                 s = np.flip(s, axis=2)
-                p = np.flip(p, axis=1)
-            syms.append((s.copy(), p.flatten().copy()))
+            syms.append((s.copy(), sym_target(target, 2 * i + flip)))
     return syms
 
 
@@ -363,7 +373,7 @@ def play_games_batched(net: AZNet, n_games: int, n_sims: int) -> list[tuple]:
             move_n = games[i].n_moves
             action = np.random.choice(BOARD * BOARD, p=pi) if move_n < TEMP_MOVES else int(np.argmax(pi))
 
-            histories[i].append((games[i].state(), pi.copy(), games[i].player))
+            histories[i].append((games[i].state(), visit_target(roots[i].children), games[i].player))
             roots[i] = roots[i].children.get(action, Node(prior=1.0))
             games[i].move(action)
 
@@ -385,8 +395,7 @@ def play_games_batched(net: AZNet, n_games: int, n_sims: int) -> list[tuple]:
 
 def train_step(net: AZNet, opt, buf: deque):
     net.train()
-    batch  = random.sample(buf, BATCH_SIZE)
-    states, pis, zs = map(np.array, zip(*batch))
+    states, pis, zs = sample_batch(buf, BATCH_SIZE)
 
     states = torch.tensor(states, device=DEVICE)
     pis    = torch.tensor(pis,    device=DEVICE)
@@ -416,7 +425,11 @@ def train():
     scheduler = torch.optim.lr_scheduler.CosineAnnealingLR(
         opt, T_max=N_FURTHER, eta_min=LR_MIN)
 
-    buf: deque = deque(maxlen=BUFFER_SIZE)
+    if MEMMAP_DIR:
+        buf = MemmapReplay(MEMMAP_DIR, MEMMAP_CAPACITY)
+    else:
+        buf = deque(maxlen=BUFFER_SIZE)
+    store = None if MEMMAP_DIR else ShardStore(BUFFER_DIR, BUFFER_SIZE)   # a memmap buffer is its own store
 
     start_iter = 120
     warmup_done = False
@@ -432,10 +445,16 @@ def train():
         warmup_done = True
         print(f"Resumed further training from iteration {ckpt['iter']}")
 
-        if os.path.exists(BUFFER_PATH):
+        if isinstance(buf, MemmapReplay):
+            print(f"Using memmap replay {MEMMAP_DIR} ({len(buf)} examples)")
+        elif store.shards():
+            buf.extend(store.load())
+            print(f"Loaded replay buffer ({len(buf)} examples, {len(store.shards())} shards)")
+        elif os.path.exists(BUFFER_PATH):
             with open(BUFFER_PATH, "rb") as f:
-                buf = pickle.load(f)
-            print(f"Loaded replay buffer ({len(buf)} examples)")
+                buf = deque(upgrade_examples(pickle.load(f)), maxlen=BUFFER_SIZE)
+            store.append(list(buf))
+            print(f"Migrated legacy replay buffer to shards ({len(buf)} examples)")
     else:
         # Load iter 119 weights (fresh optimizer)
         assert os.path.exists(SOURCE_CHECKPOINT), f"Source checkpoint not found: {SOURCE_CHECKPOINT}"
@@ -456,6 +475,8 @@ def train():
             n = min(batch_size, WARMUP_GAMES - batch_start)
             examples = play_games_batched(net, n_games=n, n_sims=N_SIMS)
             buf.extend(examples)
+            if store is not None:
+                store.append(examples)
             total_generated += n
             print(f"  Warmup: {total_generated}/{WARMUP_GAMES} games | buf={len(buf)}")
         print(f"── Warmup complete: {len(buf)} examples in buffer ──\n")
@@ -466,6 +487,8 @@ def train():
         net.eval()
         new_examples = play_games_batched(net, n_games=GAMES_PER_ITER, n_sims=N_SIMS)
         buf.extend(new_examples)
+        if store is not None:
+            store.append(new_examples)
 
         if len(buf) < BATCH_SIZE:
             print(f"Iter {it:3d} | collecting... ({len(buf)} examples)")
@@ -491,9 +514,6 @@ def train():
             "scheduler": scheduler.state_dict(),
         }, CHECKPOINT_PATH)
 
-        with open(BUFFER_PATH, "wb") as f:
-            pickle.dump(buf, f)
-
     return net
 
 
@@ -0,0 +1,204 @@
+"""
+Pluggable inference backends.
+
+Every engine used to call `net(states)` on a torch module directly. An
+InferenceBackend puts one interface in front of the different ways of running
+the same AZNet / PolicyValueNet weights:
+
+    backend = make_backend("onnx", net)
+    priors, values = backend.evaluate(states, legal_masks)
+        # states (B, 3, 9, 9) float32, legal_masks (B, 81) bool
+        # → priors (B, 81) softmax over legal moves, values (B,)
+
+Backends:
+    eager      the torch module as is
+    compiled   torch.compile'd per fixed batch bucket (bucketed.BucketedNet)
+    onnx       exported with torch.onnx (dynamic batch) and run by ONNX Runtime
+    numpy      numpy_engine.NumpyNet — no torch at inference time
+
+The search engines (mcts(), play_games_batched(), multi_agent_eval's
+_batched_mcts) evaluate leaves through az_gomuku5.evaluate(), which hands the
+states and legal masks to a backend's evaluate() and runs anything else (a
+torch module or a net-callable wrapper) itself. A backend is also callable
+like the net it wraps (torch tensors in, torch tensors out) for code that
+wants raw outputs, such as selfplay_server's inference loop. Selection is a single option:
+az_gomuku5.BACKEND for training self-play (az_gomuku5_async actors too),
+Mixed-Training's train.BACKEND, predict.BACKEND for predict(), and
+multi_agent_eval.BACKEND for the evaluator. Running the module compares all
+available backends on the same positions.
+"""
+
+import copy
+import os
+import tempfile
+import time
+import warnings
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+BACKENDS = ("eager", "compiled", "onnx", "numpy")
+
+
+def masked_softmax(logits: np.ndarray, legal_masks: np.ndarray) -> np.ndarray:
+    """Row-wise softmax over legal moves only (works on logits or log-probabilities)."""
+    z = np.where(legal_masks, logits, -np.inf)
+    z = np.exp(z - z.max(axis=1, keepdims=True))
+    return z / z.sum(axis=1, keepdims=True)
+
+
+class InferenceBackend:
+    """Base class: subclasses implement _forward(states) → (policy head, values) as numpy."""
+    name = "base"
+
+    def evaluate(self, states: np.ndarray, legal_masks: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        logits, values = self._forward(np.ascontiguousarray(states, dtype=np.float32))
+        return masked_softmax(logits, legal_masks), values.reshape(-1)
+
+    def _forward(self, states: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        raise NotImplementedError
+
+    # net-compatible call, so existing engines accept a backend in place of the net
+    def __call__(self, states: torch.Tensor):
+        logits, values = self._forward(states.detach().cpu().numpy())
+        return (torch.from_numpy(logits).to(states.device),
+                torch.from_numpy(values).to(states.device))
+
+    def eval(self):
+        return self
+
+
+class TorchBackend(InferenceBackend):
+    """eager: the module itself. Its __call__ skips the numpy round trip."""
+    name = "eager"
+
+    def __init__(self, net: nn.Module):
+        self.net    = net.eval() if isinstance(net, nn.Module) else net
+        self.device = next(getattr(net, "net", net).parameters()).device
+
+    @torch.no_grad()
+    def _forward(self, states):
+        logits, values = self.net(torch.from_numpy(states).to(self.device))
+        return logits.float().cpu().numpy(), values.float().cpu().numpy()
+
+    def __call__(self, states):
+        return self.net(states)
+
+    def eval(self):
+        self.net.eval()
+        return self
+
+
+class CompiledBackend(TorchBackend):
+    """compiled: torch.compile per batch bucket, so no recompiles as batch sizes change."""
+    name = "compiled"
+
+    def __init__(self, net: nn.Module, mode: str = "compile"):
+        try:
+            from alpha_zero.bucketed import BucketedNet
+        except ModuleNotFoundError:
+            from bucketed import BucketedNet
+        super().__init__(BucketedNet(net, mode=mode))
+
+
+class OnnxBackend(InferenceBackend):
+    """onnx: ONNX Runtime session on an export with a dynamic batch dimension."""
+    name = "onnx"
+
+    def __init__(self, net: nn.Module | None = None, path: str | None = None, threads: int = 0):
+        import onnxruntime as ort
+        opts = ort.SessionOptions()
+        opts.intra_op_num_threads = threads or torch.get_num_threads()
+        with tempfile.TemporaryDirectory() as tmp:      # without a path, the export lives until the session has read it
+            if path is None or not os.path.exists(path):
+                path = export_onnx(net, path or os.path.join(tmp, "net.onnx"))
+            self.session = ort.InferenceSession(path, opts, providers=["CPUExecutionProvider"])
+
+    def _forward(self, states):
+        logits, values = self.session.run(None, {"states": states})
+        return logits, values
+
+
+class NumpyBackend(InferenceBackend):
+    """numpy: the BN-folded NumPy forward pass of numpy_engine."""
+    name = "numpy"
+
+    def __init__(self, net: nn.Module | None = None, path: str | None = None):
+        try:
+            from alpha_zero.numpy_engine import NumpyNet, export_npz
+        except ModuleNotFoundError:
+            from numpy_engine import NumpyNet, export_npz
+        with tempfile.TemporaryDirectory() as tmp:      # NumpyNet reads the whole file, as above
+            if path is None or not os.path.exists(path):
+                kind = "pvnet" if hasattr(net, "trunk") else "aznet"
+                path = path or os.path.join(tmp, "net.npz")
+                export_npz(net.state_dict(), path, kind)
+            self.net = NumpyNet(path)
+
+    def _forward(self, states):
+        return self.net(states)
+
+
+def export_onnx(net: nn.Module, path: str, board: int = 9, in_planes: int = 3) -> str:
+    """AZNet / PolicyValueNet → .onnx with inputs 'states' and a dynamic batch axis."""
+    net = copy.deepcopy(getattr(net, "_orig_mod", net)).cpu().eval()
+    example = torch.zeros(2, in_planes, board, board)
+    with warnings.catch_warnings():                 # legacy (TorchScript) exporter deprecation notice
+        warnings.simplefilter("ignore")
+        torch.onnx.export(net, (example,), path, input_names=["states"], output_names=["policy", "value"],
+                          dynamic_axes={"states": {0: "batch"}, "policy": {0: "batch"}, "value": {0: "batch"}},
+                          dynamo=False)
+    return path
+
+
+def make_backend(name: str, net: nn.Module, **kwargs) -> InferenceBackend:
+    """Builds backend `name` (one of BACKENDS) from a torch net."""
+    kinds = {"eager": TorchBackend, "compiled": CompiledBackend, "onnx": OnnxBackend, "numpy": NumpyBackend}
+    if name not in kinds:
+        raise ValueError(f"unknown backend {name!r} (expected one of {BACKENDS})")
+    return kinds[name](net, **kwargs)
+
+
+# ── Benchmark: all backends on the same positions ───────────────────────────
+
+if __name__ == "__main__":
+    import argparse
+    from az_gomuku5 import AZNet, Gomoku, Node, mcts, load_aznet
+
+    parser = argparse.ArgumentParser(description="Compare inference backends on the same positions")
+    parser.add_argument("--weights", type=str, default=None, help="AZNet weights (default: random init)")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--sims", type=int, default=100, help="Simulations for the mcts() timing")
+    args = parser.parse_args()
+
+    net = load_aznet(args.weights, "cpu") if args.weights else AZNet().eval()
+
+    rng    = np.random.default_rng(0)
+    states = np.zeros((256, 3, 9, 9), dtype=np.float32)
+    states[:, :2] = rng.random((256, 2, 9, 9)) < 0.15
+    states[:, 1] *= 1 - states[:, 0]
+    states[:, 2]  = rng.integers(0, 2, (256, 1, 1))
+    masks  = (states[:, 0] + states[:, 1] == 0).reshape(256, -1)
+    ref_p, ref_v = TorchBackend(net).evaluate(states, masks)
+
+    for name in args.backends:
+        try:
+            t0 = time.perf_counter()
+            backend = make_backend(name, net)
+            setup = time.perf_counter() - t0
+        except ImportError as e:
+            print(f"  {name:<9} unavailable ({e})")
+            continue
+        p, v = backend.evaluate(states, masks)
+        row  = f"  {name:<9} setup {setup:6.1f} s   max diff p={np.abs(p - ref_p).max():.1e} v={np.abs(v - ref_v).max():.1e}"
+        for batch in (1, 64):
+            backend.evaluate(states[:batch], masks[:batch])
+            n  = max(5, 500 // batch)
+            t0 = time.perf_counter()
+            for _ in range(n):
+                backend.evaluate(states[:batch], masks[:batch])
+            row += f"   b{batch}: {batch * n / (time.perf_counter() - t0):7.0f} pos/s"
+        t0 = time.perf_counter()
+        mcts(Gomoku(), backend, Node(1.0), root_noise=False, n_sims=args.sims)
+        print(row + f"   mcts {args.sims} sims: {time.perf_counter() - t0:5.2f} s")
@@ -0,0 +1,97 @@
+"""
+bf16 vs fp32 benchmark for az_gomuku5.BF16: learner steps/sec, batched
+inference positions/sec, and a loss-curve check.
+
+The loss check trains two copies of the same initial AZNet on the same
+sequence of mini-batches, one in fp32 and one under bf16 autocast (no loss
+scaling), and compares their policy and value loss curves (moving average
+over --window steps). The run passes if every point of the bf16 curves is
+within --tol (relative) of the fp32 curves.
+
+On a CPU without native bf16 (no AVX512-BF16 / AMX) BF16 falls back to fp32,
+and the two columns measure the same thing.
+"""
+
+import argparse
+import copy
+import time
+
+import numpy as np
+import torch
+
+import az_gomuku5
+from az_gomuku5 import AZNet, to_tensors, train_step, BATCH_SIZE, LR, MOMENTUM, WEIGHT_DECAY, DEVICE
+from bench_learner import synthetic_buffer
+from replay import sample_batch
+
+
+def set_bf16(on: bool):
+    az_gomuku5.BF16 = on
+
+
+def steps_per_sec(net, opt, batches) -> float:
+    train_step(net, opt, batches[0])                              # warm-up
+    t0 = time.perf_counter()
+    for batch in batches:
+        train_step(net, opt, batch)
+    return len(batches) / (time.perf_counter() - t0)
+
+
+def positions_per_sec(net, batch: int, n_iters: int) -> float:
+    x = torch.rand(batch, 3, 9, 9, device=DEVICE).round()
+    with torch.no_grad(), az_gomuku5.autocast():
+        net(x)
+        t0 = time.perf_counter()
+        for _ in range(n_iters):
+            net(x)
+    return batch * n_iters / (time.perf_counter() - t0)
+
+
+def loss_curves(net, batches) -> np.ndarray:
+    opt = torch.optim.SGD(net.parameters(), lr=LR, momentum=MOMENTUM, weight_decay=WEIGHT_DECAY)
+    return np.array([train_step(net, opt, b)[1:] for b in batches])      # (steps, [policy, value])
+
+
+def smooth(x: np.ndarray, window: int) -> np.ndarray:
+    k = np.ones(window) / window
+    return np.stack([np.convolve(x[:, j], k, mode="valid") for j in range(x.shape[1])], axis=1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="bf16 autocast vs fp32: throughput and loss curves")
+    parser.add_argument("--steps", type=int, default=30, help="Timed learner steps per setting")
+    parser.add_argument("--curve-steps", type=int, default=200, help="Steps for the loss-curve check")
+    parser.add_argument("--window", type=int, default=20)
+    parser.add_argument("--tol", type=float, default=0.05, help="Max relative gap between smoothed curves")
+    args = parser.parse_args()
+
+    print(f"Device: {DEVICE} | native bf16: {az_gomuku5._BF16_OK}")
+    if not az_gomuku5._BF16_OK:
+        print("  no native bf16 on this device — BF16=True runs in fp32 (automatic fallback)")
+
+    torch.manual_seed(0)
+    np.random.seed(0)
+    buf     = synthetic_buffer(20_000)
+    batches = [to_tensors(sample_batch(buf, BATCH_SIZE)) for _ in range(max(args.steps, args.curve_steps))]
+    net0    = AZNet().to(DEVICE)
+
+    for on in (False, True):
+        set_bf16(on)
+        net = copy.deepcopy(net0)
+        opt = torch.optim.SGD(net.parameters(), lr=LR, momentum=MOMENTUM, weight_decay=WEIGHT_DECAY)
+        sps = steps_per_sec(net, opt, batches[:args.steps])
+        net.eval()
+        pps = {b: positions_per_sec(net, b, max(5, 2000 // b)) for b in (1, 64, 256)}
+        print(f"  {'bf16' if on else 'fp32'}:  learner {sps:6.2f} steps/s   inference "
+              + "   ".join(f"b{b}={p:8.0f} pos/s" for b, p in pps.items()))
+
+    curves = []
+    for on in (False, True):
+        set_bf16(on)
+        curves.append(smooth(loss_curves(copy.deepcopy(net0), batches[:args.curve_steps]), args.window))
+    gap = np.abs(curves[1] - curves[0]) / np.abs(curves[0])
+    ok  = gap.max() <= args.tol
+    print(f"  loss curves over {args.curve_steps} steps: max relative gap policy={gap[:, 0].max():.3%} "
+          f"value={gap[:, 1].max():.3%} (tol {args.tol:.0%}) -> {'PASS' if ok else 'FAIL'}")
+    print(f"  final smoothed loss  fp32: pol={curves[0][-1, 0]:.4f} val={curves[0][-1, 1]:.4f}   "
+          f"bf16: pol={curves[1][-1, 0]:.4f} val={curves[1][-1, 1]:.4f}")
@@ -0,0 +1,62 @@
+"""
+Learner throughput benchmark: gradient steps/sec of az_gomuku5.train_step with
+batch assembly inline (prefetch depth 0) vs on a background BatchPrefetcher.
+
+Uses the replay shards of a training run if --buffer-dir is given, otherwise a
+synthetic buffer of random positions with sparse visit-count targets.
+"""
+
+import argparse
+import time
+from collections import deque
+
+import numpy as np
+import torch
+
+from az_gomuku5 import (AZNet, to_tensors, train_step,
+                        BOARD, BATCH_SIZE, BUFFER_SIZE, LR, MOMENTUM, WEIGHT_DECAY, DEVICE)
+from replay import BatchPrefetcher, ShardStore
+
+
+def synthetic_buffer(n: int) -> deque:
+    buf = deque(maxlen=n)
+    for _ in range(n):
+        s = np.zeros((3, BOARD, BOARD), dtype=np.float32)
+        s[:2] = np.random.rand(2, BOARD, BOARD) < 0.2
+        s[2]  = np.random.randint(2)
+        acts  = np.random.choice(BOARD * BOARD, size=np.random.randint(5, 40), replace=False)
+        cnts  = np.random.randint(1, 100, size=len(acts))
+        buf.append((s, np.stack([acts, cnts]).astype(np.uint16), np.float32(np.random.choice([-1, 0, 1]))))
+    return buf
+
+
+def steps_per_sec(net, opt, buf, depth: int, n_steps: int) -> float:
+    t0 = time.perf_counter()
+    with BatchPrefetcher(buf, BATCH_SIZE, n_steps, depth=depth, collate=to_tensors) as batches:
+        for batch in batches:
+            train_step(net, opt, batch)
+    return n_steps / (time.perf_counter() - t0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="train_step throughput, inline vs prefetched batches")
+    parser.add_argument("--buffer-dir", type=str, default=None,
+                        help="ShardStore directory to sample from (default: synthetic)")
+    parser.add_argument("--steps", type=int, default=100, help="Timed steps per setting")
+    parser.add_argument("--depth", type=int, default=4, help="Prefetch depth to compare against inline")
+    args = parser.parse_args()
+
+    if args.buffer_dir:
+        buf = deque(ShardStore(args.buffer_dir, BUFFER_SIZE).load(), maxlen=BUFFER_SIZE)
+    else:
+        buf = synthetic_buffer(20_000)
+
+    net = AZNet().to(DEVICE)
+    opt = torch.optim.SGD(net.parameters(), lr=LR, momentum=MOMENTUM, weight_decay=WEIGHT_DECAY)
+    print(f"Device: {DEVICE} | buffer: {len(buf)} examples | batch: {BATCH_SIZE}")
+
+    steps_per_sec(net, opt, buf, depth=0, n_steps=5)            # warm-up
+    for depth in (0, args.depth):
+        sps = steps_per_sec(net, opt, buf, depth=depth, n_steps=args.steps)
+        label = "inline" if depth == 0 else f"prefetch depth={depth}"
+        print(f"  {label:<20} {sps:7.2f} steps/s")
@@ -0,0 +1,52 @@
+"""
+Throughput benchmark: predict() called once per board vs predict_batch() on
+all boards together, at the same simulation count.
+
+Boards are random mid-game positions (a few stones per side, no five yet).
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from az_gomuku5 import Gomoku
+from predict import predict, predict_batch, _load_model, _DEFAULT_WEIGHTS
+
+
+def random_positions(n: int, n_moves: int, rng) -> tuple[list, list]:
+    boards, players = [], []
+    while len(boards) < n:
+        g = Gomoku()
+        for a in rng.choice(g.legal(), size=n_moves, replace=False):
+            g.move(int(a))
+        if not g.terminal()[0]:
+            boards.append(g.board.copy())
+            players.append(g.player)
+    return boards, players
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="predict() loop vs predict_batch()")
+    parser.add_argument("--weights", type=str, default=_DEFAULT_WEIGHTS)
+    parser.add_argument("--boards", type=int, default=64)
+    parser.add_argument("--sims", type=int, default=100)
+    parser.add_argument("--moves", type=int, default=8, help="Stones on each random board")
+    args = parser.parse_args()
+
+    boards, players = random_positions(args.boards, args.moves, np.random.default_rng(0))
+    _load_model(args.weights)
+    predict(boards[0], players[0], args.weights, n_sims=4)                # warm-up
+
+    t0 = time.perf_counter()
+    for b, p in zip(boards, players):
+        predict(b, p, args.weights, n_sims=args.sims)
+    loop = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    predict_batch(boards, players, n_sims=args.sims, weights_path=args.weights)
+    batch = time.perf_counter() - t0
+
+    print(f"{args.boards} boards | {args.sims} sims")
+    print(f"  predict() loop   {args.boards / loop:8.2f} positions/s")
+    print(f"  predict_batch()  {args.boards / batch:8.2f} positions/s  x{loop / batch:.1f}")
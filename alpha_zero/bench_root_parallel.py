@@ -0,0 +1,62 @@
+"""
+Strength-vs-cores curve for root-parallel search (predict(..., n_procs=k)).
+
+For each k, plays games between a k-process root-parallel searcher and the
+plain single-process searcher, both at the same per-process simulation
+budget, alternating colours. A few random opening moves give the games
+variety (the single-process search is deterministic). Reports the k-process
+score and its seconds per move, i.e. what k cores buy at a fixed wall-clock
+budget.
+
+    python bench_root_parallel.py --weights models_az5/az_iter0150.pt --procs 1 2 4 8
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from az_gomuku5 import Gomoku, N_SIMS
+from predict import _search_pi, _DEFAULT_WEIGHTS
+
+
+def play_one_game(weights, n_sims, n_procs, k_color, n_opening, rng) -> tuple:
+    """Returns (winner, seconds per k-process move)."""
+    game = Gomoku()
+    for a in rng.choice(game.legal(), size=n_opening, replace=False):
+        game.move(int(a))
+    secs = []
+    while True:
+        done, winner = game.terminal()
+        if done:
+            return winner, float(np.mean(secs)) if secs else 0.0
+        procs = n_procs if game.player == k_color else 1
+        t0 = time.perf_counter()
+        pi = _search_pi(game.clone(), weights, n_sims, n_procs=procs)
+        if procs == n_procs:
+            secs.append(time.perf_counter() - t0)
+        game.move(int(np.argmax(pi)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Root-parallel strength vs number of processes")
+    parser.add_argument("--weights", type=str, default=_DEFAULT_WEIGHTS)
+    parser.add_argument("--games", type=int, default=10, help="Games per setting (half as each colour)")
+    parser.add_argument("--sims", type=int, default=N_SIMS, help="Simulations per process per move")
+    parser.add_argument("--procs", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument("--opening", type=int, default=2, help="Random opening moves per game")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"Weights: {args.weights} | sims/process: {args.sims} | games/setting: {args.games}")
+    print(f"  {'procs':>5}  {'W':>3} {'D':>3} {'L':>3}  {'score':>6}  {'s/move':>7}")
+    for k in args.procs:
+        wdl, secs = [0, 0, 0], []
+        for g in range(args.games):
+            k_color = 1 if g % 2 == 0 else 2
+            winner, s = play_one_game(args.weights, args.sims, k, k_color, args.opening, rng)
+            wdl[1 if winner == 0 else 0 if winner == k_color else 2] += 1
+            secs.append(s)
+        score = (wdl[0] + 0.5 * wdl[1]) / args.games
+        print(f"  {k:>5}  {wdl[0]:>3} {wdl[1]:>3} {wdl[2]:>3}  {score:6.1%}  {np.mean(secs):7.2f}")
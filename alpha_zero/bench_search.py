@@ -0,0 +1,45 @@
+"""
+Single-position search benchmark: time-to-move of az_gomuku5.mcts for a fixed
+simulation budget as the number of tree-parallel search threads grows.
+
+Each setting searches the same position from a fresh tree; the chosen move is
+printed alongside so a change caused by virtual loss is visible.
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+import torch
+
+from az_gomuku5 import AZNet, Gomoku, Node, mcts, load_aznet, BOARD, N_SIMS, DEVICE
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="mcts time-to-move vs search threads")
+    parser.add_argument("--weights", type=str, default=None, help="AZNet weights (default: random init)")
+    parser.add_argument("--sims", type=int, default=N_SIMS)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument("--torch-threads", type=int, default=1, help="torch intra-op threads")
+    parser.add_argument("--moves", type=int, default=6, help="random opening moves before the timed search")
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.torch_threads)
+    net = load_aznet(args.weights, DEVICE) if args.weights else AZNet().to(DEVICE).eval()
+
+    rng  = np.random.default_rng(0)
+    game = Gomoku()
+    for a in rng.choice(game.legal(), size=args.moves, replace=False):
+        game.move(int(a))
+
+    print(f"Device: {DEVICE} | sims: {args.sims} | torch threads: {args.torch_threads}")
+    mcts(game.clone(), net, Node(prior=1.0), root_noise=False, n_sims=8)          # warm-up
+    base = None
+    for n in sorted(set(args.threads)):
+        t0 = time.perf_counter()
+        pi = mcts(game.clone(), net, Node(prior=1.0), root_noise=False, n_sims=args.sims, n_threads=n)
+        dt = time.perf_counter() - t0
+        base = base or dt
+        move = divmod(int(np.argmax(pi)), BOARD)
+        print(f"  {n:>3} threads  {dt:6.2f}s  {args.sims / dt:7.1f} sims/s  x{base / dt:4.2f}  move={move}")
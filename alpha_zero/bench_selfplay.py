@@ -0,0 +1,46 @@
+"""
+Self-play throughput benchmark: az_gomuku5.play_games_batched with selection
+and inference alternating (sequential) vs overlapped on an inference thread
+(pipeline=True).
+
+Reports games/s, time spent in forward passes, and how much of it the search
+thread actually waited on — in pipelined mode the gap between the two is the
+inference time hidden behind selection.
+"""
+
+import argparse
+import time
+
+import numpy as np
+import torch
+
+from az_gomuku5 import AZNet, play_games_batched, load_aznet, DEVICE
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="play_games_batched throughput, sequential vs pipelined")
+    parser.add_argument("--weights", type=str, default=None, help="AZNet weights (default: random init)")
+    parser.add_argument("--games", type=int, default=32)
+    parser.add_argument("--sims", type=int, default=100)
+    parser.add_argument("--threads", type=int, default=None, help="torch intra-op threads")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    net = load_aznet(args.weights, DEVICE) if args.weights else AZNet().to(DEVICE).eval()
+
+    print(f"Device: {DEVICE} | games: {args.games} | sims: {args.sims} | threads: {torch.get_num_threads()}")
+    play_games_batched(net, 2, 4)                                # warm-up
+    base = None
+    for pipeline in (False, True):
+        np.random.seed(args.seed)
+        stats = {}
+        t0 = time.perf_counter()
+        play_games_batched(net, args.games, args.sims, pipeline=pipeline, stats=stats)
+        dt = time.perf_counter() - t0
+        base = base or dt
+        label = "pipelined" if pipeline else "sequential"
+        print(f"  {label:<10}  {args.games / dt:6.2f} games/s  x{base / dt:4.2f}  "
+              f"inference {stats['eval_time']:6.1f}s  waited {stats['eval_wait']:6.1f}s  "
+              f"(overlap {stats['eval_time'] - stats['eval_wait']:6.1f}s)")
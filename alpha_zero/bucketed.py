@@ -0,0 +1,143 @@
+"""
+Shape-bucketed compiled inference for the batched evaluators.
+
+In play_games_batched the leaf batch shrinks every time a game finishes (and
+with pipeline=True it is split in two), so a torch.compile'd net sees a new
+batch size on almost every iteration: it either recompiles or, once dynamo
+marks the batch dimension dynamic, falls back to shape-generic kernels.
+BucketedNet compiles (or traces) the net once per bucket size at startup and
+pads each incoming batch with empty boards up to the smallest bucket that fits
+(batches larger than the biggest bucket are split into chunks of it), so after
+construction no batch ever reaches the compiler with an unseen shape. The
+network is in eval mode, so padding rows do not affect the real rows.
+
+    net = BucketedNet(net)                    # compiles buckets 1, 8, 16, 32, 64
+    play_games_batched(net, n_games=50, n_sims=400)
+
+(az_gomuku5.BACKEND = "compiled" selects it for training self-play; see backends.py.)
+
+mode="trace" uses one torch.jit.trace per bucket instead of torch.compile (no
+C++ toolchain needed, much faster startup). Both share the live parameters,
+so the wrapper keeps following the net as it trains.
+
+Running the module compares self-play with the eager net, a plain
+torch.compile'd net and a BucketedNet, including how many graphs each compiled.
+"""
+
+import warnings
+from collections import Counter
+
+import torch
+import torch.nn as nn
+
+try:
+    from alpha_zero.az_gomuku5 import BOARD, N_PLANES, DEVICE
+except ModuleNotFoundError:
+    from az_gomuku5 import BOARD, N_PLANES, DEVICE
+
+BUCKETS = (1, 8, 16, 32, 64)
+
+
+def _compiled_graphs() -> int:
+    """Graphs compiled so far by dynamo in this process."""
+    from torch._dynamo.utils import counters
+    return counters["stats"]["unique_graphs"]
+
+
+class BucketedNet:
+    """Callable like the wrapped net; every forward pass runs at a precompiled batch size."""
+
+    def __init__(self, net: nn.Module, buckets=BUCKETS, mode: str = "compile"):
+        self.net     = net.eval()
+        self.buckets = sorted(buckets)
+        self.mode    = mode
+        self.calls   = Counter()                 # bucket size -> forward passes
+        self.rows    = 0                         # real rows evaluated
+        self.padding = 0                         # padding rows evaluated
+        device = next(net.parameters()).device
+
+        if mode == "compile":
+            torch._dynamo.config.cache_size_limit = max(torch._dynamo.config.cache_size_limit,
+                                                        len(self.buckets))
+            compiled  = torch.compile(net, dynamic=False)
+            self._fns = {b: compiled for b in self.buckets}
+        elif mode == "trace":
+            with torch.no_grad(), warnings.catch_warnings():
+                warnings.filterwarnings("ignore", category=FutureWarning, module=r"torch\.jit")
+                self._fns = {b: torch.jit.trace(net, torch.zeros(b, N_PLANES, BOARD, BOARD, device=device),
+                                                check_trace=False)
+                             for b in self.buckets}
+        else:
+            raise ValueError(f"unknown mode {mode!r} (expected 'compile' or 'trace')")
+
+        graphs = _compiled_graphs()
+        with torch.no_grad():
+            for b in self.buckets:                  # warm-up: compile every bucket now
+                self._fns[b](torch.zeros(b, N_PLANES, BOARD, BOARD, device=device))
+        self.warmup_graphs = _compiled_graphs() - graphs
+        self._graphs_after_warmup = _compiled_graphs()
+
+    def eval(self):
+        self.net.eval()
+        return self
+
+    def recompiles(self) -> int:
+        """Graphs compiled since warm-up (0 means every batch hit a precompiled bucket)."""
+        return _compiled_graphs() - self._graphs_after_warmup
+
+    def __call__(self, states: torch.Tensor):
+        n, top = len(states), self.buckets[-1]
+        if n > top:
+            outs = [self(states[i:i + top]) for i in range(0, n, top)]
+            return torch.cat([o[0] for o in outs]), torch.cat([o[1] for o in outs])
+
+        b = next(b for b in self.buckets if b >= n)
+        if b > n:
+            states = torch.cat([states, states.new_zeros((b - n, *states.shape[1:]))])
+        self.calls[b] += 1
+        self.rows     += n
+        self.padding  += b - n
+        logits, values = self._fns[b](states)
+        return logits[:n], values[:n]
+
+
+# ── Benchmark ─────────────────────────────────────────────────────────────────
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    import numpy as np
+    from az_gomuku5 import AZNet, play_games_batched, load_aznet
+
+    parser = argparse.ArgumentParser(description="Self-play with eager vs torch.compile vs bucketed nets")
+    parser.add_argument("--weights", type=str, default=None, help="AZNet weights (default: random init)")
+    parser.add_argument("--games", type=int, default=16)
+    parser.add_argument("--sims", type=int, default=50)
+    parser.add_argument("--mode", choices=("compile", "trace"), default="compile")
+    args = parser.parse_args()
+
+    net = load_aznet(args.weights, DEVICE) if args.weights else AZNet().to(DEVICE).eval()
+
+    def run(label, model):
+        np.random.seed(0)
+        torch.manual_seed(0)
+        graphs = _compiled_graphs()
+        t0 = time.perf_counter()
+        play_games_batched(model, args.games, args.sims)
+        dt = time.perf_counter() - t0
+        print(f"  {label:<28} {dt:7.1f} s  {args.games / dt:5.2f} games/s  "
+              f"graphs compiled during self-play: {_compiled_graphs() - graphs}")
+
+    print(f"Device: {DEVICE} | games: {args.games} | sims: {args.sims} | buckets: {BUCKETS}")
+    run("eager", net)
+    if args.mode == "compile":
+        run("torch.compile (plain)", torch.compile(net))
+
+    t0 = time.perf_counter()
+    bucketed = BucketedNet(net, mode=args.mode)
+    print(f"  BucketedNet({args.mode}) startup {time.perf_counter() - t0:.1f} s, "
+          f"{bucketed.warmup_graphs} graphs")
+    run(f"BucketedNet({args.mode})", bucketed)
+    print(f"  bucket use {dict(sorted(bucketed.calls.items()))}, "
+          f"padding {bucketed.padding / max(1, bucketed.rows + bucketed.padding):.1%} of rows, "
+          f"recompiles after warm-up: {bucketed.recompiles()}")
@@ -0,0 +1,187 @@
+"""
+Knowledge distillation of the v5 AZNet into a smaller, faster student.
+
+The 10x128 teacher costs several times more per evaluation than a 4x64 net.
+distill() trains a student AZNet(n_blocks, n_filters) on replay-buffer
+positions to match the teacher's outputs: the policy loss is the KL divergence
+from the teacher's (temperature-softened) policy, and the value loss is the
+MSE to the teacher's value. Teacher targets are computed on the fly for each
+mini-batch, so random dihedral symmetries can be applied to the positions
+without transforming any stored targets.
+
+The student is saved as {'model', 'config', ...}; predict(), multi_agent_eval
+and everything else that goes through az_gomuku5.load_aznet() loads it at its
+own size.
+
+At a fixed search budget in simulations the student is simply weaker; what
+matters is strength at a fixed time per move, where it gets more simulations.
+equal_time_match() plays teacher vs student with the same wall-clock budget per
+move and reports the score next to the simulations each side managed.
+
+    python distill.py --teacher models_az5/az_iter0150.pt --out models_az5/student_4x64.pt
+    python distill.py --teacher models_az5/az_iter0150.pt --eval models_az5/student_4x64.pt --move-time 1.0
+"""
+
+import time
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+from az_gomuku5 import (AZNet, Gomoku, Node, mcts, play_games_batched, load_aznet,
+                        BATCH_SIZE, LR, MOMENTUM, WEIGHT_DECAY, BUFFER_DIR, DEVICE)
+from replay import ShardStore
+from symmetry import transform, N_SYMMETRIES
+
+STUDENT_BLOCKS  = 4
+STUDENT_FILTERS = 64
+TEMPERATURE     = 1.0      # softening of the teacher policy (1.0 = match it exactly)
+VALUE_WEIGHT    = 1.0
+SEARCH_CHUNK    = 16       # simulations between clock checks in timed search
+
+
+# ── 1. Distillation ──────────────────────────────────────────────────────────
+
+def distill(teacher: AZNet, positions: np.ndarray, steps: int, n_blocks: int = STUDENT_BLOCKS,
+            n_filters: int = STUDENT_FILTERS, log_every: int = 100,
+            student: AZNet | None = None, lr: float = LR) -> AZNet:
+    """
+    Trains a fresh AZNet(n_blocks, n_filters) to reproduce `teacher` on
+    `positions`, or fine-tunes `student` if one is given (prune.py).
+    """
+    teacher.eval()
+    student = student if student is not None else AZNet(n_blocks, n_filters).to(DEVICE)
+    opt = torch.optim.SGD(student.parameters(), lr=lr, momentum=MOMENTUM, weight_decay=WEIGHT_DECAY)
+    scheduler = torch.optim.lr_scheduler.CosineAnnealingLR(opt, T_max=steps, eta_min=lr / 20)
+    data = torch.from_numpy(positions).to(DEVICE)
+
+    tot_pol = tot_val = 0.0
+    for step in range(1, steps + 1):
+        # one random symmetry for the whole batch: targets come from the teacher, so nothing else moves
+        x = transform(data[torch.randint(len(data), (BATCH_SIZE,), device=DEVICE)],
+                      np.random.randint(N_SYMMETRIES))
+        with torch.no_grad():
+            t_logits, t_values = teacher(x)
+            t_logp = F.log_softmax(t_logits / TEMPERATURE, dim=1)
+
+        student.train()
+        logits, values = student(x)
+        logp        = F.log_softmax(logits / TEMPERATURE, dim=1)
+        policy_loss = (t_logp.exp() * (t_logp - logp)).sum(dim=1).mean()
+        value_loss  = F.mse_loss(values, t_values)
+        loss = policy_loss + VALUE_WEIGHT * value_loss
+
+        opt.zero_grad()
+        loss.backward()
+        opt.step()
+        scheduler.step()
+
+        tot_pol += policy_loss.item(); tot_val += value_loss.item()
+        if step % log_every == 0 or step == steps:
+            n = log_every if step % log_every == 0 else step % log_every
+            print(f"  step {step:5d} | KL={tot_pol / n:.4f}  value MSE={tot_val / n:.4f} "
+                  f"| lr={scheduler.get_last_lr()[0]:.5f}")
+            tot_pol = tot_val = 0.0
+    return student.eval()
+
+
+def training_positions(teacher: AZNet, n: int, buffer_dir: str = BUFFER_DIR) -> np.ndarray:
+    """Replay-buffer positions; falls back to short teacher self-play when there is no buffer."""
+    states = ShardStore(buffer_dir, capacity=n).recent_states(n)
+    if len(states) >= min(n, BATCH_SIZE):
+        return states
+    print(f"No replay buffer at {buffer_dir} — generating positions with teacher self-play")
+    examples = []
+    while len(examples) < 8 * n:
+        examples += play_games_batched(teacher, n_games=16, n_sims=32)
+    return np.stack([e[0] for e in examples[::8]])[:n]     # one of each position's 8 symmetries
+
+
+def save_student(student: AZNet, path: str, **info):
+    torch.save({"model": student.state_dict(), "config": student.config, **info}, path)
+
+
+# ── 2. Equal wall-clock evaluation ───────────────────────────────────────────
+
+def timed_search(game: Gomoku, net: AZNet, seconds: float) -> tuple[np.ndarray, int]:
+    """Searches `game` until `seconds` elapse; returns the visit distribution and the simulations run."""
+    root     = Node(prior=1.0)
+    deadline = time.perf_counter() + seconds
+    pi = mcts(game, net, root, root_noise=False, n_sims=SEARCH_CHUNK)
+    while time.perf_counter() < deadline:
+        pi = mcts(game, net, root, root_noise=False, n_sims=SEARCH_CHUNK)
+    return pi, root.N
+
+
+def equal_time_match(net_a: AZNet, net_b: AZNet, n_pairs: int, move_time: float) -> dict:
+    """
+    n_pairs pairs of games from random 2-move openings, colours swapped within
+    each pair, both sides given move_time seconds per move.
+    Returns wins/draws/losses for A and the mean simulations per move of each side.
+    """
+    score = {"A": 0, "B": 0, "draw": 0}
+    sims  = {"A": [], "B": []}
+    for _ in range(n_pairs):
+        opening = Gomoku()
+        for _ in range(2):
+            opening.move(int(np.random.choice(opening.legal())))
+        for a_is_black in (True, False):
+            game = opening.clone()
+            while not game.terminal()[0]:
+                side = "A" if (game.player == 1) == a_is_black else "B"
+                pi, n = timed_search(game, net_a if side == "A" else net_b, move_time)
+                sims[side].append(n)
+                game.move(int(np.argmax(pi)))
+            winner = game.terminal()[1]
+            if winner == 0:
+                score["draw"] += 1
+            else:
+                score["A" if (winner == 1) == a_is_black else "B"] += 1
+    return {**score, "sims_A": float(np.mean(sims["A"])), "sims_B": float(np.mean(sims["B"]))}
+
+
+def ms_per_eval(net: AZNet, n: int = 200) -> float:
+    game = Gomoku()
+    x = torch.tensor(game.state(), device=DEVICE).unsqueeze(0)
+    with torch.no_grad():
+        net(x)
+        t0 = time.perf_counter()
+        for _ in range(n):
+            net(x)
+    return (time.perf_counter() - t0) / n * 1e3
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Distil the v5 AZNet into a smaller student")
+    parser.add_argument("--teacher", type=str, default=None, help="Teacher weights (default: random init)")
+    parser.add_argument("--out", type=str, default="models_az5/student.pt")
+    parser.add_argument("--blocks", type=int, default=STUDENT_BLOCKS)
+    parser.add_argument("--filters", type=int, default=STUDENT_FILTERS)
+    parser.add_argument("--positions", type=int, default=50_000)
+    parser.add_argument("--steps", type=int, default=2000)
+    parser.add_argument("--buffer", type=str, default=BUFFER_DIR)
+    parser.add_argument("--eval", type=str, default=None, help="Skip training; evaluate this student")
+    parser.add_argument("--pairs", type=int, default=4, help="Game pairs in the equal-time match")
+    parser.add_argument("--move-time", type=float, default=1.0, help="Seconds per move for both sides")
+    args = parser.parse_args()
+
+    teacher = load_aznet(args.teacher) if args.teacher else AZNet().to(DEVICE).eval()
+
+    if args.eval:
+        student = load_aznet(args.eval)
+    else:
+        positions = training_positions(teacher, args.positions, args.buffer)
+        print(f"Distilling {teacher.config} → {args.blocks}x{args.filters} on {len(positions)} positions")
+        student = distill(teacher, positions, args.steps, args.blocks, args.filters)
+        save_student(student, args.out, teacher=args.teacher, steps=args.steps)
+        print(f"Saved {args.out}")
+
+    n_params = lambda m: sum(p.numel() for p in m.parameters())
+    t_ms, s_ms = ms_per_eval(teacher), ms_per_eval(student)
+    print(f"teacher {n_params(teacher):>9,} params  {t_ms:6.2f} ms/eval")
+    print(f"student {n_params(student):>9,} params  {s_ms:6.2f} ms/eval  (x{t_ms / s_ms:.1f} faster)")
+
+    r = equal_time_match(student, teacher, args.pairs, args.move_time)
+    print(f"Equal time ({args.move_time:.2f} s/move, {2 * args.pairs} games): student W{r['A']} "
+          f"D{r['draw']} L{r['B']} vs teacher | sims/move student {r['sims_A']:.0f}, teacher {r['sims_B']:.0f}")
@@ -0,0 +1,172 @@
+"""
+Early-exit leaf evaluation for AZNet.
+
+Many late-game leaves are tactically clear (one forced win or block), and the
+first few residual blocks already see that. With az_gomuku5.EARLY_EXIT = k the
+net gets an auxiliary ExitHead after block k, trained jointly with the full
+tower in train_step. EarlyExitNet runs the stem and the first k blocks, and
+returns the exit head's output for every position whose top move probability
+reaches `threshold`; the rest of the batch continues through the remaining
+blocks to the main heads.
+
+    net = EarlyExitNet(load_aznet("models_az5/az_iter0300.pt"), threshold=0.9)
+    mcts(game, net, Node(1.0), n_sims=400)
+    net.blocks_per_leaf()          # average residual blocks evaluated per leaf
+
+predict.EXIT_THRESHOLD turns it on for predict() when the checkpoint has an
+exit head. For checkpoints trained without one, attach_exit_head() fits a
+head on the frozen trunk against the net's own outputs on replay positions.
+
+Running the module plays EarlyExitNet at each threshold against the full net
+at the same simulations, and reports the score next to the exit rate, the
+residual blocks per leaf and the time per simulation of each side.
+"""
+
+import time
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+try:
+    from alpha_zero.az_gomuku5 import (AZNet, Gomoku, Node, mcts, BATCH_SIZE, LR, MOMENTUM,
+                                       WEIGHT_DECAY, DEVICE)
+    from alpha_zero.symmetry import transform
+except ModuleNotFoundError:
+    from az_gomuku5 import (AZNet, Gomoku, Node, mcts, BATCH_SIZE, LR, MOMENTUM,
+                            WEIGHT_DECAY, DEVICE)
+    from symmetry import transform
+
+EXIT_THRESHOLD = 0.9      # exit when the exit head's top move probability is at least this
+
+
+class EarlyExitNet:
+    """Net-callable: exit-head output for confident positions, full tower for the rest."""
+
+    def __init__(self, net: AZNet, threshold: float = EXIT_THRESHOLD):
+        if getattr(net, "exit_head", None) is None:
+            raise ValueError("net has no early-exit head (train with EARLY_EXIT > 0 or use attach_exit_head)")
+        self.net       = net.eval()
+        self.threshold = threshold
+        self.rows      = 0                  # positions evaluated
+        self.exited    = 0                  # of which answered by the exit head
+
+    def eval(self):
+        self.net.eval()
+        return self
+
+    def blocks_per_leaf(self) -> float:
+        """Average residual blocks run per evaluated position (n_blocks without early exit)."""
+        full = self.rows - self.exited
+        return (self.exited * self.net.exit_block + full * len(self.net.tower)) / max(1, self.rows)
+
+    def __call__(self, states: torch.Tensor):
+        h, logits, values = self.net.exit_forward(states)
+        confident = torch.softmax(logits.float(), dim=1).amax(dim=1) >= self.threshold
+        n_exit    = int(confident.sum())
+        self.rows   += len(states)
+        self.exited += n_exit
+        if n_exit == len(states):
+            return logits, values
+
+        rest = (~confident).nonzero().squeeze(1)
+        full_logits, full_values = self.net.finish(h[rest])
+        logits, values = logits.float().clone(), values.float().clone()
+        logits[rest], values[rest] = full_logits.float(), full_values.float()
+        return logits, values
+
+
+def attach_exit_head(net: AZNet, exit_block: int, positions: np.ndarray, steps: int = 1000) -> AZNet:
+    """
+    Copy of `net` with an exit head after `exit_block` blocks, trained (trunk
+    frozen) to match the full net's policy (KL) and value (MSE) on `positions`.
+    """
+    cfg = {**net.config, "exit_block": exit_block}
+    out = AZNet(**cfg).to(DEVICE)
+    out.load_state_dict(net.state_dict(), strict=False)          # everything but exit_head.*
+    out.eval()
+    for p in out.parameters():
+        p.requires_grad_(False)
+    for p in out.exit_head.parameters():
+        p.requires_grad_(True)
+
+    opt  = torch.optim.SGD(out.exit_head.parameters(), lr=LR, momentum=MOMENTUM, weight_decay=WEIGHT_DECAY)
+    data = torch.from_numpy(positions).to(DEVICE)
+    for _ in range(steps):
+        x = transform(data[torch.randint(len(data), (BATCH_SIZE,), device=DEVICE)], np.random.randint(8))
+        with torch.no_grad():
+            h, _, _ = out.exit_forward(x)
+            t_logp, t_values = out.finish(h)
+            t_logp = F.log_softmax(t_logp, dim=1)
+        out.exit_head.train()
+        logits, values = out.exit_head(h)
+        loss = (t_logp.exp() * (t_logp - F.log_softmax(logits, dim=1))).sum(dim=1).mean() \
+               + F.mse_loss(values, t_values)
+        opt.zero_grad()
+        loss.backward()
+        opt.step()
+
+    for p in out.parameters():
+        p.requires_grad_(True)
+    return out.eval()
+
+
+# ── Benchmark: strength vs cost per leaf ─────────────────────────────────────
+
+def fixed_sims_match(net_a, net_b, n_pairs: int, n_sims: int) -> dict:
+    """
+    n_pairs pairs of games from random 2-move openings (colours swapped within
+    a pair) at n_sims per move. Returns A's W/D/L and each side's seconds per simulation.
+    """
+    score   = {"A": 0, "B": 0, "draw": 0}
+    seconds = {"A": 0.0, "B": 0.0}
+    moves   = {"A": 0, "B": 0}
+    for _ in range(n_pairs):
+        opening = Gomoku()
+        for _ in range(2):
+            opening.move(int(np.random.choice(opening.legal())))
+        for a_is_black in (True, False):
+            game = opening.clone()
+            while not game.terminal()[0]:
+                side = "A" if (game.player == 1) == a_is_black else "B"
+                t0 = time.perf_counter()
+                pi = mcts(game, net_a if side == "A" else net_b, Node(1.0), root_noise=False, n_sims=n_sims)
+                seconds[side] += time.perf_counter() - t0
+                moves[side]   += 1
+                game.move(int(np.argmax(pi)))
+            winner = game.terminal()[1]
+            if winner == 0:
+                score["draw"] += 1
+            else:
+                score["A" if (winner == 1) == a_is_black else "B"] += 1
+    return {**score, **{f"ms_per_sim_{k}": 1e3 * seconds[k] / max(1, moves[k] * n_sims) for k in seconds}}
+
+
+if __name__ == "__main__":
+    import argparse
+    from az_gomuku5 import load_aznet
+    from distill import training_positions
+
+    parser = argparse.ArgumentParser(description="Early-exit leaf evaluation: strength vs cost per leaf")
+    parser.add_argument("--weights", type=str, default=None, help="AZNet weights (default: random init)")
+    parser.add_argument("--exit-block", type=int, default=3,
+                        help="Block to attach an exit head after, if the checkpoint has none")
+    parser.add_argument("--fit-steps", type=int, default=500, help="Steps for fitting an attached head")
+    parser.add_argument("--positions", type=int, default=4096, help="Replay positions for fitting it")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.5, 0.7, 0.9])
+    parser.add_argument("--pairs", type=int, default=4)
+    parser.add_argument("--sims", type=int, default=100)
+    args = parser.parse_args()
+
+    net = load_aznet(args.weights) if args.weights else AZNet().to(DEVICE).eval()
+    if net.exit_head is None:
+        print(f"No exit head in the checkpoint — fitting one after block {args.exit_block}")
+        net = attach_exit_head(net, args.exit_block, training_positions(net, args.positions), args.fit_steps)
+
+    print(f"Exit after block {net.exit_block} of {len(net.tower)} | {args.sims} sims | {2 * args.pairs} games each")
+    for threshold in args.thresholds:
+        ee = EarlyExitNet(net, threshold)
+        r  = fixed_sims_match(ee, net, args.pairs, args.sims)
+        print(f"  threshold {threshold:.2f}: W{r['A']} D{r['draw']} L{r['B']} vs full tower | "
+              f"exit rate {ee.exited / max(1, ee.rows):5.1%}  blocks/leaf {ee.blocks_per_leaf():5.2f} | "
+              f"ms/sim {r['ms_per_sim_A']:.2f} vs {r['ms_per_sim_B']:.2f}")
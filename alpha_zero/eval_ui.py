@@ -1,14 +1,17 @@
 # models_az5/az_iter0118.pt
 # models_az5/az_iter0150.pt
 
+import os
 import sys
-import copy
 import threading
 import pygame
 import numpy as np
-import torch
 
-from az_gomuku5 import Gomoku, AZNet, mcts, Node, BOARD, DEVICE
+from az_gomuku5 import Gomoku, load_aznet, BOARD
+from search_handle import SearchHandle
+
+SEARCH_THREADS = min(4, os.cpu_count() or 1)   # tree-parallel MCTS threads per search
+PONDER         = True                          # agent keeps searching while the human thinks
 
 # ──────────────────────────────────────────────────────────────────────────────
 # Layout
@@ -209,23 +212,25 @@ def play_match(p1_type, p2_type, p1_path=None, p2_path=None):
 
     nets = {1: None, 2: None}
     if p1_type == 'agent':
-        nets[1] = AZNet().to(DEVICE)
-        nets[1].load_state_dict(torch.load(p1_path, map_location=DEVICE, weights_only=True))
-        nets[1].eval()
+        nets[1] = load_aznet(p1_path)
     if p2_type == 'agent':
-        nets[2] = AZNet().to(DEVICE)
-        nets[2].load_state_dict(torch.load(p2_path, map_location=DEVICE, weights_only=True))
-        nets[2].eval()
+        nets[2] = load_aznet(p2_path)
 
     modes = {1: p1_type, 2: p2_type}
 
+    # One persistent tree per agent; advanced on every move, pondered on the human's time
+    handles = {i: SearchHandle(nets[i], n_threads=SEARCH_THREADS) if nets[i] else None
+               for i in (1, 2)}
+
     # Whether this matchup requires a human-selected opening move for Black
     agent_vs_agent = (p1_type == 'agent' and p2_type == 'agent')
 
     def reset():
+        for h in handles.values():
+            if h:
+                h.reset()
         return (
             Gomoku(),
-            {1: Node(prior=1.0), 2: Node(prior=1.0)},
             None,       # last_action
             'playing',
             0,          # end_winner
@@ -233,28 +238,36 @@ def play_match(p1_type, p2_type, p1_path=None, p2_path=None):
             0,          # review_step (only used in 'done' state)
         )
 
-    game, roots, last_action, state, end_winner, history, review_step = reset()
+    game, last_action, state, end_winner, history, review_step = reset()
 
     agent_result   = [None]
     agent_thinking = [False]
     hint_action    = [None]
     hint_thinking  = [False]
 
-    # Network used for hints (whichever agent net is loaded)
-    hint_net = nets[1] or nets[2]
+    # Hints come from an agent's own tree: on the human's turn its root is the
+    # human's position (already pondered), so a hint is mostly a top-up.
+    hint_handle = handles[1] or handles[2]
 
-    def run_hint(g, net):
-        pi = mcts(g.clone(), net, Node(prior=1.0), root_noise=False, n_sims=400)
-        hint_action[0] = int(np.argmax(pi))
+    def run_hint(handle, generation):
+        # None (or a later generation) means the human moved or the game restarted meanwhile
+        pi = handle.search(400, generation)
+        if pi is not None and handle.generation == generation:
+            hint_action[0] = int(np.argmax(pi))
         hint_thinking[0] = False
 
-    def run_agent(g, net, root):
-        # Deep copy so the search thread owns its own game/root state,
-        # preventing corruption if the main thread advances the game concurrently.
-        pi = mcts(g.clone(), net, copy.deepcopy(root), root_noise=False, n_sims=400)
+    def run_agent(handle):
+        # The handle serialises the search with the UI thread's advance() calls;
+        # visits already pondered or reused count toward the 400.
+        pi = handle.search(400)
         agent_result[0] = int(np.argmax(pi))
         agent_thinking[0] = False
 
+    def advance_agents(action):
+        for h in handles.values():
+            if h:
+                h.advance(action)
+
     running  = True
     back_btn = fwd_btn = restart_btn = quit_btn = hint_btn = None
 
@@ -273,17 +286,18 @@ def play_match(p1_type, p2_type, p1_path=None, p2_path=None):
                 and not agent_thinking[0] and agent_result[0] is None \
                 and not waiting_first:
             agent_thinking[0] = True
+            handles[p].stop_pondering()              # our turn: no longer the opponent's time
             threading.Thread(target=run_agent,
-                             args=(game, nets[p], roots[p]), daemon=True).start()
+                             args=(handles[p],), daemon=True).start()
 
         # Apply agent move
         if state == 'playing' and modes[p] == 'agent' \
                 and agent_result[0] is not None and not waiting_first:
             action = agent_result[0]
             agent_result[0] = None
-            for i in (1, 2):
-                if modes[i] == 'agent':
-                    roots[i] = roots[i].children.get(action, Node(prior=1.0))
+            advance_agents(action)
+            if PONDER and modes[3 - p] == 'human':
+                handles[p].start_pondering()
             history.append((action, p))
             last_action = action
             game.move(action)
@@ -301,7 +315,7 @@ def play_match(p1_type, p2_type, p1_path=None, p2_path=None):
                 if event.key in (pygame.K_q, pygame.K_ESCAPE):
                     running = False
                 elif event.key == pygame.K_r and state == 'done':
-                    game, roots, last_action, state, end_winner, history, review_step = reset()
+                    game, last_action, state, end_winner, history, review_step = reset()
                     agent_result[0] = None
                     agent_thinking[0] = False
                     hint_action[0] = None
@@ -319,7 +333,7 @@ def play_match(p1_type, p2_type, p1_path=None, p2_path=None):
                     elif fwd_btn and fwd_btn.collidepoint(event.pos) and review_step < len(history):
                         review_step += 1
                     elif restart_btn and restart_btn.collidepoint(event.pos):
-                        game, roots, last_action, state, end_winner, history, review_step = reset()
+                        game, last_action, state, end_winner, history, review_step = reset()
                         agent_result[0] = None
                         agent_thinking[0] = False
                         hint_action[0] = None
@@ -334,8 +348,7 @@ def play_match(p1_type, p2_type, p1_path=None, p2_path=None):
                         if 0 <= row < BOARD and 0 <= col < BOARD:
                             action = rc_to_action(row, col)
                             if action in game.legal():
-                                for i in (1, 2):
-                                    roots[i] = roots[i].children.get(action, Node(prior=1.0))
+                                advance_agents(action)
                                 history.append((action, p))
                                 last_action = action
                                 game.move(action)
@@ -345,10 +358,10 @@ def play_match(p1_type, p2_type, p1_path=None, p2_path=None):
                     # Hint button click
                     if hint_btn and hint_btn.collidepoint(event.pos) \
                             and not hint_thinking[0] and hint_action[0] is None \
-                            and hint_net is not None:
+                            and hint_handle is not None:
                         hint_thinking[0] = True
-                        threading.Thread(target=run_hint,
-                                         args=(game, hint_net), daemon=True).start()
+                        threading.Thread(target=run_hint, daemon=True,
+                                         args=(hint_handle, hint_handle.generation)).start()
                     else:
                         mx, my = event.pos
                         if my < HEIGHT:
@@ -356,9 +369,7 @@ def play_match(p1_type, p2_type, p1_path=None, p2_path=None):
                             if 0 <= row < BOARD and 0 <= col < BOARD:
                                 action = rc_to_action(row, col)
                                 if action in game.legal():
-                                    for i in (1, 2):
-                                        if modes[i] == 'agent':
-                                            roots[i] = roots[i].children.get(action, Node(prior=1.0))
+                                    advance_agents(action)
                                     hint_action[0] = None
                                     history.append((action, p))
                                     last_action = action
@@ -390,7 +401,7 @@ def play_match(p1_type, p2_type, p1_path=None, p2_path=None):
             if (modes[p] == 'human' or waiting_first) and my < HEIGHT:
                 draw_hover(screen, game.board, mx, my)
 
-            can_hint = (hint_net is not None and modes[p] == 'human'
+            can_hint = (hint_handle is not None and modes[p] == 'human'
                         and not waiting_first)
             if waiting_first:
                 hint_btn = draw_status(screen, font_status,
@@ -406,12 +417,16 @@ def play_match(p1_type, p2_type, p1_path=None, p2_path=None):
                 hint_action[0] = None
                 dots = "." * (1 + (pygame.time.get_ticks() // 400) % 3)
                 who  = "Black" if p == 1 else "White"
+                snap = handles[p].snapshot(wait=False)   # consistent, never blocks the render loop
                 hint_btn = draw_status(screen, font_status,
-                                       f"Agent ({who}) thinking{dots}")
+                                       f"Agent ({who}) thinking{dots}  {min(snap['root_n'], 400)}/400")
 
         pygame.display.flip()
         clock.tick(30)
 
+    for h in handles.values():
+        if h:
+            h.close()
     pygame.quit()
 
 
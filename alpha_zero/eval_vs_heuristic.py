@@ -7,11 +7,10 @@ Prints win/draw/loss metrics at the end.
 import os
 import sys
 import numpy as np
-import torch
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from az_gomuku5 import (Gomoku, AZNet, Node, mcts,
+from az_gomuku5 import (Gomoku, AZNet, Node, mcts, load_aznet,
                          BOARD, DEVICE, N_SIMS as DEFAULT_SIMS)
 from heuristics import heuristic_move
 
@@ -25,17 +24,6 @@ N_SIMS  = 400
 
 # ── Helpers ──────────────────────────────────────────────────────────────────
 
-def load_net(path: str) -> AZNet:
-    net = AZNet().to(DEVICE)
-    ckpt = torch.load(path, map_location=DEVICE, weights_only=False)
-    if isinstance(ckpt, dict) and "model" in ckpt:
-        net.load_state_dict(ckpt["model"])
-    else:
-        net.load_state_dict(ckpt)
-    net.eval()
-    return net
-
-
 def board_to_heuristic(board: np.ndarray) -> np.ndarray:
     """Convert 0/1/2 board to 0/1/-1 board for heuristic_move."""
     h = board.copy().astype(np.int8)
@@ -88,7 +76,7 @@ def run_eval(weights_path: str = DEFAULT_WEIGHTS,
              n_games: int = N_GAMES,
              n_sims: int = N_SIMS):
     print(f"Loading model: {weights_path}")
-    net = load_net(weights_path)
+    net = load_aznet(weights_path, DEVICE)
     print(f"Device: {DEVICE} | Games: {n_games} | MCTS sims: {n_sims}")
     print(f"Agent plays {n_games // 2} games as Black, {n_games // 2} as White\n")
 
@@ -0,0 +1,161 @@
+"""
+Inference export for AZNet and Mixed-Training's PolicyValueNet.
+
+In eval mode every Conv2d → BatchNorm2d pair is a fixed affine map, so the BN
+can be folded into the conv's weight and bias, which removes one kernel launch
+and one memory pass per conv. The folded network is then traced and frozen
+with TorchScript, and torch.jit.optimize_for_inference (run at load time)
+fuses the remaining conv + add + ReLU patterns where the backend supports it.
+The result is a self-contained .ts file that needs no model class to load:
+
+    python export_inference.py --weights models_az5/az_iter0150.pt --out models_az5/az_iter0150.ts
+    python export_inference.py --mixed Mixed-Training/checkpoint.pt --out mixed.ts
+
+predict._load_model() accepts the .ts file directly (see load_frozen). Every
+export is reloaded and checked against the original network (max abs difference of both heads) and timed at
+batch 1 and batch 50.
+"""
+
+import copy
+import importlib.util
+import os
+import time
+import warnings
+
+import torch
+import torch.nn as nn
+from torch.nn.utils.fusion import fuse_conv_bn_eval
+
+_DIR = os.path.dirname(os.path.abspath(__file__))
+ATOL = 1e-4                  # max abs output difference accepted after folding
+
+
+# ── 1. BN folding ────────────────────────────────────────────────────────────
+
+def fold_bn(net: nn.Module) -> nn.Module:
+    """
+    Returns an eval-mode copy of `net` with every BatchNorm2d that directly
+    follows a Conv2d inside an nn.Sequential folded into that conv. Works for
+    any module built from Sequential conv/BN stacks (AZNet, PolicyValueNet).
+    """
+    net = copy.deepcopy(net).eval()
+    for seq in [m for m in net.modules() if isinstance(m, nn.Sequential)]:
+        for i in range(len(seq) - 1):
+            if isinstance(seq[i], nn.Conv2d) and isinstance(seq[i + 1], nn.BatchNorm2d):
+                seq[i]     = fuse_conv_bn_eval(seq[i], seq[i + 1])
+                seq[i + 1] = nn.Identity()
+    return net
+
+
+def freeze(net: nn.Module, board: int = 9, in_planes: int = 3) -> torch.jit.ScriptModule:
+    """Traces and freezes the (folded) network; weights become graph constants."""
+    example = torch.zeros(2, in_planes, board, board, device=next(net.parameters()).device)
+    with torch.no_grad(), warnings.catch_warnings():
+        warnings.filterwarnings("ignore", category=FutureWarning, module=r"torch\.jit")
+        return torch.jit.freeze(torch.jit.trace(net.eval(), example))
+
+
+def optimize(frozen: torch.jit.ScriptModule) -> torch.jit.ScriptModule:
+    """
+    Backend-specific fusion pass. Its output cannot always be serialised
+    (prepacked weights), so it is applied after loading rather than before saving.
+    """
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", category=FutureWarning, module=r"torch\.jit")
+        return torch.jit.optimize_for_inference(frozen)
+
+
+def load_frozen(path: str, device="cpu") -> torch.jit.ScriptModule:
+    """Loads an exported .ts model; called like the original net, returns the same heads."""
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", category=FutureWarning, module=r"torch\.jit")
+        return optimize(torch.jit.load(path, map_location=device).eval())
+
+
+def export(net: nn.Module, out_path: str, board: int = 9, in_planes: int = 3) -> torch.jit.ScriptModule:
+    """fold_bn + freeze, verified against `net`, saved to out_path; returns the reloaded model."""
+    frozen = freeze(fold_bn(net), board, in_planes)
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", category=FutureWarning, module=r"torch\.jit")
+        torch.jit.save(frozen, out_path)
+    loaded = load_frozen(out_path, next(net.parameters()).device)
+    diff   = max_abs_diff(net, loaded, board, in_planes)
+    if diff > ATOL:
+        raise RuntimeError(f"exported model differs from the original by {diff:.2e} (> {ATOL:.0e})")
+    return loaded
+
+
+# ── 2. Checks and timing ─────────────────────────────────────────────────────
+
+def random_states(n: int, board: int = 9, in_planes: int = 3, device="cpu") -> torch.Tensor:
+    x = torch.zeros(n, in_planes, board, board, device=device)
+    x[:, :2] = (torch.rand(n, 2, board, board, device=device) < 0.2).float()
+    x[:, 1] *= 1 - x[:, 0]
+    x[:, 2:] = 1.0
+    return x
+
+
+@torch.no_grad()
+def max_abs_diff(a, b, board: int = 9, in_planes: int = 3) -> float:
+    x = random_states(64, board, in_planes, next(a.parameters()).device)
+    return max((pa - pb).abs().max().item() for pa, pb in zip(a(x), b(x)))
+
+
+@torch.no_grad()
+def ms_per_forward(net, batch: int, board: int = 9, in_planes: int = 3,
+                   n_iters: int = 200, device="cpu") -> float:
+    x = random_states(batch, board, in_planes, device)
+    for _ in range(10):
+        net(x)
+    t0 = time.perf_counter()
+    for _ in range(n_iters):
+        net(x)
+    return (time.perf_counter() - t0) / n_iters * 1e3
+
+
+# ── 3. Loading Mixed-Training checkpoints (AZNet: az_gomuku5.load_aznet) ─────
+
+def load_policy_value_net(path: str) -> nn.Module:
+    """Mixed-Training checkpoint (with 'config' and 'net') → PolicyValueNet."""
+    spec  = importlib.util.spec_from_file_location(
+        "mixed_training_model", os.path.join(_DIR, "Mixed-Training", "model.py"))
+    model = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(model)
+
+    ckpt = torch.load(path, map_location="cpu", weights_only=False)
+    cfg  = ckpt["config"]
+    net  = model.PolicyValueNet(
+        board_size     = cfg.get("board_size",     9),
+        channels       = cfg.get("channels",       64),
+        num_res_blocks = cfg.get("num_res_blocks", 4),
+    )
+    net.load_state_dict({k.replace("_orig_mod.", ""): v for k, v in ckpt["net"].items()})
+    return net.eval()
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Fold BN, freeze and export an inference model")
+    src = parser.add_mutually_exclusive_group()
+    src.add_argument("--weights", type=str, help="AZNet weights / checkpoint")
+    src.add_argument("--mixed", type=str, help="Mixed-Training PolicyValueNet checkpoint")
+    parser.add_argument("--out", type=str, required=True, help="Output .ts file")
+    args = parser.parse_args()
+
+    from az_gomuku5 import AZNet, load_aznet
+    if args.mixed:
+        net = load_policy_value_net(args.mixed)
+    elif args.weights:
+        net = load_aznet(args.weights, "cpu")
+    else:
+        net = AZNet().eval()
+        print("No weights given — exporting a randomly initialised AZNet")
+
+    folded = fold_bn(net)
+    frozen = export(net, args.out)
+    print(f"Saved {args.out}  (max abs diff folded={max_abs_diff(net, folded):.1e} "
+          f"frozen={max_abs_diff(net, frozen):.1e})")
+    for batch in (1, 50):
+        base, fold, froz = (ms_per_forward(m, batch) for m in (net, folded, frozen))
+        print(f"  batch {batch:>2}:  eager {base:6.2f} ms   BN-folded {fold:6.2f} ms   "
+              f"frozen {froz:6.2f} ms  (x{base / froz:.2f})")
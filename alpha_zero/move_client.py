@@ -0,0 +1,92 @@
+"""
+Client stub for move_server.py — same call shape as predict.predict, but the
+search runs in the long-lived server process. Imports nothing heavier than
+the standard library, so a client is ready in milliseconds.
+
+Usage:
+    from move_client import predict
+    row, col = predict(board_state, current_player)                 # server default sims
+    row, col = predict(board_state, current_player, time_ms=300)    # wall-clock budget
+
+board_state may be a numpy array or nested lists, in either format predict()
+accepts (0/1/2 or 0/+1/-1). One connection per process is kept open and
+reused; set MOVE_SERVER to "host:port" or a socket path to override the
+default Unix socket.
+"""
+
+import json
+import os
+import socket
+import threading
+
+DEFAULT_ADDRESS = os.environ.get("MOVE_SERVER", "/tmp/az_move_server.sock")
+
+_conns = threading.local()        # one connection per (thread, address)
+
+
+def _connect(address: str):
+    if ":" in address and not os.path.exists(address):
+        host, port = address.rsplit(":", 1)
+        sock = socket.create_connection((host, int(port)))
+    else:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(address)
+    return sock, sock.makefile("rb")
+
+
+def predict(board_state,
+            current_player: int = 1,
+            n_sims: int | None = None,
+            time_ms: float | None = None,
+            address: str = DEFAULT_ADDRESS) -> tuple[int, int]:
+    """(row, col) chosen by the move server. Raises RuntimeError on a server-side error."""
+    board = board_state.tolist() if hasattr(board_state, "tolist") else board_state
+    msg   = {"board": board, "player": int(current_player)}
+    if n_sims is not None:
+        msg["n_sims"] = int(n_sims)
+    if time_ms is not None:
+        msg["time_ms"] = float(time_ms)
+
+    cache = getattr(_conns, "by_address", None)
+    if cache is None:
+        cache = _conns.by_address = {}
+    if address not in cache:
+        cache[address] = _connect(address)
+    sock, reader = cache[address]
+    try:
+        sock.sendall((json.dumps(msg) + "\n").encode())
+        line = reader.readline()
+    except OSError:
+        del cache[address]
+        raise
+    if not line:
+        del cache[address]
+        raise ConnectionError("move server closed the connection")
+    reply = json.loads(line)
+    if "error" in reply:
+        raise RuntimeError(reply["error"])
+    return tuple(reply["move"])
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    parser = argparse.ArgumentParser(description="Latency / throughput check against a running move server")
+    parser.add_argument("--address", type=str, default=DEFAULT_ADDRESS)
+    parser.add_argument("--clients", type=int, default=8, help="Concurrent requests")
+    parser.add_argument("--sims", type=int, default=200)
+    args = parser.parse_args()
+
+    empty = [[0] * 9 for _ in range(9)]
+    t0 = time.perf_counter()
+    move = predict(empty, 1, n_sims=1, address=args.address)
+    print(f"  first request (connect + 1 sim): {(time.perf_counter() - t0) * 1e3:.1f} ms -> {move}")
+
+    for n in (1, args.clients):
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(n) as pool:
+            list(pool.map(lambda _: predict(empty, 1, n_sims=args.sims, address=args.address), range(n)))
+        dt = time.perf_counter() - t0
+        print(f"  {n:>3} concurrent x {args.sims} sims: {dt:6.2f}s  ({n / dt:6.2f} positions/s)")
@@ -0,0 +1,173 @@
+"""
+Local move server: loads AZNet once and answers predict() requests from many
+client processes, merging concurrent requests into shared batched searches.
+
+Every process that imports predict.py pays for importing torch, building
+AZNet and loading weights, and then searches alone with batch-1 forward
+passes. The server does that once. Each request becomes a game + root in one
+pool; a single search thread repeatedly runs one simulation for every
+in-flight request with ONE forward pass over all their leaves (the
+select/evaluate/finish steps of az_gomuku5's batched self-play), so N
+concurrent clients share each forward pass. Requests join and leave the pool
+between simulations, each with its own budget — a simulation count or a
+wall-clock limit.
+
+Protocol: newline-delimited JSON over a Unix socket (default) or localhost
+TCP. Request  {"board": [[...9x9...]], "player": 1, "n_sims": 400}
+              ("time_ms": 500 instead of / as well as "n_sims")
+Response      {"move": [row, col], "sims": 400}   or   {"error": "..."}
+
+Run:     python move_server.py [--weights PATH] [--socket PATH | --port 5555]
+Client:  from move_client import predict      (no torch import; see move_client.py)
+"""
+
+import json
+import os
+import queue
+import socketserver
+import threading
+import time
+
+import numpy as np
+
+from az_gomuku5 import Node, _select_leaves, _eval_leaves, _finish_leaves, N_SIMS
+from predict import _load_model, _make_game, _DEFAULT_WEIGHTS
+
+DEFAULT_SOCKET = "/tmp/az_move_server.sock"
+MAX_SIMS       = 20_000      # cap on a single request's simulation budget
+
+
+# ── 1. Batched search over all in-flight requests ────────────────────────────
+
+class _Request:
+    __slots__ = ("game", "root", "n_sims", "deadline", "done", "reply")
+
+    def __init__(self, game, n_sims: int, deadline: float | None):
+        self.game     = game
+        self.root     = Node(prior=1.0)
+        self.n_sims   = n_sims
+        self.deadline = deadline
+        self.done     = threading.Event()
+        self.reply    = None
+
+    def finished(self, now: float) -> bool:
+        if not self.root.children:                  # always expand the root first
+            return False
+        if self.deadline is not None and now >= self.deadline:
+            return True
+        return self.root.N >= self.n_sims
+
+
+class BatchedSearcher:
+    """One thread that advances every pending request by one simulation per forward pass."""
+
+    def __init__(self, net):
+        self.net      = net
+        self.incoming = queue.Queue()
+        self.n_steps  = 0
+        self.n_leaves = 0
+        self._thread  = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def submit(self, game, n_sims: int, time_ms: float | None) -> dict:
+        deadline = None if time_ms is None else time.perf_counter() + time_ms / 1000
+        req = _Request(game, n_sims, deadline)
+        self.incoming.put(req)
+        req.done.wait()
+        return req.reply
+
+    def _loop(self):
+        active = []
+        while True:
+            # Block only when idle; otherwise pick up whatever arrived since the last step
+            try:
+                while True:
+                    active.append(self.incoming.get(block=not active))
+            except queue.Empty:
+                pass
+
+            games = [r.game for r in active]
+            roots = [r.root for r in active]
+            group = list(range(len(active)))
+            try:
+                selected = _select_leaves(games, roots, group)
+                _finish_leaves(games, group, selected, *_eval_leaves(self.net, selected[4]))
+            except Exception as e:                      # fail the batch, keep serving
+                for r in active:
+                    r.reply = {"error": f"{type(e).__name__}: {e}"}
+                    r.done.set()
+                active = []
+                continue
+            self.n_steps  += 1
+            self.n_leaves += len(selected[4])
+
+            now, still = time.perf_counter(), []
+            for r in active:
+                if r.finished(now):
+                    visits = np.zeros(len(r.game.board.flat))
+                    for a, child in r.root.children.items():
+                        visits[a] = child.N
+                    r.reply = {"move": list(divmod(int(np.argmax(visits)), r.game.board.shape[0])),
+                               "sims": r.root.N}
+                    r.done.set()
+                else:
+                    still.append(r)
+            active = still
+
+
+# ── 2. Socket front-end ──────────────────────────────────────────────────────
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                msg  = json.loads(line)
+                game = _make_game(np.array(msg["board"]), int(msg["player"]))
+                if game.terminal()[0] or not game.legal():
+                    raise ValueError("position is already decided")
+                time_ms = msg.get("time_ms")
+                n_sims  = msg.get("n_sims", MAX_SIMS if time_ms is not None else N_SIMS)
+                reply   = self.server.searcher.submit(game, min(int(n_sims), MAX_SIMS), time_ms)
+            except Exception as e:                      # report, keep the connection open
+                reply = {"error": f"{type(e).__name__}: {e}"}
+            self.wfile.write((json.dumps(reply) + "\n").encode())
+            self.wfile.flush()
+
+
+class UnixMoveServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class TCPMoveServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads      = True
+    allow_reuse_address = True
+
+
+def serve(weights_path: str | None = None, socket_path: str = DEFAULT_SOCKET, port: int | None = None):
+    net = _load_model(weights_path)
+    if port is not None:
+        server = TCPMoveServer(("127.0.0.1", port), _Handler)
+        where  = f"127.0.0.1:{port}"
+    else:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = UnixMoveServer(socket_path, _Handler)
+        where  = socket_path
+    server.searcher = BatchedSearcher(net)
+    print(f"Move server listening on {where} (weights: {weights_path or _DEFAULT_WEIGHTS})", flush=True)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if port is None and os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Batched local move server for predict() clients")
+    parser.add_argument("--weights", type=str, default=None)
+    parser.add_argument("--socket", type=str, default=DEFAULT_SOCKET, help="Unix socket path")
+    parser.add_argument("--port", type=int, default=None, help="Listen on localhost TCP instead")
+    args = parser.parse_args()
+    serve(args.weights, args.socket, args.port)
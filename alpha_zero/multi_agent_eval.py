@@ -2,17 +2,26 @@
 # models_az5/az_iter0150.pt
 
 import numpy as np
-import torch
-import torch.nn.functional as F
 
-from az_gomuku5 import (Gomoku, AZNet, Node, _expand, _select, _backup,
-                         BOARD, DEVICE)
+try:
+    from alpha_zero.az_gomuku5 import (Gomoku, Node, _expand, _select, _backup,
+                                       evaluate, load_aznet, BOARD, DEVICE)
+except ModuleNotFoundError:
+    from az_gomuku5 import (Gomoku, Node, _expand, _select, _backup,
+                            evaluate, load_aznet, BOARD, DEVICE)
+
+
+BACKEND = "eager"      # inference backend for both models (backends.py): eager | compiled | onnx | numpy
 
 
 def load_net(path):
-    net = AZNet().to(DEVICE)
-    net.load_state_dict(torch.load(path, map_location=DEVICE, weights_only=True))
-    net.eval()
+    net = load_aznet(path, DEVICE)
+    if BACKEND != "eager":
+        try:
+            from alpha_zero.backends import make_backend
+        except ModuleNotFoundError:
+            from backends import make_backend
+        net = make_backend(BACKEND, net)
     return net
 
 
@@ -25,16 +34,9 @@ def _batched_mcts(games, roots, net, n_sims):
     # Expand unexpanded roots in one batch
     unexpanded = [i for i in range(n) if not roots[i].expanded]
     if unexpanded:
-        states = torch.tensor(
-            np.stack([games[i].state() for i in unexpanded]), device=DEVICE)
-        with torch.no_grad():
-            logits, _ = net(states)
+        priors, _ = evaluate(net, np.stack([games[i].state() for i in unexpanded]))
         for idx, i in enumerate(unexpanded):
-            legal = games[i].legal()
-            mask = torch.full((BOARD * BOARD,), float('-inf'), device=DEVICE)
-            mask[legal] = 0.0
-            priors = F.softmax(logits[idx] + mask, dim=0).cpu().numpy()
-            _expand(roots[i], priors, legal)
+            _expand(roots[i], priors[idx], games[i].legal())
 
     # Simulations
     for _ in range(n_sims):
@@ -65,19 +67,13 @@ def _batched_mcts(games, roots, net, n_sims):
         # Batched evaluation
         values = np.zeros(n)
         if leaf_states:
-            states_t = torch.tensor(np.stack(leaf_states), device=DEVICE)
-            with torch.no_grad():
-                logits, net_vals = net(states_t)
+            priors, net_vals = evaluate(net, np.stack(leaf_states))
 
             valid_idx = 0
             for i in range(n):
                 if not dones[i]:
-                    legal = games[i].legal()
-                    mask = torch.full((BOARD * BOARD,), float('-inf'), device=DEVICE)
-                    mask[legal] = 0.0
-                    priors = F.softmax(logits[valid_idx] + mask, dim=0).cpu().numpy()
-                    _expand(paths[i][-1], priors, legal)
-                    values[i] = net_vals[valid_idx].item()
+                    _expand(paths[i][-1], priors[valid_idx], games[i].legal())
+                    values[i] = net_vals[valid_idx]
                     valid_idx += 1
                 else:
                     values[i] = 0.0 if winners[i] == 0 else -1.0
@@ -0,0 +1,363 @@
+"""
+Torch-free inference: a NumPy-only forward pass for AZNet / Mixed-Training's
+PolicyValueNet and a predict() that never imports torch.
+
+Importing predict.py pulls in all of PyTorch just to run a 9x9 ResNet, which
+dominates cold-start time and memory when a test harness spawns one process
+per game. Here the network is exported once (this step does need torch) to a
+.npz file with every BatchNorm folded into its conv, and evaluated with NumPy:
+activations are kept channels-last (B, 9, 9, C) so each 3x3 conv is one
+im2col (sliding_window_view) + one matmul, and 1x1 convs / linears are plain
+matmuls.
+
+    python numpy_engine.py --export models_az5/az_iter0150.pt            # → az_iter0150.npz
+    python numpy_engine.py --export Mixed-Training/checkpoint.pt --mixed  # PolicyValueNet
+
+    from alpha_zero.numpy_engine import predict
+    row, col = predict(board_state, current_player)        # same call as predict.predict
+
+The search here is the plain single-threaded mcts() of az_gomuku5 (same
+C_PUCT, no root noise), re-stated without torch. Running the module with
+--bench compares cold start, peak memory and latency against predict.py.
+"""
+
+import os
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+BOARD  = 9
+WIN    = 5
+N_SIMS = 400
+C_PUCT = 1.5
+
+_DIR = os.path.dirname(os.path.abspath(__file__))
+_DEFAULT_WEIGHTS = os.path.join(_DIR, "..", "models_az5", "az_iter0150.npz")
+
+# state-dict prefixes of the two model families → common .npz names
+_PREFIXES = {
+    "aznet": {"stem": "stem", "tower": "tower", "p_conv": "p_conv", "p_fc": "p_fc",
+              "v_conv": "v_conv", "v_fc": "v_fc"},
+    "pvnet": {"stem": "stem", "tower": "trunk", "p_conv": "policy_conv", "p_fc": "policy_fc",
+              "v_conv": "value_conv", "v_fc": "value_fc"},
+}
+
+
+# ── 1. Export (needs torch only here) ────────────────────────────────────────
+
+def _fold(sd: dict, conv: str, bn: str, eps: float = 1e-5) -> tuple[np.ndarray, np.ndarray]:
+    """Conv weight (F, C, k, k) + following BN → channels-last matmul weight (k*k*C, F) and bias."""
+    w     = sd[f"{conv}.weight"].astype(np.float64)
+    scale = sd[f"{bn}.weight"] / np.sqrt(sd[f"{bn}.running_var"] + eps)
+    bias  = sd[f"{bn}.bias"] - sd[f"{bn}.running_mean"] * scale
+    w     = w * scale[:, None, None, None]
+    f, c, k, _ = w.shape
+    # row order (ky, kx, c) matches the im2col patches built in _conv3x3
+    w = w.transpose(2, 3, 1, 0).reshape(k * k * c, f)
+    return w.astype(np.float32), bias.astype(np.float32)
+
+
+def export_npz(state_dict: dict, out_path: str, kind: str = "aznet"):
+    """
+    Writes a folded .npz from an AZNet (kind="aznet") or PolicyValueNet
+    (kind="pvnet") state dict. Values may be torch tensors or arrays.
+    """
+    sd  = {k.replace("_orig_mod.", ""): (v.detach().cpu().numpy() if hasattr(v, "detach") else np.asarray(v))
+           for k, v in state_dict.items()}
+    pre = _PREFIXES[kind]
+    out = {"kind": np.array(kind)}
+
+    out["stem_w"], out["stem_b"] = _fold(sd, f"{pre['stem']}.0", f"{pre['stem']}.1")
+    n_blocks = len({k.split(".")[1] for k in sd if k.startswith(pre["tower"] + ".")})
+    for i in range(n_blocks):
+        blk = f"{pre['tower']}.{i}.net"
+        out[f"b{i}_w1"], out[f"b{i}_b1"] = _fold(sd, f"{blk}.0", f"{blk}.1")
+        out[f"b{i}_w2"], out[f"b{i}_b2"] = _fold(sd, f"{blk}.3", f"{blk}.4")
+    for head in ("p_conv", "v_conv"):
+        out[f"{head}_w"], out[f"{head}_b"] = _fold(sd, f"{pre[head]}.0", f"{pre[head]}.1")
+
+    # policy FC consumes torch's channel-major flatten of (2, 9, 9); permute its
+    # input rows once here so the forward pass can flatten channels-last directly
+    w = sd[f"{pre['p_fc']}.weight"]
+    n_out, n_in = w.shape
+    c = n_in // (BOARD * BOARD)
+    out["p_fc_w"] = w.reshape(n_out, c, BOARD * BOARD).transpose(2, 1, 0).reshape(n_in, n_out).astype(np.float32)
+    out["p_fc_b"] = sd[f"{pre['p_fc']}.bias"].astype(np.float32)
+    out["v_fc1_w"] = sd[f"{pre['v_fc']}.0.weight"].T.astype(np.float32).copy()
+    out["v_fc1_b"] = sd[f"{pre['v_fc']}.0.bias"].astype(np.float32)
+    out["v_fc2_w"] = sd[f"{pre['v_fc']}.2.weight"].T.astype(np.float32).copy()
+    out["v_fc2_b"] = sd[f"{pre['v_fc']}.2.bias"].astype(np.float32)
+    np.savez(out_path, **out)
+
+
+def export_checkpoint(path: str, out_path: str | None = None, mixed: bool = False) -> str:
+    """AZNet checkpoint / state dict, or Mixed-Training checkpoint (mixed=True) → .npz."""
+    import torch
+    ckpt = torch.load(path, map_location="cpu", weights_only=False)
+    if mixed:
+        sd, kind = ckpt["net"], "pvnet"
+    else:
+        sd, kind = (ckpt["model"] if isinstance(ckpt, dict) and "model" in ckpt else ckpt), "aznet"
+    out_path = out_path or os.path.splitext(path)[0] + ".npz"
+    export_npz(sd, out_path, kind)
+    return out_path
+
+
+# ── 2. NumPy forward pass ────────────────────────────────────────────────────
+
+def _conv3x3(x: np.ndarray, w: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """x (B, H, W, C) → (B, H, W, F), 'same' padding, via im2col + matmul."""
+    n, h, wd, c = x.shape
+    xp   = np.pad(x, ((0, 0), (1, 1), (1, 1), (0, 0)))
+    cols = sliding_window_view(xp, (3, 3), axis=(1, 2))          # (B, H, W, C, 3, 3)
+    cols = cols.transpose(0, 1, 2, 4, 5, 3).reshape(n * h * wd, 9 * c)
+    return (cols @ w + b).reshape(n, h, wd, -1)
+
+
+class NumpyNet:
+    """
+    Callable like the torch model it was exported from, on NumPy arrays:
+    states (B, 3, 9, 9) → AZNet: (logits (B, 81), value (B, 1));
+                          PolicyValueNet: (log_policy (B, 81), value (B,)).
+    """
+    def __init__(self, path: str):
+        with np.load(path) as f:
+            self.p = {k: f[k] for k in f.files}
+        self.kind     = str(self.p.pop("kind"))
+        self.n_blocks = sum(1 for k in self.p if k.endswith("_w1"))
+
+    def __call__(self, states: np.ndarray):
+        p = self.p
+        x = np.ascontiguousarray(np.asarray(states, dtype=np.float32).transpose(0, 2, 3, 1))
+        x = np.maximum(_conv3x3(x, p["stem_w"], p["stem_b"]), 0)
+        for i in range(self.n_blocks):
+            h = np.maximum(_conv3x3(x, p[f"b{i}_w1"], p[f"b{i}_b1"]), 0)
+            x = np.maximum(_conv3x3(h, p[f"b{i}_w2"], p[f"b{i}_b2"]) + x, 0)
+
+        n = len(x)
+        pol = np.maximum(x @ p["p_conv_w"] + p["p_conv_b"], 0).reshape(n, -1)
+        val = np.maximum(x @ p["v_conv_w"] + p["v_conv_b"], 0).reshape(n, -1)
+        logits = pol @ p["p_fc_w"] + p["p_fc_b"]
+        value  = np.tanh(np.maximum(val @ p["v_fc1_w"] + p["v_fc1_b"], 0) @ p["v_fc2_w"] + p["v_fc2_b"])
+
+        if self.kind == "pvnet":
+            logits = logits - logits.max(1, keepdims=True)
+            return logits - np.log(np.exp(logits).sum(1, keepdims=True)), value[:, 0]
+        return logits, value
+
+
+# ── 3. Torch-free search and predict() ───────────────────────────────────────
+
+class _Game:
+    """Minimal Gomoku state (0 empty, 1 black, 2 white) — the parts mcts needs."""
+    __slots__ = ("board", "player", "last", "n_moves")
+
+    def __init__(self, board: np.ndarray, player: int, last=None):
+        self.board   = board
+        self.player  = player
+        self.last    = last
+        self.n_moves = int(np.count_nonzero(board))
+
+    def clone(self):
+        return _Game(self.board.copy(), self.player, self.last)
+
+    def legal(self) -> list:
+        return list(np.flatnonzero(self.board == 0))
+
+    def move(self, action: int):
+        self.last = divmod(action, BOARD)
+        self.board[self.last] = self.player
+        self.n_moves += 1
+        self.player = 3 - self.player
+
+    def terminal(self):
+        if self.last is not None:
+            r, c = self.last
+            p = self.board[r, c]
+            for dr, dc in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                cnt = 1
+                for s in (1, -1):
+                    nr, nc = r + s * dr, c + s * dc
+                    while 0 <= nr < BOARD and 0 <= nc < BOARD and self.board[nr, nc] == p:
+                        cnt += 1; nr += s * dr; nc += s * dc
+                if cnt >= WIN:
+                    return True, p
+        if self.n_moves == BOARD * BOARD:
+            return True, 0
+        return False, None
+
+    def state(self) -> np.ndarray:
+        s = np.zeros((3, BOARD, BOARD), dtype=np.float32)
+        s[0] = self.board == self.player
+        s[1] = self.board == 3 - self.player
+        s[2] = float(self.player == 1)
+        return s
+
+
+class _Node:
+    __slots__ = ("P", "N", "W", "children")
+
+    def __init__(self, prior: float):
+        self.P, self.N, self.W, self.children = prior, 0, 0.0, {}
+
+
+def _evaluate(game: _Game, net: NumpyNet):
+    logits, v = net(game.state()[None])
+    legal  = game.legal()
+    logits = logits[0, legal]
+    priors = np.exp(logits - logits.max())
+    return legal, priors / priors.sum(), float(np.ravel(v)[0])
+
+
+def _select(node: _Node):
+    sq = node.N ** 0.5
+    best_score, best_a, best_child = -1e9, None, None
+    for a, child in node.children.items():
+        q     = child.W / child.N if child.N else 0.0
+        score = q + C_PUCT * child.P * sq / (1 + child.N)
+        if score > best_score:
+            best_score, best_a, best_child = score, a, child
+    return best_a, best_child
+
+
+def mcts(game: _Game, net: NumpyNet, n_sims: int = N_SIMS) -> np.ndarray:
+    """az_gomuku5.mcts(root_noise=False) on a NumpyNet; returns the root visit distribution."""
+    root = _Node(1.0)
+    legal, priors, _ = _evaluate(game, net)
+    root.children = {a: _Node(p) for a, p in zip(legal, priors)}
+
+    for _ in range(n_sims):
+        node, g, path = root, game.clone(), [root]
+        while node.children:
+            a, node = _select(node)
+            g.move(a)
+            path.append(node)
+        done, winner = g.terminal()
+        if done:
+            value = 0.0 if winner == 0 else -1.0
+        else:
+            legal, priors, value = _evaluate(g, net)
+            node.children = {a: _Node(p) for a, p in zip(legal, priors)}
+        for n in reversed(path):
+            value = -value
+            n.N += 1
+            n.W += value
+
+    pi = np.zeros(BOARD * BOARD)
+    for a, child in root.children.items():
+        pi[a] = child.N
+    return pi / pi.sum()
+
+
+_model: NumpyNet | None = None
+_loaded_path: str | None = None
+
+
+def _load_model(weights_path: str | None = None) -> NumpyNet:
+    global _model, _loaded_path
+    path = os.path.normpath(weights_path or _DEFAULT_WEIGHTS)
+    if _model is None or _loaded_path != path:
+        _model, _loaded_path = NumpyNet(path), path
+    return _model
+
+
+def _make_game(board_state: np.ndarray, current_player: int) -> _Game:
+    """Same board normalisation as predict._make_game (0/1/2 or 0/+1/-1)."""
+    board = np.array(board_state, dtype=np.float64).reshape(BOARD, BOARD)
+    if np.any(board < 0):
+        normalised = np.zeros((BOARD, BOARD), dtype=np.int8)
+        normalised[board > 0] = 1
+        normalised[board < 0] = 2
+        current_player = 2 if current_player == -1 else current_player
+    else:
+        normalised = board.astype(np.int8)
+    opp  = np.argwhere(normalised == 3 - current_player)
+    last = tuple(opp[-1]) if len(opp) else None
+    return _Game(normalised, current_player, last)
+
+
+def predict(board_state: np.ndarray,
+            current_player: int = 1,
+            weights_path: str | None = None,
+            n_sims: int = N_SIMS) -> tuple[int, int]:
+    """predict.predict() without torch; weights_path is a .npz written by export_npz."""
+    game = _make_game(board_state, current_player)
+    pi   = mcts(game, _load_model(weights_path), n_sims)
+    return divmod(int(np.argmax(pi)), BOARD)
+
+
+# ── 4. Benchmark: cold start, memory and latency vs the torch path ───────────
+
+_COLD = """
+import sys, time
+t0 = time.perf_counter()
+sys.path.insert(0, {dir!r})
+import numpy as np
+from {module} import predict
+board = np.zeros((9, 9), dtype=int); board[4, 4] = 1
+predict(board, 2, {weights!r}, n_sims=1)
+secs = time.perf_counter() - t0
+peak = next(int(l.split()[1]) for l in open("/proc/self/status") if l.startswith("VmHWM:"))
+print(secs, peak / 1024, "torch" in sys.modules)
+"""
+
+
+def _cold_start(module: str, weights: str) -> tuple[float, float, bool]:
+    import subprocess
+    import sys
+    out = subprocess.run([sys.executable, "-c", _COLD.format(dir=_DIR, module=module, weights=weights)],
+                         capture_output=True, text=True, check=True).stdout.split()
+    return float(out[-3]), float(out[-2]), out[-1] == "True"
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Export to .npz / benchmark NumPy vs torch inference")
+    parser.add_argument("--export", type=str, help="Checkpoint to export")
+    parser.add_argument("--mixed", action="store_true", help="--export is a Mixed-Training checkpoint")
+    parser.add_argument("--out", type=str, default=None)
+    parser.add_argument("--bench", type=str, metavar="PT", help="AZNet weights to benchmark (.npz exported next to it)")
+    parser.add_argument("--sims", type=int, default=100)
+    args = parser.parse_args()
+
+    if args.export:
+        out = export_checkpoint(args.export, args.out, args.mixed)
+        print(f"Saved {out}")
+
+    if args.bench:
+        npz = export_checkpoint(args.bench, args.out)
+
+        import torch
+        import predict as torch_predict
+        ref = torch_predict._load_model(args.bench)
+        x   = np.random.rand(64, 3, BOARD, BOARD).astype(np.float32).round()
+        with torch.no_grad():
+            tl, tv = (t.numpy() for t in ref(torch.from_numpy(x)))
+        nl, nv = NumpyNet(npz)(x)
+        print(f"max abs diff vs torch: logits {np.abs(tl - nl).max():.1e}  value {np.abs(tv - nv).max():.1e}")
+
+        for module, weights in (("predict", args.bench), ("numpy_engine", npz)):
+            secs, mb, has_torch = _cold_start(module, weights)
+            print(f"  cold start {module:<13} {secs:6.2f} s   peak RSS {mb:7.1f} MB   torch imported: {has_torch}")
+
+        net = NumpyNet(npz)
+        for batch in (1, 50):
+            xb = x[:1].repeat(batch, 0)
+            times = {}
+            for name, fn in (("torch", lambda: ref(torch.from_numpy(xb))), ("numpy", lambda: net(xb))):
+                with torch.no_grad():
+                    fn()
+                    t0 = time.perf_counter()
+                    for _ in range(20):
+                        fn()
+                times[name] = (time.perf_counter() - t0) / 20 * 1e3
+            print(f"  forward batch {batch:>2}:  torch {times['torch']:7.2f} ms   numpy {times['numpy']:7.2f} ms")
+
+        board = np.zeros((BOARD, BOARD), dtype=int); board[4, 4] = 1
+        for name, fn in (("torch", lambda: torch_predict.predict(board, 2, args.bench, n_sims=args.sims)),
+                         ("numpy", lambda: predict(board, 2, npz, n_sims=args.sims))):
+            t0 = time.perf_counter()
+            move = fn()
+            print(f"  predict {name:<5} {args.sims} sims  {time.perf_counter() - t0:6.2f} s   move {move}")
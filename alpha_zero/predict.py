@@ -9,6 +9,10 @@ Usage:
     #   0/+1/-1  with current_player +1 (black) or -1 (white)
     row, col = predict(board_state, current_player)
 
+    # many independent positions at once (one batched search, much higher
+    # throughput per position than calling predict() in a loop)
+    moves = predict_batch(boards, players)
+
 IMPORTANT NOTES ON STRENGTH (tree reuse):
     Normally in a full game, MCTS keeps its search tree between moves.
     When the opponent plays move X, we jump to the subtree we already
@@ -20,73 +24,98 @@ IMPORTANT NOTES ON STRENGTH (tree reuse):
     scratch, so that prior work is lost. This is an intentional tradeoff:
     a clean predict(board, player) -> (row, col) API that anyone can call
     without managing MCTS state, at the cost of slightly weaker play.
+
+    PredictSession gets the tree reuse back behind the same call shape:
+
+        session = PredictSession()
+        row, col = session.predict(board_state, current_player)   # every turn
+
+    It diffs each incoming board against the one it last saw to find the
+    opponent's move and jumps to that subtree, and only starts a fresh
+    tree when the board does not follow on (new game, undo, skipped turns).
+
+SCALING ACROSS CORES:
+    n_threads > 1 runs one tree-parallel search; n_procs > 1 runs n_procs
+    independent searches (root noise, different seeds) in a worker pool and
+    sums their root visit counts. bench_root_parallel.py reports the
+    strength-vs-cores curve of the latter.
 """
 
 import os
+import multiprocessing as mp
 import numpy as np
 import torch
+from concurrent.futures import ProcessPoolExecutor
 import torch.nn.functional as F
 
 try:
     from alpha_zero.az_gomuku5 import (
-        AZNet, Gomoku, Node, mcts,
+        AZNet, Gomoku, Node, mcts, load_aznet,
         BOARD, N_SIMS, DEVICE,
     )
+    from alpha_zero.multi_agent_eval import _batched_mcts
+    from alpha_zero.symmetry import SymmetryNet
 except ModuleNotFoundError:
     from az_gomuku5 import (
-        AZNet, Gomoku, Node, mcts,
+        AZNet, Gomoku, Node, mcts, load_aznet,
         BOARD, N_SIMS, DEVICE,
     )
+    from multi_agent_eval import _batched_mcts
+    from symmetry import SymmetryNet
 
 # ── Resolve default weights path relative to this file ───────────────────────
 _DIR = os.path.dirname(os.path.abspath(__file__))
 _DEFAULT_WEIGHTS = os.path.join(_DIR, "..", "models_az5", "az_iter0150.pt")
 
+BACKEND = "eager"      # inference backend (backends.py): eager | compiled | onnx | numpy
+EXIT_THRESHOLD = 0.0   # >0: nets with an early-exit head answer confident leaves from it (early_exit.py)
+
 # ── Module-level cache so the model is loaded only once ──────────────────────
 _model: AZNet | None = None
 _loaded_path: str | None = None
 
 
 def _load_model(weights_path: str | None = None) -> AZNet:
-    """Load (or return cached) AZNet from a checkpoint or raw state-dict file."""
+    """Load (or return cached) AZNet from a checkpoint, raw state-dict or frozen .ts export."""
     global _model, _loaded_path
 
     path = os.path.normpath(weights_path or _DEFAULT_WEIGHTS)
     if _model is not None and _loaded_path == path:
         return _model
 
-    net = AZNet().to(DEVICE)
-    ckpt = torch.load(path, map_location=DEVICE, weights_only=False)
-    # Support both full checkpoints (with 'model' key) and plain state-dicts
-    if isinstance(ckpt, dict) and "model" in ckpt:
-        net.load_state_dict(ckpt["model"])
+    if path.endswith(".ts"):
+        # Frozen BN-folded export (export_inference.py) — same call interface
+        try:
+            from alpha_zero.export_inference import load_frozen
+        except ModuleNotFoundError:
+            from export_inference import load_frozen
+        net = load_frozen(path, DEVICE)
     else:
-        net.load_state_dict(ckpt)
-    net.eval()
+        # Full checkpoints ('model', plus 'config' for distilled/pruned sizes) or plain state-dicts
+        net = load_aznet(path, DEVICE)
+        if EXIT_THRESHOLD and net.exit_head is not None:
+            if BACKEND != "eager":
+                # the early-exit split is Python control flow; the exported backends run the full tower
+                raise ValueError(f"EXIT_THRESHOLD needs BACKEND='eager', got {BACKEND!r}")
+            try:
+                from alpha_zero.early_exit import EarlyExitNet
+            except ModuleNotFoundError:
+                from early_exit import EarlyExitNet
+            net = EarlyExitNet(net, EXIT_THRESHOLD)
+        elif BACKEND != "eager":
+            try:
+                from alpha_zero.backends import make_backend
+            except ModuleNotFoundError:
+                from backends import make_backend
+            net = make_backend(BACKEND, net)
 
     _model = net
     _loaded_path = path
     return net
 
 
-def predict(board_state: np.ndarray,
-            current_player: int = 1,
-            weights_path: str | None = None,
-            n_sims: int = N_SIMS) -> tuple[int, int]:
-    """
-    Standardised prediction function.
-
-    Args:
-        board_state:    9x9 numpy array (0=empty, 1=black, 2=white).
-        current_player: Which player is to move (1=black, 2=white).
-        weights_path:   Optional path to model weights (defaults to latest checkpoint).
-        n_sims:         MCTS simulations (default 400). Lower = faster but weaker.
-
-    Returns:
-        (row, col) tuple — the chosen move.
-    """
-    net = _load_model(weights_path)
-
+def _make_game(board_state: np.ndarray, current_player: int) -> Gomoku:
+    """Reconstructs a Gomoku object from a raw board in either accepted format."""
     # Normalise board representation: accept both 0/1/2 and 0/+1/-1
     board = np.array(board_state, dtype=np.float64).reshape(BOARD, BOARD)
     if np.any(board < 0):                       # 0/+1/-1 format
@@ -114,16 +143,179 @@ def predict(board_state: np.ndarray,
     if opp_positions:
         lr, lc = opp_positions[-1]
         game.last_moves = [(lr * BOARD + lc, opponent)]
+    return game
 
-    # Run MCTS from this position
-    root = Node(prior=1.0)
-    pi = mcts(game, net, root, root_noise=False, n_sims=n_sims)
+
+def predict(board_state: np.ndarray,
+            current_player: int = 1,
+            weights_path: str | None = None,
+            n_sims: int = N_SIMS,
+            n_threads: int = 1,
+            n_procs: int = 1,
+            n_symmetries: int = 1) -> tuple[int, int]:
+    """
+    Standardised prediction function.
+
+    Args:
+        board_state:    9x9 numpy array (0=empty, 1=black, 2=white).
+        current_player: Which player is to move (1=black, 2=white).
+        weights_path:   Optional path to model weights (defaults to latest checkpoint).
+        n_sims:         MCTS simulations (default 400). Lower = faster but weaker.
+        n_threads:      Search threads sharing one tree (tree-parallel MCTS with
+                        virtual loss). >1 lowers time-to-move on multi-core machines.
+        n_procs:        Root-parallel search: n_procs processes each run n_sims
+                        from the same position and their visit counts are summed
+                        (n_procs * n_sims simulations in roughly the wall time of one).
+        n_symmetries:   Evaluate every leaf under this many random board symmetries
+                        (1-8) in one forward batch and average (symmetry.SymmetryNet).
+                        Better evaluations per simulation for a larger batch per leaf.
+
+    Returns:
+        (row, col) tuple — the chosen move.
+    """
+    game = _make_game(board_state, current_player)
+    pi   = _search_pi(game, weights_path, n_sims, n_threads, n_procs, n_symmetries)
 
     action = int(np.argmax(pi))
     row, col = divmod(action, BOARD)
     return (row, col)
 
 
+def predict_batch(boards: list,
+                  players: list,
+                  n_sims: int = N_SIMS,
+                  weights_path: str | None = None,
+                  n_symmetries: int = 1) -> list[tuple[int, int]]:
+    """
+    predict() for many independent positions at once.
+
+    All positions are searched together with multi_agent_eval._batched_mcts:
+    every simulation evaluates one leaf per position in a single forward pass,
+    instead of one batch-1 forward pass per leaf per position.
+
+    Args:
+        boards:       Sequence of 9x9 boards, each in either format predict() accepts.
+        players:      Player to move for each board.
+        n_sims:       MCTS simulations per position.
+        weights_path: Optional path to model weights (defaults to latest checkpoint).
+        n_symmetries: Symmetry-ensembled leaf evaluation, as in predict().
+
+    Returns:
+        List of (row, col) moves, one per board, in input order.
+    """
+    if len(boards) != len(players):
+        raise ValueError(f"got {len(boards)} boards but {len(players)} players")
+    if not len(boards):
+        return []
+    net   = _ensembled(_load_model(weights_path), n_symmetries)
+    games = [_make_game(b, p) for b, p in zip(boards, players)]
+    roots = [Node(prior=1.0) for _ in games]
+    return [divmod(a, BOARD) for a in _batched_mcts(games, roots, net, n_sims)]
+
+
+def _search_pi(game: Gomoku, weights_path: str | None, n_sims: int,
+               n_threads: int = 1, n_procs: int = 1, n_symmetries: int = 1) -> np.ndarray:
+    """Visit distribution at the root of `game`, searched in-process or root-parallel."""
+    if n_procs > 1:
+        pool  = _get_pool(weights_path, n_procs)
+        seeds = np.random.randint(2**31, size=n_procs)
+        jobs  = [pool.submit(_worker_pi, game, n_sims, int(seed), n_symmetries) for seed in seeds]
+        return sum(job.result() for job in jobs) / n_procs
+
+    net  = _ensembled(_load_model(weights_path), n_symmetries)
+    root = Node(prior=1.0)
+    return mcts(game, net, root, root_noise=False, n_sims=n_sims, n_threads=n_threads)
+
+
+def _ensembled(net, n_symmetries: int):
+    return SymmetryNet(net, n_symmetries) if n_symmetries > 1 else net
+
+
+# ── Stateful session (tree reuse) ────────────────────────────────────────────
+
+class PredictSession:
+    """
+    predict() that keeps its search tree between calls. Use one session per
+    game (or call reset()); boards that don't follow on from the previous
+    call fall back to a fresh search automatically.
+    """
+    def __init__(self, weights_path: str | None = None, n_sims: int = N_SIMS, n_threads: int = 1,
+                 n_symmetries: int = 1):
+        self.net       = _ensembled(_load_model(weights_path), n_symmetries)
+        self.n_sims    = n_sims
+        self.n_threads = n_threads
+        self.reused    = 0          # calls that continued the previous tree
+        self.reset()
+
+    def reset(self):
+        self.game: Gomoku | None = None     # position after our last move
+        self.root: Node | None   = None     # subtree for that position
+
+    def _follow(self, game: Gomoku) -> bool:
+        """Advances self.game/self.root to `game` if it is at most one opponent move on."""
+        if self.game is None:
+            return False
+        diff = np.argwhere(game.board != self.game.board)
+        if len(diff) == 0:
+            return game.player == self.game.player         # same position asked again
+        if len(diff) != 1 or game.player != 3 - self.game.player:
+            return False
+        r, c = diff[0]
+        if self.game.board[r, c] != 0 or game.board[r, c] != self.game.player:
+            return False
+        action = int(r * BOARD + c)
+        self.game.move(action)
+        self.root = self.root.children.get(action) or Node(prior=1.0)
+        return True
+
+    def predict(self, board_state: np.ndarray, current_player: int = 1) -> tuple[int, int]:
+        """Same arguments and return value as predict()."""
+        game = _make_game(board_state, current_player)
+        if self._follow(game):
+            self.reused += 1
+        else:
+            self.game, self.root = game, Node(prior=1.0)
+
+        pi = mcts(self.game, self.net, self.root, root_noise=False,
+                  n_sims=self.n_sims, n_threads=self.n_threads)
+        action = int(np.argmax(pi))
+
+        self.game.move(action)                             # keep the subtree for our move
+        self.root = self.root.children.get(action) or Node(prior=1.0)
+        return divmod(action, BOARD)
+
+
+# ── Root-parallel worker pool (n_procs > 1) ──────────────────────────────────
+# Each worker keeps its own cached model. Root noise is what makes the workers'
+# trees differ; without it every process would run the identical search.
+
+_pool = None
+_pool_key: tuple | None = None
+
+
+def _get_pool(weights_path: str | None, n_procs: int) -> ProcessPoolExecutor:
+    global _pool, _pool_key
+    key = (os.path.normpath(weights_path or _DEFAULT_WEIGHTS), n_procs)
+    if _pool is None or _pool_key != key:
+        if _pool is not None:
+            _pool.shutdown()
+        _pool = ProcessPoolExecutor(max_workers=n_procs, mp_context=mp.get_context("spawn"),
+                                    initializer=_worker_init, initargs=(weights_path,))
+        _pool_key = key
+    return _pool
+
+
+def _worker_init(weights_path: str | None):
+    torch.set_num_threads(1)
+    _load_model(weights_path)
+
+
+def _worker_pi(game: Gomoku, n_sims: int, seed: int, n_symmetries: int = 1) -> np.ndarray:
+    np.random.seed(seed)
+    net = _ensembled(_model, n_symmetries)                                       # loaded by _worker_init
+    return mcts(game, net, Node(prior=1.0), root_noise=True, n_sims=n_sims)
+
+
 if __name__ == "__main__":
     # Quick smoke test with an empty board
     board = np.zeros((9, 9), dtype=int)
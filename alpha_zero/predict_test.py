@@ -7,23 +7,28 @@ Modes:
   3. Tree-Reuse Agent (Black) vs Predict Agent (White)
      Same model, same sims — the only difference is tree reuse vs stateless.
      Human picks Black's opening move, then both agents auto-play.
+
+With PONDER on, the agent in the human modes keeps its tree between moves
+and goes on searching while the human thinks (search_handle.SearchHandle);
+the next move only tops the tree up to N_SIMS.
 """
 
-import sys, os, copy, threading
+import sys, os, threading
 import pygame
 import numpy as np
-import torch
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from az_gomuku5 import Gomoku, AZNet, mcts, Node, BOARD, DEVICE
+from az_gomuku5 import Gomoku, BOARD, DEVICE, load_aznet
 from predict import predict as az_predict
+from search_handle import SearchHandle
 
 # ── Default model path ──────────────────────────────────────────────────────
 _DIR = os.path.dirname(os.path.abspath(__file__))
 DEFAULT_WEIGHTS = os.path.join(_DIR, "..", "models_az5", "az_iter0150.pt")
 
 N_SIMS = 400
+PONDER = True     # human modes: agent searches on the human's time
 
 # ── Layout ──────────────────────────────────────────────────────────────────
 DEFAULT_CELL_SIZE = 67
@@ -174,24 +179,12 @@ def run_predict_agent(board, player, weights_path, result):
     row, col = az_predict(board, player, weights_path=weights_path, n_sims=N_SIMS)
     result[0] = rc_to_action(row, col)
 
-def run_tree_reuse_agent(game, net, root, result):
-    """Standard MCTS with tree reuse."""
-    pi = mcts(game.clone(), net, copy.deepcopy(root), root_noise=False, n_sims=N_SIMS)
+def run_tree_reuse_agent(handle, result):
+    """Standard MCTS with tree reuse (visits already in the tree count toward N_SIMS)."""
+    pi = handle.search(N_SIMS)
     result[0] = int(np.argmax(pi))
 
 
-# ── Load model for tree-reuse agent ────────────────────────────────────────
-def load_net(weights_path):
-    net = AZNet().to(DEVICE)
-    ckpt = torch.load(weights_path, map_location=DEVICE, weights_only=False)
-    if isinstance(ckpt, dict) and "model" in ckpt:
-        net.load_state_dict(ckpt["model"])
-    else:
-        net.load_state_dict(ckpt)
-    net.eval()
-    return net
-
-
 # ── Main loop ──────────────────────────────────────────────────────────────
 def play(mode, weights_path):
     """
@@ -208,12 +201,13 @@ def play(mode, weights_path):
     font_status = pygame.font.SysFont("Arial", max(14, min(20, STATUS_BAR_H // 2)))
 
     # Determine roles
+    agent = 'ponder' if PONDER else 'predict'
     if mode == 'human_vs_predict':
-        roles  = {1: 'human', 2: 'predict'}
+        roles  = {1: 'human', 2: agent}
         labels = {1: "Human", 2: "Predict"}
         caption = "Human (B) vs Predict (W)"
     elif mode == 'predict_vs_human':
-        roles  = {1: 'predict', 2: 'human'}
+        roles  = {1: agent, 2: 'human'}
         labels = {1: "Predict", 2: "Human"}
         caption = "Predict (B) vs Human (W)"
     else:  # reuse_vs_predict
@@ -223,15 +217,17 @@ def play(mode, weights_path):
 
     pygame.display.set_caption(f"{caption} — Gomoku {BOARD}x{BOARD}")
 
-    # Load net for tree-reuse agent (if needed)
-    reuse_net = load_net(weights_path) if 'reuse' in roles.values() else None
+    # Tree-reuse / pondering agents keep one persistent tree (if needed)
+    uses_tree = 'reuse' in roles.values() or 'ponder' in roles.values()
+    handle    = SearchHandle(load_aznet(weights_path, DEVICE)) if uses_tree else None
 
     agent_vs_agent = ('human' not in roles.values())
 
     def reset():
+        if handle is not None:
+            handle.reset()
         return (
             Gomoku(),
-            Node(prior=1.0),    # tree-reuse root (only used if reuse agent active)
             None,               # last_action
             'playing',
             0,                  # end_winner
@@ -239,7 +235,7 @@ def play(mode, weights_path):
             0,                  # review_step
         )
 
-    game, reuse_root, last_action, state, end_winner, history, review_step = reset()
+    game, last_action, state, end_winner, history, review_step = reset()
 
     agent_result   = [None]
     agent_thinking = [False]
@@ -263,10 +259,11 @@ def play(mode, weights_path):
                     target=run_predict_agent,
                     args=(game.board.copy(), p, weights_path, agent_result),
                     daemon=True).start()
-            else:  # reuse
+            else:  # reuse / ponder
+                handle.stop_pondering()              # our turn: no longer the human's time
                 threading.Thread(
                     target=run_tree_reuse_agent,
-                    args=(game, reuse_net, reuse_root, agent_result),
+                    args=(handle, agent_result),
                     daemon=True).start()
 
         # Apply agent move
@@ -276,9 +273,11 @@ def play(mode, weights_path):
             agent_result[0]   = None
             agent_thinking[0] = False
 
-            # Advance tree-reuse root
-            if reuse_net is not None:
-                reuse_root = reuse_root.children.get(action, Node(prior=1.0))
+            # Advance the persistent tree; ponder while the human replies
+            if handle is not None:
+                handle.advance(action)
+                if role == 'ponder':
+                    handle.start_pondering()
 
             history.append((action, p))
             last_action = action
@@ -297,7 +296,7 @@ def play(mode, weights_path):
                 if event.key in (pygame.K_q, pygame.K_ESCAPE):
                     running = False
                 elif event.key == pygame.K_r and state == 'done':
-                    game, reuse_root, last_action, state, end_winner, history, review_step = reset()
+                    game, last_action, state, end_winner, history, review_step = reset()
                     agent_result[0] = None
                     agent_thinking[0] = False
                 elif state == 'done':
@@ -313,7 +312,7 @@ def play(mode, weights_path):
                     elif fwd_btn and fwd_btn.collidepoint(event.pos) and review_step < len(history):
                         review_step += 1
                     elif restart_btn and restart_btn.collidepoint(event.pos):
-                        game, reuse_root, last_action, state, end_winner, history, review_step = reset()
+                        game, last_action, state, end_winner, history, review_step = reset()
                         agent_result[0] = None
                         agent_thinking[0] = False
                     elif quit_btn and quit_btn.collidepoint(event.pos):
@@ -326,8 +325,8 @@ def play(mode, weights_path):
                         if 0 <= row < BOARD and 0 <= col < BOARD:
                             action = rc_to_action(row, col)
                             if action in game.legal():
-                                if reuse_net is not None:
-                                    reuse_root = reuse_root.children.get(action, Node(prior=1.0))
+                                if handle is not None:
+                                    handle.advance(action)
                                 history.append((action, p))
                                 last_action = action
                                 game.move(action)
@@ -360,12 +359,17 @@ def play(mode, weights_path):
             else:
                 color = "Black" if p == 1 else "White"
                 dots  = "." * (1 + (pygame.time.get_ticks() // 400) % 3)
+                if role in ('reuse', 'ponder'):
+                    done = min(handle.snapshot(wait=False)['root_n'], N_SIMS)   # never blocks the render loop
+                    dots += f"  {done}/{N_SIMS}"
                 draw_status(screen, font_status,
                             f"{labels[p]} ({color}) thinking{dots}")
 
         pygame.display.flip()
         clock.tick(30)
 
+    if handle is not None:
+        handle.close()
     pygame.quit()
 
 
@@ -0,0 +1,141 @@
+"""
+Structured channel pruning of trained AZNet checkpoints.
+
+Each residual block is conv(f→f) → BN → ReLU → conv(f→f) → BN, added to the
+f-channel residual stream. The inner channels (between the two convs) can be
+removed without touching the stream or any other layer: dropping inner channel
+c deletes output filter c of the first conv, entry c of its BN, and input
+channel c of the second conv. prune() does that in every block, keeping the
+highest-scoring channels by one of two criteria:
+
+    bn            |gamma| of the block's first BN (network-slimming style)
+    contribution  mean post-ReLU activation on replay positions x L2 norm of the
+                  second conv's weights reading it — a first-order estimate of
+                  what the channel adds to the residual stream
+
+The pruned net is fine-tuned briefly on replay-buffer positions against the
+unpruned net's outputs (distill.distill at a lower LR) and saved as
+{'model', 'config', ...} with the per-block widths in config['inner'], so
+predict(), load_aznet() and every backend load it at its pruned size.
+
+    python prune.py --weights models_az5/az_iter0150.pt --ratios 0.25 0.5 0.75
+
+writes models_az5/az_iter0150_p25.pt etc. and prints one latency/strength
+point per ratio (ms per batch-1 evaluation, parameters, and the score against
+the unpruned net at equal simulations).
+"""
+
+import os
+
+import numpy as np
+import torch
+
+try:
+    from alpha_zero.az_gomuku5 import AZNet, LR, DEVICE
+except ModuleNotFoundError:
+    from az_gomuku5 import AZNet, LR, DEVICE
+
+CRITERIA     = ("bn", "contribution")
+MIN_CHANNELS = 8           # never prune a block below this many inner channels
+FINETUNE_LR  = LR / 10
+
+
+@torch.no_grad()
+def channel_scores(net: AZNet, criterion: str = "bn", positions: np.ndarray | None = None) -> list[torch.Tensor]:
+    """One score per inner channel of every residual block (higher = more important)."""
+    if criterion == "bn":
+        return [blk.net[1].weight.abs().cpu() for blk in net.tower]
+    if criterion != "contribution":
+        raise ValueError(f"unknown criterion {criterion!r} (expected one of {CRITERIA})")
+    if positions is None:
+        raise ValueError("the 'contribution' criterion needs positions")
+
+    acts  = [0.0] * len(net.tower)
+    hooks = [blk.net[2].register_forward_hook(
+                 lambda m, inp, out, i=i: acts.__setitem__(i, acts[i] + out.sum(dim=(0, 2, 3))))
+             for i, blk in enumerate(net.tower)]
+    try:
+        net.eval()
+        for i in range(0, len(positions), 256):
+            net(torch.from_numpy(positions[i:i + 256]).to(DEVICE))
+    finally:
+        for h in hooks:
+            h.remove()
+    return [(a / len(positions) * torch.linalg.vector_norm(blk.net[3].weight, dim=(0, 2, 3))).cpu()
+            for a, blk in zip(acts, net.tower)]
+
+
+@torch.no_grad()
+def prune(net: AZNet, ratio: float, scores: list[torch.Tensor]) -> AZNet:
+    """Copy of `net` with the lowest-scoring `ratio` of each block's inner channels removed."""
+    keeps = []
+    for s in scores:
+        k = min(len(s), max(MIN_CHANNELS, round(len(s) * (1 - ratio))))
+        keeps.append(torch.argsort(s, descending=True)[:k].sort().values)
+
+    sd = {k: v.clone() for k, v in net.state_dict().items()}
+    for i, keep in enumerate(keeps):
+        blk  = f"tower.{i}.net"
+        keep = keep.to(sd[f"{blk}.0.weight"].device)
+        sd[f"{blk}.0.weight"] = sd[f"{blk}.0.weight"][keep]
+        for name in ("weight", "bias", "running_mean", "running_var"):
+            sd[f"{blk}.1.{name}"] = sd[f"{blk}.1.{name}"][keep]
+        sd[f"{blk}.3.weight"] = sd[f"{blk}.3.weight"][:, keep]
+
+    out = AZNet(**{**net.config, "inner": [len(k) for k in keeps]}).to(DEVICE)
+    out.load_state_dict(sd)
+    return out.eval()
+
+
+def prune_and_finetune(net: AZNet, ratio: float, positions: np.ndarray, steps: int,
+                       criterion: str = "bn") -> AZNet:
+    """prune() followed by `steps` of fine-tuning against the unpruned net on `positions`."""
+    try:
+        from alpha_zero.distill import distill
+    except ModuleNotFoundError:
+        from distill import distill
+    pruned = prune(net, ratio, channel_scores(net, criterion, positions))
+    if steps:
+        pruned = distill(net, positions, steps, student=pruned, lr=FINETUNE_LR, log_every=max(1, steps // 4))
+    return pruned
+
+
+def n_params(net: AZNet) -> int:
+    return sum(p.numel() for p in net.parameters())
+
+
+if __name__ == "__main__":
+    import argparse
+    from az_gomuku5 import load_aznet, BUFFER_DIR
+    from distill import training_positions, save_student, ms_per_eval
+    from early_exit import fixed_sims_match
+
+    parser = argparse.ArgumentParser(description="Prune residual-block channels of an AZNet checkpoint")
+    parser.add_argument("--weights", type=str, default=None, help="AZNet weights (default: random init)")
+    parser.add_argument("--ratios", type=float, nargs="+", default=[0.25, 0.5, 0.75],
+                        help="Fraction of inner channels removed per block; one checkpoint per ratio")
+    parser.add_argument("--criterion", choices=CRITERIA, default="bn")
+    parser.add_argument("--steps", type=int, default=500, help="Fine-tuning steps per pruned net")
+    parser.add_argument("--positions", type=int, default=20_000)
+    parser.add_argument("--buffer", type=str, default=BUFFER_DIR)
+    parser.add_argument("--out-dir", type=str, default=None, help="Default: next to --weights")
+    parser.add_argument("--pairs", type=int, default=4, help="Game pairs vs the unpruned net (0 = skip)")
+    parser.add_argument("--sims", type=int, default=100)
+    args = parser.parse_args()
+
+    net  = load_aznet(args.weights) if args.weights else AZNet().to(DEVICE).eval()
+    stem = os.path.splitext(os.path.basename(args.weights or "aznet_random.pt"))[0]
+    out_dir = args.out_dir or os.path.dirname(args.weights or "") or "."
+    positions = training_positions(net, args.positions, args.buffer)
+
+    print(f"Unpruned: {n_params(net):,} params  {ms_per_eval(net):6.2f} ms/eval")
+    for ratio in args.ratios:
+        pruned = prune_and_finetune(net, ratio, positions, args.steps, args.criterion)
+        path   = os.path.join(out_dir, f"{stem}_p{round(ratio * 100):02d}.pt")
+        save_student(pruned, path, source=args.weights, ratio=ratio, criterion=args.criterion, steps=args.steps)
+        row = (f"  ratio {ratio:.2f}: {n_params(pruned):>9,} params  {ms_per_eval(pruned):6.2f} ms/eval  "
+               f"inner {pruned.config['inner']}")
+        if args.pairs:
+            r = fixed_sims_match(pruned, net, args.pairs, args.sims)
+            row += f"  | vs unpruned at {args.sims} sims: W{r['A']} D{r['draw']} L{r['B']}"
+        print(row + f"  → {path}")
@@ -0,0 +1,147 @@
+"""
+INT8 post-training static quantization for CPU self-play.
+
+On CPU-only machines the 10-block, 128-filter AZNet forward pass is most of
+the cost of self-play. quantize_net() runs FX graph-mode static quantization:
+observers are inserted, calibration positions (taken from the replay buffer,
+so activation ranges match what self-play actually feeds the net) are run
+through, and convs/linears are converted to int8 kernels with the BN already
+folded in. The result takes and returns float tensors, so it is a drop-in
+`net` for play_games_batched(), mcts() and Mixed-Training's MCTS.
+
+Quantization can shift the policy, so a quantized net is only used after
+accuracy_gate() has compared it with the fp32 net on held-out buffer
+positions: mean policy KL(fp32 || int8) and value MSE must both be under
+their limits, otherwise quantized_or_fp32() hands back the fp32 net.
+
+    from quantize import quantized_or_fp32, replay_states
+    sp_net, report = quantized_or_fp32(net, replay_states(2048))
+
+Training selects it with az_gomuku5.QUANTIZE_SELFPLAY. Running the module
+reports the gate and forward / self-play speed of fp32 vs int8.
+"""
+
+import copy
+import os
+import warnings
+
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from torch.ao.quantization import get_default_qconfig_mapping
+from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+
+try:
+    from alpha_zero.replay import ShardStore
+except ModuleNotFoundError:
+    from replay import ShardStore
+
+MAX_POLICY_KL = 0.05       # mean KL(fp32 || int8) over held-out positions
+MAX_VALUE_MSE = 0.01       # mean squared value difference
+CALIB_BATCH   = 64
+
+
+# ── 1. Calibration data ──────────────────────────────────────────────────────
+
+def replay_states(n: int, buffer_dir: str = "models_az5/buffer") -> np.ndarray:
+    """Up to n states (float32, (n, 3, 9, 9)) from the newest replay-buffer shards."""
+    states = ShardStore(buffer_dir, capacity=n).recent_states(n)
+    if not len(states):
+        raise FileNotFoundError(f"no replay-buffer shards in {buffer_dir}")
+    return states
+
+
+# ── 2. Quantization ──────────────────────────────────────────────────────────
+
+def quantize_net(net: nn.Module, calib_states: np.ndarray, backend: str | None = None) -> nn.Module:
+    """Int8 copy of `net` (CPU), calibrated on calib_states."""
+    backend = backend or torch.backends.quantized.engine
+    torch.backends.quantized.engine = backend
+    model   = copy.deepcopy(getattr(net, "_orig_mod", net)).cpu().eval()
+    example = (torch.from_numpy(calib_states[:1]),)
+    with warnings.catch_warnings():                 # torch.ao deprecation notices
+        warnings.simplefilter("ignore")
+        model = prepare_fx(model, get_default_qconfig_mapping(backend), example)
+        with torch.no_grad():
+            for i in range(0, len(calib_states), CALIB_BATCH):
+                model(torch.from_numpy(calib_states[i:i + CALIB_BATCH]))
+        return convert_fx(model)
+
+
+@torch.no_grad()
+def accuracy_gate(ref: nn.Module, quant: nn.Module, states: np.ndarray,
+                  max_kl: float = MAX_POLICY_KL, max_mse: float = MAX_VALUE_MSE) -> dict:
+    """Policy KL and value MSE of `quant` against `ref`; 'passed' if both are within limits."""
+    x = torch.from_numpy(states)
+    ref_p, ref_v = ref(x.to(next(ref.parameters()).device))
+    q_p, q_v     = quant(x)
+    # log_softmax is idempotent, so this works for logits (AZNet) and log-probs (PolicyValueNet)
+    ref_lp = F.log_softmax(ref_p.float().cpu(), dim=1)
+    q_lp   = F.log_softmax(q_p.float(), dim=1)
+    kl  = (ref_lp.exp() * (ref_lp - q_lp)).sum(1).mean().item()
+    mse = F.mse_loss(q_v.float().reshape(-1), ref_v.float().cpu().reshape(-1)).item()
+    return {"kl": kl, "mse": mse, "passed": kl <= max_kl and mse <= max_mse}
+
+
+def quantized_or_fp32(net: nn.Module, states: np.ndarray, backend: str | None = None) -> tuple:
+    """
+    Calibrates on half of `states`, gates on the other half. Returns
+    (int8 net, report) if the gate passes, else (net, report).
+    """
+    if next(net.parameters()).is_cuda:
+        return net, {"passed": False, "reason": "int8 kernels are CPU-only"}
+    states = np.ascontiguousarray(states, dtype=np.float32)
+    half   = max(1, len(states) // 2)
+    quant  = quantize_net(net, states[:half], backend)
+    report = accuracy_gate(net, quant, states[half:] if len(states) > 1 else states)
+    return (quant if report["passed"] else net), report
+
+
+# ── 3. Benchmark ─────────────────────────────────────────────────────────────
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    from az_gomuku5 import AZNet, play_games_batched, load_aznet, BUFFER_DIR
+
+    parser = argparse.ArgumentParser(description="INT8 static quantization: accuracy gate and speed")
+    parser.add_argument("--weights", type=str, default=None, help="AZNet weights (default: random init)")
+    parser.add_argument("--buffer", type=str, default=BUFFER_DIR, help="Replay-buffer shard directory")
+    parser.add_argument("--calib", type=int, default=2048, help="Calibration + gate positions")
+    parser.add_argument("--games", type=int, default=8)
+    parser.add_argument("--sims", type=int, default=50)
+    args = parser.parse_args()
+
+    net = load_aznet(args.weights, "cpu") if args.weights else AZNet().eval()
+
+    if os.path.isdir(args.buffer):
+        states = replay_states(args.calib, args.buffer)
+    else:
+        print(f"No replay buffer at {args.buffer} — calibrating on fresh self-play positions")
+        states = np.stack([e[0] for e in play_games_batched(net, 4, 16)][::8][:args.calib])
+
+    quant  = quantize_net(net, states[:len(states) // 2])
+    report = accuracy_gate(net, quant, states[len(states) // 2:])
+    print(f"Gate ({len(states) // 2} held-out positions): KL={report['kl']:.4f} (max {MAX_POLICY_KL}) "
+          f"value MSE={report['mse']:.5f} (max {MAX_VALUE_MSE}) -> {'PASS' if report['passed'] else 'FAIL'}")
+
+    for batch in (1, 50):
+        x = torch.from_numpy(states[:1]).repeat(batch, 1, 1, 1)
+        row = []
+        for m in (net, quant):
+            with torch.no_grad():
+                for _ in range(5):
+                    m(x)
+                t0 = time.perf_counter()
+                for _ in range(50):
+                    m(x)
+            row.append((time.perf_counter() - t0) / 50 * 1e3)
+        print(f"  forward batch {batch:>2}:  fp32 {row[0]:7.2f} ms   int8 {row[1]:7.2f} ms  (x{row[0] / row[1]:.2f})")
+
+    for name, m in (("fp32", net), ("int8", quant)):
+        np.random.seed(0)
+        t0 = time.perf_counter()
+        play_games_batched(m, args.games, args.sims)
+        dt = time.perf_counter() - t0
+        print(f"  self-play {name}: {args.games / dt:5.2f} games/s  ({args.games} games, {args.sims} sims)")
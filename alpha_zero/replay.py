@@ -0,0 +1,346 @@
+"""
+Replay-buffer storage helpers shared by the v5 trainers.
+
+Policy targets are kept sparse: a single (2, n) uint16 array per example,
+row 0 = visited actions, row 1 = visit counts. Only moves the search actually
+visited are stored, so a target costs ~4n bytes instead of the 648 bytes of a
+dense float64 (81,) vector. Targets are densified per mini-batch in one
+vectorised scatter (densify_targets).
+
+On disk the buffer is an append-only directory of shards (ShardStore): each
+iteration writes only its new examples, old shards are evicted by age, and
+resume rebuilds the in-memory deque from whatever shards survive.
+
+For datasets larger than RAM, MemmapReplay keeps a fixed-capacity ring of
+examples in numpy.memmap files that persist across runs; batches are gathered
+straight from the page cache instead of from an in-memory deque.
+
+BatchPrefetcher moves batch assembly (sampling, stacking, densifying, tensor
+conversion) onto a worker thread so it overlaps the learner's forward/backward.
+"""
+
+import json
+import mmap
+import os
+import queue
+import random
+import threading
+
+import numpy as np
+
+BOARD = 9                  # must match az_gomuku5.BOARD
+
+
+# ── 1. Sparse policy targets ──────────────────────────────────────────────────
+
+def visit_target(children: dict) -> np.ndarray:
+    """Root visit counts as a sparse (2, n) uint16 target — unvisited moves dropped."""
+    visited = [(a, child.N) for a, child in children.items() if child.N > 0]
+    return np.array(visited, dtype=np.uint16).T.reshape(2, -1)
+
+
+def sparse_from_dense(pi: np.ndarray) -> np.ndarray:
+    """
+    Converts a legacy dense (81,) probability target to the sparse format.
+    The original visit counts are gone, so probabilities are rescaled to
+    uint16 weights (max entry = 65535); densify_targets renormalises anyway.
+    """
+    pi   = np.asarray(pi, dtype=np.float64)
+    acts = np.flatnonzero(pi > 0)
+    w    = np.maximum(np.round(pi[acts] / pi[acts].max() * 65535), 1)
+    return np.stack([acts, w]).astype(np.uint16)
+
+
+def upgrade_examples(examples):
+    """Yields (state, target, z) with any dense legacy targets made sparse."""
+    for s, pi, z in examples:
+        if pi.ndim == 1:
+            pi = sparse_from_dense(pi)
+        yield s, pi, z
+
+
+def scatter_targets(targets, dtype=np.float32) -> np.ndarray:
+    """Scatters a sequence of sparse targets into an unnormalised (B, 81) count matrix."""
+    lengths = np.fromiter((t.shape[1] for t in targets), dtype=np.int64, count=len(targets))
+    flat    = np.concatenate(targets, axis=1)
+    rows    = np.repeat(np.arange(len(targets)), lengths)
+    counts  = np.zeros((len(targets), BOARD * BOARD), dtype=dtype)
+    counts[rows, flat[0]] = flat[1]
+    return counts
+
+
+def densify_targets(targets) -> np.ndarray:
+    """Scatters a sequence of sparse targets into a normalised (B, 81) float32 batch."""
+    pis = scatter_targets(targets)
+    pis /= pis.sum(axis=1, keepdims=True)
+    return pis
+
+
+def sample_batch(buf, batch_size: int) -> tuple:
+    """
+    Draws a training batch as (states, pis, zs) float32 arrays.
+    `buf` is either a deque of (state, target, z) examples or a MemmapReplay.
+    """
+    if hasattr(buf, "sample"):
+        return buf.sample(batch_size)
+    states, targets, zs = zip(*random.sample(buf, batch_size))
+    return np.stack(states), densify_targets(targets), np.array(zs, dtype=np.float32)
+
+
+class BatchPrefetcher:
+    """
+    Yields exactly `n_batches` mini-batches from `buf`, assembling up to `depth`
+    of them ahead of time on a background thread. `collate` (e.g. numpy → torch
+    tensors on the training device) also runs on the worker. depth=0 disables the
+    thread and assembles each batch inline, for before/after comparisons.
+
+    The buffer must not be mutated while batches are being drawn — the trainers
+    only extend it during self-play, never during the gradient steps.
+    """
+    def __init__(self, buf, batch_size: int, n_batches: int, depth: int = 4, collate=None):
+        self.buf        = buf
+        self.batch_size = batch_size
+        self.n_batches  = n_batches
+        self.depth      = depth
+        self.collate    = collate or (lambda b: b)
+        self._stop      = threading.Event()
+        self._thread    = None
+        if depth > 0:
+            self._queue  = queue.Queue(maxsize=depth)
+            self._thread = threading.Thread(target=self._worker, daemon=True)
+            self._thread.start()
+
+    def _next(self):
+        return self.collate(sample_batch(self.buf, self.batch_size))
+
+    def _put(self, item) -> bool:
+        """Blocks until `item` is queued or close() is called; False if stopped."""
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _worker(self):
+        try:
+            for _ in range(self.n_batches):
+                if not self._put(self._next()):
+                    return
+        except BaseException as e:          # re-raised on the learner thread (unless it already left)
+            self._put(e)
+
+    def __iter__(self):
+        for _ in range(self.n_batches):
+            if self._thread is None:
+                yield self._next()
+                continue
+            item = self._queue.get()
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ── 2. Dihedral symmetries of sparse targets ─────────────────────────────────
+
+def _sym_actions() -> np.ndarray:
+    """(8, 81) table: SYM_ACTIONS[k][a] is where action a lands under symmetry k.
+
+    k = 2*rot + flip, matching the loop order of get_symmetries() in the trainers
+    (np.rot90 by rot, then an optional left-right flip).
+    """
+    ids   = np.arange(BOARD * BOARD).reshape(BOARD, BOARD)
+    table = np.zeros((8, BOARD * BOARD), dtype=np.uint16)
+    for i in range(4):
+        for flip in (False, True):
+            moved = np.rot90(ids, k=i)
+            if flip:
+                moved = np.flip(moved, axis=1)
+            # moved[new_pos] = old action  →  invert to old action → new_pos
+            table[2 * i + flip][moved.flatten()] = np.arange(BOARD * BOARD)
+    return table
+
+
+SYM_ACTIONS = _sym_actions()
+
+
+def sym_target(target: np.ndarray, k: int) -> np.ndarray:
+    """Applies dihedral symmetry k to a sparse target (counts are unchanged)."""
+    return np.stack([SYM_ACTIONS[k][target[0]], target[1]])
+
+
+# ── 3. Append-only sharded store ──────────────────────────────────────────────
+
+class ShardStore:
+    """
+    Append-only on-disk replay buffer: one .npz shard per append, holding only
+    the new examples. Shards are written to a temp file, fsync'd and renamed
+    into place, so a crash mid-write never damages data already on disk.
+    Oldest shards are deleted once the newer ones alone hold `capacity` examples.
+
+    Shard names are shard_<seq>_<n>.npz so sizes are known without opening files.
+    States are binary planes and are stored as uint8 (4x smaller than float32).
+    """
+    def __init__(self, root: str, capacity: int):
+        self.root     = root
+        self.capacity = capacity
+        os.makedirs(root, exist_ok=True)
+
+    def shards(self) -> list[tuple[str, int]]:
+        """(path, n_examples) for every complete shard, oldest first."""
+        out = []
+        for name in sorted(os.listdir(self.root)):
+            if name.startswith("shard_") and name.endswith(".npz"):
+                n = int(name[:-4].split("_")[2])
+                out.append((os.path.join(self.root, name), n))
+        return out
+
+    def __len__(self) -> int:
+        return sum(n for _, n in self.shards())
+
+    def append(self, examples) -> None:
+        """Writes `examples` as a new shard, then evicts shards that fell out of capacity."""
+        if not examples:
+            return
+        shards  = self.shards()
+        seq     = int(os.path.basename(shards[-1][0]).split("_")[1]) + 1 if shards else 0
+        path    = os.path.join(self.root, f"shard_{seq:06d}_{len(examples):06d}.npz")
+        targets = [e[1] for e in examples]
+
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f,
+                     states  = np.stack([e[0] for e in examples]).astype(np.uint8),
+                     targets = np.concatenate(targets, axis=1),
+                     lengths = np.array([t.shape[1] for t in targets], dtype=np.int64),
+                     zs      = np.array([e[2] for e in examples], dtype=np.float32))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        self._evict()
+
+    def _evict(self):
+        kept = 0
+        for path, n in reversed(self.shards()):
+            if kept >= self.capacity:
+                os.remove(path)
+            kept += n
+
+    def load(self) -> list[tuple]:
+        """Rebuilds the newest `capacity` examples, oldest first, as (state, target, z)."""
+        examples = []
+        for path, _ in reversed(self.shards()):
+            with np.load(path) as d:
+                states  = d["states"].astype(np.float32)
+                targets = np.split(d["targets"], np.cumsum(d["lengths"])[:-1], axis=1)
+                zs      = d["zs"]
+            examples[:0] = zip(states, targets, zs)
+            if len(examples) >= self.capacity:
+                break
+        return examples[-self.capacity:]
+
+    def recent_states(self, n: int) -> np.ndarray:
+        """Up to n states (float32, shuffled) from the newest shards — no targets, no full load."""
+        states, total = [], 0
+        for path, _ in reversed(self.shards()):
+            with np.load(path) as d:
+                states.append(d["states"].astype(np.float32))
+            total += len(states[-1])
+            if total >= n:
+                break
+        if not states:
+            return np.zeros((0, 3, BOARD, BOARD), dtype=np.float32)
+        states = np.concatenate(states)
+        return states[np.random.permutation(len(states))[:n]]
+
+
+# ── 4. Memory-mapped store ────────────────────────────────────────────────────
+
+def _advise_random(mm: np.memmap):
+    """Turns off kernel read-ahead: batch gathers touch scattered pages, not runs."""
+    if hasattr(mmap, "MADV_RANDOM") and isinstance(mm.base, mmap.mmap):     # .base: the file mapping
+        mm.base.madvise(mmap.MADV_RANDOM)
+
+
+class MemmapReplay:
+    """
+    Fixed-capacity ring buffer of examples backed by numpy.memmap files, so it
+    can hold millions of positions across runs without loading them into RAM.
+
+    Layout under `root` (capacity = C):
+        states.u8    (C, 3, 9, 9) uint8    binary input planes
+        counts.u16   (C, 81)      uint16   dense visit counts (policy target)
+        zs.f32       (C,)         float32  game outcome
+        meta.json    capacity / size / head, rewritten atomically after each append
+
+    Drop-in for the deque in the trainers: supports len(), extend() and
+    sample() (used by sample_batch). Sampled indices are sorted before the
+    gather so each batch walks the files in one forward pass.
+    """
+    def __init__(self, root: str, capacity: int):
+        os.makedirs(root, exist_ok=True)
+        self.root = root
+        meta_path = os.path.join(root, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            mode = "r+"
+        else:
+            meta = {"capacity": capacity, "size": 0, "head": 0}
+            mode = "w+"
+        self.capacity = meta["capacity"]
+        self.size     = meta["size"]
+        self.head     = meta["head"]
+
+        n, b = self.capacity, BOARD
+        self.states = np.memmap(os.path.join(root, "states.u8"),  np.uint8,   mode, shape=(n, 3, b, b))
+        self.counts = np.memmap(os.path.join(root, "counts.u16"), np.uint16,  mode, shape=(n, b * b))
+        self.zs     = np.memmap(os.path.join(root, "zs.f32"),     np.float32, mode, shape=(n,))
+        for mm in (self.states, self.counts, self.zs):
+            _advise_random(mm)
+        if mode == "w+":
+            self._write_meta()
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _write_meta(self):
+        path = os.path.join(self.root, "meta.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump({"capacity": self.capacity, "size": self.size, "head": self.head}, f)
+        os.replace(path + ".tmp", path)
+
+    def extend(self, examples) -> None:
+        """Writes examples at the ring head, overwriting the oldest once full."""
+        examples = list(examples)
+        for start in range(0, len(examples), self.capacity):
+            chunk = examples[start:start + self.capacity]
+            idx   = (self.head + np.arange(len(chunk))) % self.capacity
+            self.states[idx] = np.stack([e[0] for e in chunk]).astype(np.uint8)
+            self.counts[idx] = scatter_targets([e[1] for e in chunk], dtype=np.uint16)
+            self.zs[idx]     = np.array([e[2] for e in chunk], dtype=np.float32)
+            self.head = int((self.head + len(chunk)) % self.capacity)
+            self.size = min(self.size + len(chunk), self.capacity)
+        for mm in (self.states, self.counts, self.zs):
+            mm.flush()
+        self._write_meta()
+
+    def sample(self, batch_size: int) -> tuple:
+        """(states, pis, zs) float32 batch drawn uniformly (with replacement) from the ring."""
+        idx    = np.sort(np.random.randint(0, self.size, size=batch_size))
+        states = self.states[idx].astype(np.float32)
+        pis    = self.counts[idx].astype(np.float32)
+        pis   /= pis.sum(axis=1, keepdims=True)
+        return states, pis, self.zs[idx].copy()
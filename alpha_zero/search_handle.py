@@ -0,0 +1,226 @@
+"""
+One game's MCTS tree, owned by a handle that the UI and a background
+pondering thread share.
+
+The interactive front-ends (eval_ui.play_match, predict_test.play) used to
+search only when it was the agent's turn. A SearchHandle keeps the tree
+between moves and, with pondering on, keeps adding simulations to it while
+the opponent thinks:
+
+    handle = SearchHandle(net)
+    pi = handle.search(400)          # agent's turn: tops the tree up to 400 root visits
+    handle.advance(action)           # agent's move
+    handle.start_pondering()         # search on the opponent's time
+    ...
+    handle.advance(reply)            # opponent's move: its subtree becomes the root
+    handle.stop_pondering()          # agent's turn: the search gets the CPU to itself
+    pi = handle.search(400)          # pondered visits count toward the 400
+
+Every access to the tree goes through one lock. The pondering thread takes
+it for PONDER_CHUNK simulations at a time and search() for SEARCH_CHUNK, so
+advance() waits at most one chunk. Pondering pauses while any search() runs
+but only start_pondering() / stop_pondering() switch it on or off, so a hint
+finishing late can't turn it back on during the agent's own search;
+front-ends call stop_pondering() when the agent's turn starts. snapshot() can
+be called from the UI thread at any time to read a consistent copy of the
+root statistics while a search is running — no deepcopy of the tree is ever
+needed. Hints are just search() calls on the agent's own handle (the human's
+position is its root while it ponders), so they reuse the agent's tree
+instead of starting over; search(n, generation=g) returns None once the
+position has moved on from `g`, so a stale hint is dropped.
+
+Running the module measures agent response time with and without pondering
+against an opponent that thinks for a fixed time.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+try:
+    from alpha_zero.az_gomuku5 import Gomoku, AZNet, Node, mcts, load_aznet, BOARD
+except ModuleNotFoundError:
+    from az_gomuku5 import Gomoku, AZNet, Node, mcts, load_aznet, BOARD
+
+PONDER_CHUNK      = 8          # simulations per lock acquisition while pondering
+SEARCH_CHUNK      = 32         # simulations per lock acquisition in search()
+PONDER_MAX_VISITS = 50_000     # stop pondering once the root has this many visits (memory bound)
+
+
+class SearchHandle:
+    def __init__(self, net: AZNet, game: Gomoku | None = None, n_threads: int = 1):
+        self.net       = net
+        self.n_threads = n_threads
+        self.lock      = threading.Lock()
+        self._pool     = ThreadPoolExecutor(max_workers=n_threads) if n_threads > 1 else None
+        self.pondered  = 0                      # simulations added by pondering since the last search()
+        self.generation  = 0                    # bumped by reset() / advance(): identifies the position
+        self._searches   = 0                    # search() calls running; pondering pauses while > 0
+        self._count_lock = threading.Lock()
+        self._pondering  = threading.Event()
+        self._closed     = threading.Event()
+        self._thread     = None
+        self._snap       = None
+        self.reset(game)
+
+    # ── Tree lifecycle ───────────────────────────────────────────────────────
+
+    def reset(self, game: Gomoku | None = None):
+        """Starts a fresh tree at `game` (default: empty board)."""
+        with self.lock:
+            self.game     = game.clone() if game is not None else Gomoku()
+            self.root     = Node(prior=1.0)
+            self.pondered = 0
+            self.generation += 1
+            self._refresh()
+
+    def advance(self, action: int):
+        """Plays `action` on the handle's game and promotes its subtree to the root."""
+        with self.lock:
+            self.root = self.root.children.get(action) or Node(prior=1.0)
+            self.game.move(action)
+            self.generation += 1
+            self._refresh()
+
+    # ── Search ───────────────────────────────────────────────────────────────
+
+    def _run(self, n_sims: int):
+        """Runs n_sims simulations from the current root. Caller holds the lock."""
+        if n_sims > 0 and not self.game.terminal()[0]:
+            mcts(self.game, self.net, self.root, root_noise=False,
+                 n_sims=n_sims, n_threads=self.n_threads, pool=self._pool)
+            self._refresh()
+
+    def search(self, n_sims: int, generation: int | None = None) -> np.ndarray | None:
+        """
+        Tops the tree up to n_sims root visits and returns the visit
+        distribution. Visits already there (reused or pondered) count.
+        Pondering pauses meanwhile. With `generation` (read from
+        self.generation when the request was made) it returns None as soon as
+        the position is no longer that one.
+        """
+        with self._count_lock:
+            self._searches += 1
+        try:
+            while True:
+                with self.lock:
+                    if generation is not None and generation != self.generation:
+                        return None
+                    need = n_sims - self.root.N
+                    if need <= 0 or self.game.terminal()[0]:
+                        self.pondered = 0
+                        pi = self._visits()
+                        return pi / max(pi.sum(), 1)
+                    self._run(min(need, SEARCH_CHUNK))
+        finally:
+            with self._count_lock:
+                self._searches -= 1
+
+    def _visits(self) -> np.ndarray:
+        pi = np.zeros(BOARD * BOARD)
+        for a, child in self.root.children.items():
+            pi[a] = child.N
+        return pi
+
+    def snapshot(self, wait: bool = True) -> dict:
+        """
+        Consistent copy of the root statistics, safe to call from any thread
+        while a search or pondering is running. With wait=False (UI render
+        loops) it never blocks and returns the copy taken after the last
+        completed chunk of simulations.
+        """
+        if not wait:
+            return self._snap
+        with self.lock:
+            return self._refresh()
+
+    def _refresh(self) -> dict:
+        """Rebuilds the published snapshot. Caller holds the lock."""
+        visits = self._visits()
+        q      = np.zeros(BOARD * BOARD)
+        for a, child in self.root.children.items():
+            q[a] = child.Q
+        self._snap = {
+            "n_moves":  self.game.n_moves,
+            "visits":   visits,
+            "q":        q,
+            "root_n":   self.root.N,
+            "best":     int(np.argmax(visits)) if visits.any() else None,
+            "pondered": self.pondered,
+        }
+        return self._snap
+
+    # ── Pondering ────────────────────────────────────────────────────────────
+
+    def start_pondering(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._ponder_loop, daemon=True)
+            self._thread.start()
+        self._pondering.set()
+
+    def stop_pondering(self):
+        self._pondering.clear()
+
+    def close(self):
+        self._pondering.clear()
+        self._closed.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def _ponder_loop(self):
+        while not self._closed.is_set():
+            if not self._pondering.wait(timeout=0.1):
+                continue
+            with self.lock:
+                busy = (not self._searches and self.root.N < PONDER_MAX_VISITS
+                        and not self.game.terminal()[0])
+                if busy:
+                    self.pondered += PONDER_CHUNK
+                    self._run(PONDER_CHUNK)
+            if not busy:
+                self._closed.wait(timeout=0.05)
+
+
+# ── Benchmark: response time with and without pondering ──────────────────────
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Agent response time with vs without pondering")
+    parser.add_argument("--weights", type=str, default=None, help="AZNet weights (default: random init)")
+    parser.add_argument("--sims", type=int, default=400)
+    parser.add_argument("--think", type=float, default=2.0, help="Simulated opponent think time (s)")
+    parser.add_argument("--moves", type=int, default=6, help="Agent moves per setting")
+    args = parser.parse_args()
+
+    net = load_aznet(args.weights, "cpu") if args.weights else AZNet().eval()
+
+    for ponder in (False, True):
+        np.random.seed(0)
+        handle = SearchHandle(net)
+        times, pondered = [], []
+        for _ in range(args.moves):
+            t0 = time.perf_counter()
+            pondered.append(handle.pondered)
+            handle.stop_pondering()                           # agent's turn
+            action = int(np.argmax(handle.search(args.sims)))
+            times.append(time.perf_counter() - t0)
+            handle.advance(action)
+            if handle.game.terminal()[0]:
+                break
+            if ponder:
+                handle.start_pondering()
+            time.sleep(args.think)                            # opponent thinking
+            handle.advance(int(np.random.choice(handle.game.legal())))
+            if handle.game.terminal()[0]:
+                break
+        handle.close()
+        label = "pondering" if ponder else "no pondering"
+        print(f"  {label:<13} mean response {np.mean(times):6.2f}s  "
+              f"(pondered sims/move {np.mean(pondered):6.0f})")
@@ -0,0 +1,263 @@
+"""
+Multi-process self-play with a central batched inference server.
+
+play_games_batched does selection, expansion and backup for every game in one
+Python process, so on a many-core CPU box most cores sit idle. Here the games
+are split across N worker processes. Each worker runs the unchanged
+play_games_batched tree search, but its network is a RemoteNet stub: leaf
+states are written into a per-worker shared-memory slot and announced on a
+request queue. The calling process acts as the inference server — it collects
+the pending requests of all workers, runs ONE AZNet forward pass over the
+concatenated leaves, and writes logits/values back into each worker's slot.
+
+Usage:
+    with SelfPlayPool(n_workers=8, max_games=50) as pool:      # workers persist across calls
+        examples = pool.play(net, n_games=50, n_sims=400)
+
+Benchmark (self-play throughput vs worker count):
+    python selfplay_server.py --weights models_az5/az_iter0150.pt --workers 1 2 4 8
+"""
+
+import os
+import queue
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+
+from az_gomuku5 import AZNet, play_games_batched, autocast, load_aznet, BOARD, N_PLANES, DEVICE
+
+BATCH_WAIT = 0.002       # seconds the server waits for stragglers before a forward pass
+
+
+# ── 1. Shared-memory slots ────────────────────────────────────────────────────
+
+def _slot_arrays(shm: shared_memory.SharedMemory, max_leaves: int):
+    """Views (states, logits, values) into one worker's shared-memory slot."""
+    n_states = max_leaves * N_PLANES * BOARD * BOARD
+    n_logits = max_leaves * BOARD * BOARD
+    buf      = np.ndarray((n_states + n_logits + max_leaves,), dtype=np.float32, buffer=shm.buf)
+    states   = buf[:n_states].reshape(max_leaves, N_PLANES, BOARD, BOARD)
+    logits   = buf[n_states:n_states + n_logits].reshape(max_leaves, BOARD * BOARD)
+    values   = buf[n_states + n_logits:]
+    return states, logits, values
+
+
+def _slot_bytes(max_leaves: int) -> int:
+    return 4 * max_leaves * (N_PLANES * BOARD * BOARD + BOARD * BOARD + 1)
+
+
+# ── 2. Worker side ────────────────────────────────────────────────────────────
+
+class RemoteNet:
+    """
+    Stands in for AZNet inside a worker's play_games_batched: net(states) ships
+    the leaves to the inference server and blocks until logits/values come back.
+    """
+    def __init__(self, wid: int, shm_name: str, max_leaves: int, request_q, ready):
+        self.wid       = wid
+        self.shm       = shared_memory.SharedMemory(name=shm_name)
+        self.request_q = request_q
+        self.ready     = ready
+        self.states, self.logits, self.values = _slot_arrays(self.shm, max_leaves)
+
+    def eval(self):
+        return self
+
+    def __call__(self, states: torch.Tensor):
+        n = len(states)
+        self.states[:n] = states.cpu().numpy()
+        self.ready.clear()
+        self.request_q.put(("eval", self.wid, n))
+        self.ready.wait()
+        logits = torch.from_numpy(self.logits[:n].copy()).to(states.device)
+        values = torch.from_numpy(self.values[:n].copy()).to(states.device).unsqueeze(1)
+        return logits, values
+
+    def close(self):
+        del self.states, self.logits, self.values      # views must go before the mapping
+        self.shm.close()
+
+
+def _worker(wid, shm_name, max_leaves, jobs, request_q, ready):
+    """Plays one batch of games per (n_games, n_sims, seed) job until it receives None."""
+    torch.set_num_threads(1)
+    net = RemoteNet(wid, shm_name, max_leaves, request_q, ready)
+    try:
+        while (job := jobs.get()) is not None:
+            n_games, n_sims, seed = job
+            np.random.seed(seed)
+            request_q.put(("done", wid, play_games_batched(net, n_games=n_games, n_sims=n_sims)))
+    finally:
+        net.close()
+
+
+# ── 3. Server side ────────────────────────────────────────────────────────────
+
+class SelfPlayPool:
+    """
+    n_workers persistent worker processes and their shared-memory slots, so a
+    training loop pays process start-up and the torch import once per run
+    rather than once per iteration. play() runs one batch of up to max_games
+    games over them; close() (or leaving the with-block) stops the workers.
+    """
+    def __init__(self, n_workers: int, max_games: int):
+        self.n_workers  = max(1, min(n_workers, max_games))
+        self.max_leaves = -(-max_games // self.n_workers)      # games (= leaves in flight) per worker
+        ctx            = mp.get_context("spawn")
+        self.request_q = ctx.Queue()
+        self.jobs      = [ctx.Queue() for _ in range(self.n_workers)]
+        self.readies   = [ctx.Event() for _ in range(self.n_workers)]
+        self.shms      = [shared_memory.SharedMemory(create=True, size=_slot_bytes(self.max_leaves))
+                          for _ in range(self.n_workers)]
+        self.slots     = [_slot_arrays(shm, self.max_leaves) for shm in self.shms]
+        self.workers   = [ctx.Process(target=_worker, daemon=True,
+                                      args=(w, self.shms[w].name, self.max_leaves, self.jobs[w],
+                                            self.request_q, self.readies[w]))
+                          for w in range(self.n_workers)]
+        for p in self.workers:
+            p.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self.workers is None:
+            return
+        for q in self.jobs:
+            q.put(None)
+        for p in self.workers:
+            p.join(timeout=5)
+            if p.is_alive():
+                p.terminate()
+        self.workers = None
+        del self.slots
+        for shm in self.shms:
+            shm.close()
+            shm.unlink()
+
+    def _next_request(self, timeout=None):
+        """request_q.get() that fails loudly if a worker has crashed instead of hanging."""
+        t_end = None if timeout is None else time.perf_counter() + timeout
+        while True:
+            wait = 1.0 if t_end is None else max(0.0, min(1.0, t_end - time.perf_counter()))
+            try:
+                return self.request_q.get(timeout=wait)
+            except queue.Empty:
+                if any(p.exitcode is not None for p in self.workers):
+                    raise RuntimeError("self-play worker died")
+                if t_end is not None and time.perf_counter() >= t_end:
+                    raise
+
+    def play(self, net: AZNet, n_games: int, n_sims: int, stats: dict | None = None) -> list[tuple]:
+        """
+        n_games of self-play spread over the workers, leaves evaluated here by `net`.
+        If `stats` is given it is filled with forward-pass counts and mean batch size.
+        A failed batch leaves workers mid-game, so the pool is closed on any error.
+        """
+        if self.workers is None:
+            raise RuntimeError("SelfPlayPool is closed")
+        if n_games > self.n_workers * self.max_leaves:
+            raise ValueError(f"{n_games} games exceed the pool's {self.n_workers * self.max_leaves}")
+        net.eval()
+        shares    = [n_games // self.n_workers + (w < n_games % self.n_workers) for w in range(self.n_workers)]
+        base_seed = np.random.randint(2**31)
+        for w, k in enumerate(shares):
+            if k:
+                self.jobs[w].put((k, n_sims, base_seed + w))
+
+        examples  = []
+        n_active  = sum(k > 0 for k in shares)
+        n_forward = n_leaves = 0
+
+        def handle(msg, pending):
+            nonlocal n_active
+            kind, wid, payload = msg
+            if kind == "eval":
+                pending[wid] = payload
+            else:
+                examples.extend(payload)
+                n_active -= 1
+
+        try:
+            while n_active:
+                pending = {}
+                handle(self._next_request(), pending)
+                # Batch across workers: wait briefly until every still-running worker has a request in
+                deadline = time.perf_counter() + BATCH_WAIT
+                while n_active and len(pending) < n_active:
+                    try:
+                        handle(self._next_request(timeout=deadline - time.perf_counter()), pending)
+                    except queue.Empty:
+                        break
+                if not pending:
+                    continue
+
+                wids   = list(pending)
+                states = np.concatenate([self.slots[w][0][:pending[w]] for w in wids])
+                with torch.no_grad(), autocast():
+                    logits, values = net(torch.from_numpy(states).to(DEVICE))
+                logits = logits.float().cpu().numpy()
+                values = values.float().cpu().numpy().reshape(-1)
+
+                offset = 0
+                for w in wids:
+                    n = pending[w]
+                    self.slots[w][1][:n] = logits[offset:offset + n]
+                    self.slots[w][2][:n] = values[offset:offset + n]
+                    offset += n
+                    self.readies[w].set()
+                n_forward += 1
+                n_leaves  += len(states)
+        except BaseException:
+            self.close()
+            raise
+
+        if stats is not None:
+            stats["forward_passes"] = n_forward
+            stats["mean_batch"]     = n_leaves / max(1, n_forward)
+        return examples
+
+
+def play_games_parallel(net: AZNet, n_games: int, n_sims: int, n_workers: int,
+                        stats: dict | None = None) -> list[tuple]:
+    """
+    Drop-in for play_games_batched that spreads the games over n_workers
+    processes started for this call only; loops should keep a SelfPlayPool.
+    """
+    with SelfPlayPool(n_workers, n_games) as pool:
+        return pool.play(net, n_games, n_sims, stats)
+
+
+# ── 4. Scaling benchmark ──────────────────────────────────────────────────────
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Self-play throughput vs number of worker processes")
+    parser.add_argument("--weights", type=str, default=None, help="AZNet weights (default: random init)")
+    parser.add_argument("--games", type=int, default=32)
+    parser.add_argument("--sims", type=int, default=100)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    net = load_aznet(args.weights, DEVICE) if args.weights else AZNet().to(DEVICE).eval()
+
+    print(f"Device: {DEVICE} | games: {args.games} | sims: {args.sims}")
+    t0 = time.perf_counter()
+    n_pos = len(play_games_batched(net, args.games, args.sims)) // 8
+    base  = time.perf_counter() - t0
+    print(f"  {'in-process':>12}  {args.games / base:6.2f} games/s  {n_pos / base:7.1f} positions/s")
+
+    for w in args.workers:
+        stats = {}
+        with SelfPlayPool(w, args.games) as pool:              # start-up excluded, as in training
+            t0 = time.perf_counter()
+            n_pos = len(pool.play(net, args.games, args.sims, stats)) // 8
+            dt = time.perf_counter() - t0
+        print(f"  {w:>4} workers  {args.games / dt:6.2f} games/s  {n_pos / dt:7.1f} positions/s  "
+              f"x{base / dt:4.2f}  (mean batch {stats['mean_batch']:.1f})")
@@ -0,0 +1,240 @@
+"""
+Shared-memory model weights for self-play worker processes.
+
+Every forked/spawned self-play process that loads its own AZNet (or
+Mixed-Training PolicyValueNet) keeps a private copy of every parameter. A
+SharedWeights store puts ONE copy of the state dict in a
+multiprocessing.shared_memory block; workers bind their module's parameters
+and buffers directly onto views of that block, so N workers cost one copy of
+the weights instead of N, and picking up a new version costs a pointer swap
+instead of a torch.load / load_state_dict.
+
+Layout: a header (version, active slot, publish timestamp, one pin per reader)
+followed by two weight slots. A bound worker runs its forward passes directly
+on a slot, so that slot must not change while any worker is bound to it:
+bind() records the slot in the worker's pin (then re-checks that it is still
+the active one), and publish() writes into the inactive slot only if no
+reader is pinned to it. If one still is — a worker that has not finished the
+self-play batch it started on the older weights — publish() skips and returns
+None, and the learner simply publishes again at its next broadcast. Workers
+therefore move to new weights at most once per self-play batch, and never
+see a tensor change under them.
+
+Usage:
+    weights = SharedWeights.create(net)           # learner / parent
+    weights.publish(net)                          # after each broadcast interval (None = skipped)
+    ...
+    version = weights.bind(worker_net, rank)      # worker, once; rank < max_readers, unique
+    if weights.version != version:                # worker, between batches
+        version = weights.bind(worker_net, rank)
+    weights.release(rank)                         # worker, on exit
+
+SharedWeights objects pickle by name, so they can be passed straight to
+multiprocessing Process args. Running the module compares per-worker private memory and
+weight-sync latency against workers that each load their own copy.
+"""
+
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+_ALIGN       = 64
+_FIELDS      = 3           # version, active slot, publish time; reader pins follow
+MAX_READERS  = 64
+
+
+def _header_bytes(max_readers: int) -> int:
+    return -(-(_FIELDS + max_readers) * 8 // _ALIGN) * _ALIGN
+
+
+def _layout(module: nn.Module) -> tuple[list, int]:
+    """[(name, shape, numpy dtype str, byte offset)] for every entry of the state dict."""
+    entries, offset = [], 0
+    for name, t in module.state_dict().items():
+        dtype = np.dtype(str(t.dtype).replace("torch.", ""))
+        entries.append((name, tuple(t.shape), dtype.str, offset))
+        offset += -(-t.numel() * dtype.itemsize // _ALIGN) * _ALIGN
+    return entries, offset
+
+
+class SharedWeights:
+    def __init__(self, name: str, layout: list, slot_bytes: int, max_readers: int = MAX_READERS,
+                 owner: bool = False):
+        self.shm         = shared_memory.SharedMemory(name=name, create=False)
+        self.layout      = layout
+        self.slot_bytes  = slot_bytes
+        self.max_readers = max_readers
+        self.owner       = owner
+        header           = np.ndarray((_FIELDS + max_readers,), dtype=np.float64, buffer=self.shm.buf)
+        self._header     = header[:_FIELDS]          # version, active, t
+        self._pins       = header[_FIELDS:]          # per reader: bound slot + 1 (0 = none)
+
+    @classmethod
+    def create(cls, module: nn.Module, max_readers: int = MAX_READERS) -> "SharedWeights":
+        layout, slot_bytes = _layout(module)
+        shm = shared_memory.SharedMemory(create=True, size=_header_bytes(max_readers) + 2 * slot_bytes)
+        store = cls(shm.name, layout, slot_bytes, max_readers, owner=True)
+        shm.close()
+        store._header[:] = (-1, 1, 0.0)
+        store._pins[:]   = 0
+        store.publish(module)
+        return store
+
+    # Pickled across processes by name; the receiving side re-attaches.
+    def __getstate__(self):
+        return {"name": self.shm.name, "layout": self.layout, "slot_bytes": self.slot_bytes,
+                "max_readers": self.max_readers}
+
+    def __setstate__(self, state):
+        self.__init__(state["name"], state["layout"], state["slot_bytes"], state["max_readers"])
+
+    @property
+    def version(self) -> int:
+        return int(self._header[0])
+
+    def age(self) -> float:
+        """Seconds since the current version was published (weight-sync latency)."""
+        return time.time() - self._header[2]
+
+    def _views(self, slot: int) -> dict[str, np.ndarray]:
+        base = _header_bytes(self.max_readers) + slot * self.slot_bytes
+        return {name: np.ndarray(shape, dtype=np.dtype(dt), buffer=self.shm.buf, offset=base + off)
+                for name, shape, dt, off in self.layout}
+
+    def readers(self, slot: int) -> int:
+        """Number of readers currently bound to `slot`."""
+        return int(np.count_nonzero(self._pins == slot + 1))
+
+    def publish(self, module: nn.Module) -> int | None:
+        """
+        Writes module's weights into the inactive slot, then makes it current.
+        Returns the new version, or None (nothing written) while a reader is
+        still bound to the inactive slot.
+        """
+        slot = 1 - int(self._header[1])
+        if self.readers(slot):
+            return None
+        views = self._views(slot)
+        for name, t in module.state_dict().items():
+            views[name][...] = t.detach().cpu().numpy()
+        del views
+        self._header[1] = slot
+        self._header[2] = time.time()
+        self._header[0] = self._header[0] + 1        # version last: readers key off it
+        return self.version
+
+    def bind(self, module: nn.Module, reader: int) -> int:
+        """
+        Points module's parameters/buffers at the current slot (zero-copy on CPU;
+        CUDA modules get a copy instead) and pins that slot for `reader` until
+        its next bind() or release(). Returns the version now in use.
+        """
+        while True:
+            version = self.version
+            slot    = int(self._header[1])
+            self._pins[reader] = slot + 1
+            if int(self._header[1]) == slot:        # still active after pinning: publish() can't take it
+                break
+        views   = self._views(slot)
+        tensors = dict(module.named_parameters())
+        tensors.update(module.named_buffers())
+        for name, t in tensors.items():
+            shared = torch.from_numpy(views[name])
+            if t.is_cuda:
+                t.data.copy_(shared)
+            else:
+                t.data = shared
+        return version
+
+    def release(self, reader: int):
+        """Unpins `reader` (a worker that exits, or stops using the weights)."""
+        self._pins[reader] = 0
+
+    def close(self):
+        self._header = self._pins = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+# ── Benchmark: per-worker private memory and sync latency ───────────────────────────────
+
+def _private_mb() -> float:
+    """Memory this process does not share with others (RSS minus shared pages)."""
+    kb = 0
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            if line.startswith(("Private_Clean:", "Private_Dirty:")):
+                kb += int(line.split()[1])
+    return kb / 1024
+
+
+def _bench_worker(rank, mode, weights, path, results, n_updates):
+    import gc
+    from az_gomuku5 import AZNet
+    torch.set_num_threads(1)
+    net = AZNet().eval()
+    latencies = []
+    if mode == "shared":
+        version = weights.bind(net, rank)
+        gc.collect()
+        results.put("ready")
+        while len(latencies) < n_updates:
+            if weights.version != version:
+                version = weights.bind(net, rank)
+                latencies.append(weights.age())
+            time.sleep(0.0005)
+    else:
+        for _ in range(n_updates):
+            t0 = time.perf_counter()
+            net.load_state_dict(torch.load(path, map_location="cpu", weights_only=True))
+            latencies.append(time.perf_counter() - t0)
+    x = torch.zeros(1, 3, 9, 9)
+    with torch.no_grad():
+        net(x)
+    if mode == "shared":
+        weights.release(rank)
+    results.put((mode, _private_mb(), float(np.mean(latencies))))
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+    import tempfile
+    import torch.multiprocessing as mp
+    from az_gomuku5 import AZNet
+
+    parser = argparse.ArgumentParser(description="Shared-memory weights vs per-worker copies")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--updates", type=int, default=5)
+    args = parser.parse_args()
+
+    net  = AZNet().eval()
+    path = os.path.join(tempfile.mkdtemp(), "weights.pt")
+    torch.save(net.state_dict(), path)
+    weights = SharedWeights.create(net)
+
+    ctx = mp.get_context("spawn")
+    for mode in ("private", "shared"):
+        results = ctx.Queue()
+        procs = [ctx.Process(target=_bench_worker, args=(r, mode, weights, path, results, args.updates))
+                 for r in range(args.workers)]
+        for p in procs:
+            p.start()
+        if mode == "shared":
+            for _ in procs:
+                assert results.get() == "ready"
+            for _ in range(args.updates):
+                time.sleep(0.2)
+                while weights.publish(net) is None:        # a worker is still on the older slot
+                    time.sleep(0.001)
+        rows = [results.get() for _ in procs]
+        for p in procs:
+            p.join()
+        mem = np.mean([r[1] for r in rows])
+        lat = np.mean([r[2] for r in rows])
+        print(f"  {mode:<8} workers={args.workers}  private/worker={mem:7.1f} MB  sync latency={lat * 1e3:7.2f} ms")
+    weights.close()